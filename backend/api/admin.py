@@ -1,15 +1,20 @@
 from django.contrib import admin
-from .models import Category, Transaction, Budget, SavingsGoal, FinancialMetric
+from .models import (
+    Category, Transaction, Budget, SavingsGoal, FinancialMetric, CategoryMetric, MLJob,
+    SpendingStatistic, AnomalyBaseline, Tombstone
+)
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'user', 'created_at')
+    list_select_related = ('user',)
     list_filter = ('user',)
     search_fields = ('name', 'description')
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
-    list_display = ('transaction_type', 'amount', 'category', 'user', 'date')
+    list_display = ('transaction_type', 'amount', 'category', 'user', 'date', 'anomaly_score')
+    list_select_related = ('category', 'user')
     list_filter = ('transaction_type', 'user', 'category', 'date')
     search_fields = ('description',)
     date_hierarchy = 'date'
@@ -17,6 +22,7 @@ class TransactionAdmin(admin.ModelAdmin):
 @admin.register(Budget)
 class BudgetAdmin(admin.ModelAdmin):
     list_display = ('category', 'user', 'amount', 'start_date', 'end_date')
+    list_select_related = ('category', 'user')
     list_filter = ('user', 'category', 'start_date', 'end_date')
     search_fields = ('category__name',)
     date_hierarchy = 'start_date'
@@ -24,6 +30,7 @@ class BudgetAdmin(admin.ModelAdmin):
 @admin.register(SavingsGoal)
 class SavingsGoalAdmin(admin.ModelAdmin):
     list_display = ('name', 'user', 'target_amount', 'current_amount', 'target_date')
+    list_select_related = ('user',)
     list_filter = ('user', 'target_date')
     search_fields = ('name',)
     date_hierarchy = 'target_date'
@@ -31,5 +38,37 @@ class SavingsGoalAdmin(admin.ModelAdmin):
 @admin.register(FinancialMetric)
 class FinancialMetricAdmin(admin.ModelAdmin):
     list_display = ('user', 'date', 'total_income', 'total_expenses', 'savings_rate')
+    list_select_related = ('user',)
     list_filter = ('user', 'date')
     date_hierarchy = 'date'
+
+@admin.register(CategoryMetric)
+class CategoryMetricAdmin(admin.ModelAdmin):
+    list_display = ('category', 'user', 'date', 'total_income', 'total_expenses')
+    list_select_related = ('category', 'user')
+    list_filter = ('user', 'date')
+    date_hierarchy = 'date'
+
+@admin.register(MLJob)
+class MLJobAdmin(admin.ModelAdmin):
+    list_display = ('job_type', 'engine', 'user', 'status', 'attempts', 'created_at',
+                    'finished_at')
+    list_select_related = ('user',)
+    list_filter = ('job_type', 'engine', 'status')
+
+@admin.register(SpendingStatistic)
+class SpendingStatisticAdmin(admin.ModelAdmin):
+    list_display = ('user', 'dimension', 'key', 'count', 'total', 'mean')
+    list_select_related = ('user',)
+    list_filter = ('dimension',)
+
+@admin.register(AnomalyBaseline)
+class AnomalyBaselineAdmin(admin.ModelAdmin):
+    list_display = ('user', 'key', 'count', 'mean', 'variance', 'updated_at')
+    list_select_related = ('user',)
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ('entity', 'object_id', 'user', 'deleted_at')
+    list_select_related = ('user',)
+    list_filter = ('entity',)
@@ -0,0 +1,203 @@
+import math
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import AnomalyBaseline, Transaction
+
+# Expenses a baseline needs before its scores are trusted
+MIN_HISTORY = 10
+# Amounts are clipped to this many spreads before being folded in, so a
+# single outlier cannot inflate the baseline it is judged against
+CLIP = 3.0
+OVERALL = 0
+
+
+def _decay():
+    return getattr(settings, 'ANOMALY_DECAY', 0.05)
+
+
+def _spread(baseline):
+    # Floors keep near-constant bills (rent, subscriptions) from scoring
+    # every cent of difference as an anomaly
+    return max(math.sqrt(baseline.variance), 0.05 * abs(baseline.mean), 0.01)
+
+
+def _score(baselines, category_id, amount):
+    baseline = baselines.get(category_id or OVERALL)
+    if baseline is None or baseline.count < MIN_HISTORY:
+        baseline = baselines.get(OVERALL)
+    if baseline is None or baseline.count < MIN_HISTORY:
+        return None
+    return round((float(amount) - baseline.mean) / _spread(baseline), 4)
+
+
+def _alpha(baseline):
+    # The first expenses are weighted 1/n so a new baseline starts as the
+    # plain mean and variance instead of being biased towards zero
+    return max(1.0 / (baseline.count + 1), _decay())
+
+
+def _clip(baseline, amount):
+    x = float(amount)
+    if baseline.count >= MIN_HISTORY:
+        limit = CLIP * _spread(baseline)
+        x = min(max(x, baseline.mean - limit), baseline.mean + limit)
+    return x
+
+
+def _fold(baseline, amount):
+    """Add ``amount`` to an exponentially decayed mean and variance."""
+    alpha = _alpha(baseline)
+    delta = _clip(baseline, amount) - baseline.mean
+    baseline.mean += alpha * delta
+    baseline.variance = (1 - alpha) * (baseline.variance + alpha * delta * delta)
+    baseline.count += 1
+
+
+def _fold_in_database(baselines, amount):
+    """Apply _fold to the stored rows in one UPDATE against their current values.
+
+    Only the weights and clipping bounds come from ``baselines`` as they
+    were read, so concurrent inserts for the same user need no lock. The
+    statement is written out because building the equivalent F() expressions
+    costs several times more than running it, on every insert.
+    """
+    now = timezone.now()
+    params = []
+    for baseline in baselines:
+        alpha = _alpha(baseline)
+        x = _clip(baseline, amount)
+        params.append((alpha, x, 1 - alpha, alpha, x, x, now, baseline.pk))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {connection.ops.quote_name(AnomalyBaseline._meta.db_table)} '
+            'SET count = count + 1, '
+            'mean = mean + %s * (%s - mean), '
+            'variance = %s * (variance + %s * (%s - mean) * (%s - mean)), '
+            'updated_at = %s WHERE id = %s',
+            params
+        )
+
+
+def _keys(category_id):
+    return {OVERALL, category_id} if category_id else {OVERALL}
+
+
+def _load(user_id, keys, lock=False):
+    baselines = AnomalyBaseline.objects.filter(user_id=user_id, key__in=keys)
+    if lock:
+        baselines = baselines.select_for_update()
+    return {baseline.key: baseline for baseline in baselines}
+
+
+def score_expense(user_id, category_id, transaction_type, amount):
+    """Score one expense against the stored baselines without updating them.
+
+    Returns (score, baselines); pass the baselines on to record_expense once
+    the expense is saved.
+    """
+    if transaction_type != 'EXPENSE':
+        return None, None
+    baselines = _load(user_id, _keys(category_id))
+    return _score(baselines, category_id, amount), baselines
+
+
+def record_expense(user_id, category_id, transaction_type, amount, baselines=None):
+    """Fold a newly created expense into the user's baselines."""
+    if transaction_type != 'EXPENSE':
+        return
+    if baselines is None:
+        baselines = _load(user_id, _keys(category_id))
+    created = []
+    for key in _keys(category_id) - set(baselines):
+        baseline = AnomalyBaseline(user_id=user_id, key=key)
+        _fold(baseline, amount)
+        created.append(baseline)
+    if baselines:
+        _fold_in_database(baselines.values(), amount)
+    if created:
+        # A baseline created concurrently by another insert keeps that value
+        AnomalyBaseline.objects.bulk_create(created, ignore_conflicts=True)
+
+
+def drop_category_baseline(user_id, category_id):
+    """Drop the baseline of a category whose expenses become uncategorised.
+
+    The overall baseline already includes them, and is what they are scored
+    against from now on.
+    """
+    AnomalyBaseline.objects.filter(user_id=user_id, key=category_id).delete()
+
+
+def score_new_expenses(user_id, expenses):
+    """Score and record many unsaved expenses of one user in a single pass.
+
+    Sets ``anomaly_score`` on each Transaction in place, in the given order.
+    Touches only the baseline rows of the categories involved, never the
+    transaction history.
+    """
+    expenses = [expense for expense in expenses if expense.transaction_type == 'EXPENSE']
+    if not expenses:
+        return
+
+    keys = set().union(*(_keys(expense.category_id) for expense in expenses))
+    with transaction.atomic():
+        loaded = _load(user_id, keys, lock=True)
+        baselines = dict(loaded)
+        for expense in expenses:
+            expense.anomaly_score = _score(baselines, expense.category_id, expense.amount)
+            for key in _keys(expense.category_id):
+                if key not in baselines:
+                    baselines[key] = AnomalyBaseline(user_id=user_id, key=key)
+                _fold(baselines[key], expense.amount)
+        existing = [baseline for key, baseline in baselines.items() if key in loaded]
+        for baseline in existing:
+            baseline.updated_at = timezone.now()
+        AnomalyBaseline.objects.bulk_update(
+            existing, ['count', 'mean', 'variance', 'updated_at']
+        )
+        AnomalyBaseline.objects.bulk_create([
+            baseline for key, baseline in baselines.items() if key not in loaded
+        ])
+
+
+def rebuild_anomaly_scores(users=None, batch_size=1000):
+    """Replay each user's expenses in date order to rebuild baselines and scores.
+
+    This is the one operation that reads the whole history; use it after
+    migrating existing data or changing ANOMALY_DECAY.
+    """
+    user_ids = Transaction.objects.filter(transaction_type='EXPENSE')
+    if users is not None:
+        user_ids = user_ids.filter(user__in=users)
+    user_ids = user_ids.values_list('user_id', flat=True).distinct().order_by('user_id')
+
+    rescored = 0
+    now = timezone.now()
+    for user_id in list(user_ids):
+        baselines = {}
+        changed = []
+        with transaction.atomic():
+            rows = Transaction.objects.filter(
+                user_id=user_id, transaction_type='EXPENSE'
+            ).order_by('date', 'id').values_list('id', 'category_id', 'amount', 'anomaly_score')
+            for transaction_id, category_id, amount, previous in rows.iterator():
+                score = _score(baselines, category_id, amount)
+                if score != previous:
+                    changed.append(
+                        Transaction(id=transaction_id, anomaly_score=score, updated_at=now)
+                    )
+                for key in _keys(category_id):
+                    if key not in baselines:
+                        baselines[key] = AnomalyBaseline(user_id=user_id, key=key)
+                    _fold(baselines[key], amount)
+            # updated_at lets sync clients pick up the new scores
+            Transaction.objects.bulk_update(
+                changed, ['anomaly_score', 'updated_at'], batch_size=batch_size
+            )
+            AnomalyBaseline.objects.filter(user_id=user_id).delete()
+            AnomalyBaseline.objects.bulk_create(baselines.values())
+        rescored += len(changed)
+    return rescored
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from django.core.checks import Tags, register
+        from django.db.backends.signals import connection_created
+
+        from finance_tracker.caches import check_shared_cache
+        from finance_tracker.database import configure_sqlite
+        from . import signals  # noqa: F401
+
+        connection_created.connect(configure_sqlite, dispatch_uid='configure_sqlite')
+        register(check_shared_cache, Tags.caches, deploy=True)
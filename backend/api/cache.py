@@ -0,0 +1,165 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .instrumentation import metrics
+
+
+def _version_key(user_id):
+    return f'api:user-version:{user_id}'
+
+
+def get_user_version(user_id):
+    """Return the version of ``user_id``'s data.
+
+    Versions are nanosecond timestamps of the last write, so they double as
+    Last-Modified values, and a version lost to cache eviction is replaced by
+    a newer one instead of resurrecting stale entries.
+    """
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(_version_key(user_id), version, timeout=None):
+            version = cache.get(_version_key(user_id), version)
+    return version
+
+
+def bump_user_versions(user_ids):
+    """Invalidate every cached response of each of ``user_ids``, in two cache calls."""
+    keys = [_version_key(user_id) for user_id in user_ids]
+    if not keys:
+        return
+    current = cache.get_many(keys)
+    now = time.time_ns()
+    cache.set_many({key: max(now, current.get(key, 0) + 1) for key in keys}, timeout=None)
+
+
+def bump_user_version(user_id):
+    """Invalidate every cached response for ``user_id`` in O(1)."""
+    bump_user_versions([user_id])
+
+
+def invalidate_user_cache(user_id):
+    """Bump ``user_id``'s version now and, inside a transaction, again on commit.
+
+    Until the commit other requests still read the old rows, and could cache
+    them under the version bumped now.
+    """
+    bump_user_version(user_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_user_version(user_id))
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags or f'W/{etag}' in tags
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+def cached_user_response(request, name, compute, params=None, cacheable=None,
+                         not_modified_before=None):
+    """Return ``compute()`` for the requesting user through the cache.
+
+    Entries are keyed by user, data version and ``params``, carry ETag and
+    Last-Modified headers and answer matching conditional requests with 304.
+    Results that also depend on the clock can pass ``not_modified_before``
+    (a Unix timestamp) to move Last-Modified forward. Results for which
+    ``cacheable(data)`` is false are returned uncached and without validators.
+    ``compute`` may also return a Response, of which only 200s are cached.
+    """
+    user_id = request.user.id
+    version = get_user_version(user_id)
+    key = _cache_key(name, user_id, version, params)
+    etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+    last_modified = max(version // 1_000_000_000, int(not_modified_before or 0))
+
+    if _not_modified(request, etag, last_modified):
+        metrics.count_cache(name, 'hit')
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        return _with_validators(response, etag, last_modified)
+
+    data, stored = _get_or_compute(name, user_id, key, compute, cacheable)
+    if not stored:
+        return data if isinstance(data, Response) else Response(data)
+    return _with_validators(Response(data), etag, last_modified)
+
+
+def cached_user_data(user_id, name, compute, params=None, cacheable=None):
+    """Return ``compute()`` for ``user_id`` through the same cache entries as
+    cached_user_response, for callers that build their own response."""
+    key = _cache_key(name, user_id, get_user_version(user_id), params)
+    return _get_or_compute(name, user_id, key, compute, cacheable)[0]
+
+
+def _cache_key(name, user_id, version, params):
+    # Hashed, so URLs and other parameters cannot break memcached's key rules
+    digest = hashlib.sha256(repr(sorted((params or {}).items())).encode()).hexdigest()
+    return f'api:{name}:{user_id}:{version}:{digest[:32]}'
+
+
+def _get_or_compute(name, user_id, key, compute, cacheable):
+    # Returns the data and whether it is (now) cached. Entries name their
+    # owner, so a key mix-up can never serve one user's data to another.
+    entry = cache.get(key)
+    if entry is not None and entry[0] == user_id:
+        metrics.count_cache(name, 'hit')
+        return entry[1], True
+    metrics.count_cache(name, 'miss')
+    data = compute()
+    if isinstance(data, Response):
+        if data.status_code != status.HTTP_200_OK:
+            return data, False
+        data = data.data
+    if cacheable is not None and not cacheable(data):
+        return data, False
+    cache.set(key, (user_id, data), timeout=getattr(settings, 'API_CACHE_TIMEOUT', 3600))
+    return data, True
+
+
+def _with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class CachedResponseMixin:
+    """Serve a viewset's GET ``cached_actions`` from the per-user cache.
+
+    Responses are cached by their data under the user, their data version
+    and the full URL, with the ETag and Last-Modified of cached_user_response.
+    The version changes on every write to the user's rows (see api.signals),
+    so a cached action may depend on nothing else but the URL and the date.
+    """
+    cached_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (request.method != 'GET' or self.action not in self.cached_actions
+                or not request.user.is_authenticated):
+            return
+        # Checked permissions first; binds the cached handler the same way
+        # ViewSetMixin binds actions to HTTP methods
+        handler = self.get
+        name = f'{self.basename}-{self.action}'
+        start_of_day = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        def get(request, *args, **kwargs):
+            return cached_user_response(
+                request, name, lambda: handler(request, *args, **kwargs),
+                # The date covers actions that default to the current month
+                params={'url': request.build_absolute_uri(), 'date': start_of_day.isoformat()},
+                not_modified_before=start_of_day.timestamp()
+            )
+        self.get = get
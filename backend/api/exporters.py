@@ -0,0 +1,114 @@
+import csv
+import io
+from json.encoder import encode_basestring_ascii
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .models import Category
+
+DEFAULT_CHUNK_SIZE = 2000
+# Same fields and names as TransactionSerializer
+EXPORT_FIELDS = (
+    'id', 'user', 'category', 'category_name', 'amount', 'transaction_type',
+    'description', 'date', 'anomaly_score', 'created_at', 'updated_at'
+)
+QUERY_FIELDS = (
+    'id', 'user_id', 'category_id', 'amount', 'transaction_type', 'description', 'date',
+    'anomaly_score', 'created_at', 'updated_at'
+)
+
+
+def _datetime(value):
+    # Matches the serializer's ISO 8601 output for UTC datetimes
+    value = value.isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def export_rows(transactions, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield each transaction as a tuple in EXPORT_FIELDS order.
+
+    Rows are streamed from the database ``chunk_size`` at a time as plain
+    tuples; category names are looked up once per export instead of joined.
+    """
+    names = dict(Category.objects.filter(
+        id__in=transactions.order_by().values('category_id')
+    ).values_list('id', 'name'))
+    rows = transactions.values_list(*QUERY_FIELDS).iterator(chunk_size=chunk_size)
+    for (id, user, category, amount, transaction_type, description, date, anomaly_score,
+         created_at, updated_at) in rows:
+        yield (
+            id, user, category, names.get(category), amount, transaction_type, description,
+            date, anomaly_score, created_at, updated_at
+        )
+
+
+def _json(value):
+    return 'null' if value is None else encode_basestring_ascii(value)
+
+
+def iter_jsonl(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Encode export rows as JSON Lines, one string per ``chunk_size`` rows.
+
+    Amounts are written as strings, like the API does, so no precision is
+    lost to floats.
+    """
+    lines = []
+    for (id, user, category, category_name, amount, transaction_type, description, date,
+         anomaly_score, created_at, updated_at) in rows:
+        lines.append(
+            f'{{"id":{id},"user":{user},'
+            f'"category":{"null" if category is None else category},'
+            f'"category_name":{_json(category_name)},"amount":"{amount}",'
+            f'"transaction_type":"{transaction_type}","description":{_json(description)},'
+            f'"date":"{date.isoformat()}",'
+            f'"anomaly_score":{"null" if anomaly_score is None else repr(anomaly_score)},'
+            f'"created_at":"{_datetime(created_at)}","updated_at":"{_datetime(updated_at)}"}}\n'
+        )
+        if len(lines) >= chunk_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def iter_csv(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Encode export rows as CSV with a header, one string per ``chunk_size`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    count = 0
+    for (id, user, category, category_name, amount, transaction_type, description, date,
+         anomaly_score, created_at, updated_at) in rows:
+        writer.writerow((
+            id, user, category, category_name, amount, transaction_type, description,
+            date.isoformat(), anomaly_score, _datetime(created_at), _datetime(updated_at)
+        ))
+        count += 1
+        if count >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    yield buffer.getvalue()
+
+
+class JSONLinesRenderer(JSONRenderer):
+    """Selects JSON Lines exports; other responses (errors) render as JSON."""
+    media_type = 'application/x-ndjson'
+    format = 'jsonl'
+
+
+class CSVRenderer(BaseRenderer):
+    """Selects CSV exports; other responses (errors) render as JSON text."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data, renderer_context=renderer_context)
+
+
+EXPORTERS = {
+    'jsonl': iter_jsonl,
+    'csv': iter_csv,
+}
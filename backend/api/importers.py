@@ -0,0 +1,253 @@
+import csv
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+
+from .anomalies import score_new_expenses
+from .cache import invalidate_user_cache
+from .metrics import rebuild_metrics
+from .models import Category, Transaction
+from .statistics import rebuild_statistics
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+MAX_AMOUNT = Decimal('99999999.99')
+DATE_FORMATS = ('%Y-%m-%d', '%Y%m%d', '%m/%d/%Y', '%m/%d/%y', '%d.%m.%Y')
+TRANSACTION_TYPES = dict(Transaction.TRANSACTION_TYPES)
+DEFAULT_ENCODING = 'utf-8-sig'
+# Raised while reading a file that is not in the expected encoding or format
+READ_ERRORS = (UnicodeDecodeError, csv.Error)
+
+
+def parse_csv(stream):
+    """Yield (row_number, record) pairs from a CSV file with a header row.
+
+    Recognised columns are date, amount, transaction_type, category and
+    description; a negative amount without a type is treated as an expense.
+    """
+    reader = csv.DictReader(stream)
+    for row_number, row in enumerate(reader, start=1):
+        yield row_number, {
+            (key or '').strip().lower(): (value or '').strip()
+            for key, value in row.items()
+        }
+
+
+def parse_ofx(stream):
+    """Yield (row_number, record) pairs from the STMTTRN blocks of an OFX file.
+
+    Handles both SGML (unclosed tags) and XML flavours line by line, so the
+    whole document is never held in memory.
+    """
+    tag_pattern = re.compile(r'<([A-Z.]+)>([^<\r\n]*)')
+    record = None
+    row_number = 0
+    for line in stream:
+        for tag, value in tag_pattern.findall(line):
+            if tag == 'STMTTRN':
+                record = {}
+            elif record is not None and value.strip():
+                record[tag] = value.strip()
+        if record is not None and '</STMTTRN>' in line:
+            row_number += 1
+            yield row_number, {
+                'date': record.get('DTPOSTED', '')[:8],
+                'amount': record.get('TRNAMT', ''),
+                'description': record.get('NAME') or record.get('MEMO', ''),
+            }
+            record = None
+
+
+def parse_qif(stream):
+    """Yield (row_number, record) pairs from a QIF file."""
+    fields = {'D': 'date', 'T': 'amount', 'U': 'amount', 'P': 'description', 'L': 'category'}
+    record = {}
+    row_number = 0
+    for line in stream:
+        line = line.strip()
+        if not line or line.startswith('!'):
+            continue
+        if line == '^':
+            if record:
+                row_number += 1
+                yield row_number, record
+            record = {}
+            continue
+        key = fields.get(line[0])
+        if key:
+            value = line[1:].strip()
+            if key == 'date':
+                value = value.replace("'", '/').replace(' ', '0')
+            elif key == 'amount':
+                value = value.replace(',', '')
+            record[key] = value
+        elif line[0] == 'M' and 'description' not in record:
+            record['description'] = line[1:].strip()
+    if record:
+        yield row_number + 1, record
+
+
+PARSERS = {
+    'csv': parse_csv,
+    'ofx': parse_ofx,
+    'qif': parse_qif,
+}
+
+
+def detect_format(filename, default='csv'):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension if extension in PARSERS else default
+
+
+def _parse_date(value):
+    if isinstance(value, date):
+        return value
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError
+
+
+def validate_record(record):
+    """Return (cleaned_data, errors) for one raw import record."""
+    if not isinstance(record, dict):
+        return {}, {'non_field_errors': ['Expected an object with the transaction fields.']}
+    errors = {}
+    cleaned = {}
+
+    try:
+        amount = Decimal(str(record.get('amount', '')).replace(',', ''))
+        if not amount.is_finite():
+            raise InvalidOperation
+    except InvalidOperation:
+        errors['amount'] = ['A valid number is required.']
+        amount = None
+
+    transaction_type = str(record.get('transaction_type') or '').strip().upper()
+    if transaction_type and transaction_type not in TRANSACTION_TYPES:
+        errors['transaction_type'] = [f'"{transaction_type}" is not a valid choice.']
+    elif amount is not None:
+        if not transaction_type:
+            transaction_type = 'EXPENSE' if amount < 0 else 'INCOME'
+        amount = abs(amount).quantize(Decimal('0.01'))
+        if amount < Decimal('0.01') or amount > MAX_AMOUNT:
+            errors['amount'] = [f'Ensure this value is between 0.01 and {MAX_AMOUNT}.']
+        cleaned['amount'] = amount
+        cleaned['transaction_type'] = transaction_type
+
+    try:
+        cleaned['date'] = _parse_date(record.get('date') or '')
+    except (TypeError, ValueError):
+        errors['date'] = ['Date has wrong format. Use YYYY-MM-DD.']
+
+    cleaned['description'] = str(record.get('description') or '')
+    if not cleaned['description'].strip():
+        errors['description'] = ['This field may not be blank.']
+    cleaned['category'] = str(record.get('category') or '').strip()[:100]
+    return cleaned, errors
+
+
+def _resolve_categories(user, names):
+    """Map category names to ids with one lookup, creating missing ones."""
+    if not names:
+        return {}
+    category_ids = {}
+    for category_id, name in Category.objects.filter(
+        user=user, name__in=names
+    ).order_by('id').values_list('id', 'name'):
+        category_ids.setdefault(name, category_id)
+    missing = [Category(user=user, name=name) for name in names if name not in category_ids]
+    for category in Category.objects.bulk_create(missing):
+        category_ids[category.name] = category.id
+    return category_ids
+
+
+def _readable(records, result):
+    # Yields records until the input ends or can no longer be decoded or
+    # parsed, which is reported as an error of the row that could not be read
+    row_number = 0
+    records = iter(records)
+    while True:
+        try:
+            row_number, record = next(records)
+        except StopIteration:
+            return
+        except READ_ERRORS as exc:
+            result['failed'] += 1
+            result['errors'].append({
+                'row': row_number + 1, 'errors': {'file': [f'The file could not be read: {exc}']}
+            })
+            result['complete'] = False
+            return
+        yield row_number, record
+
+
+def import_transactions(user, records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Validate and bulk insert (row_number, record) pairs for ``user``.
+
+    Records are consumed ``chunk_size`` at a time and each chunk is written in
+    its own database transaction, so memory use does not depend on the input
+    size and an invalid row never aborts the rest of the file. Returns a dict
+    with the created and failed counts plus the first validation errors;
+    ``complete`` is false when the input stopped being readable part way.
+    """
+    result = {'created': 0, 'failed': 0, 'errors': [], 'complete': True}
+    first_date = last_date = None
+    records = _readable(records, result)
+
+    try:
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+
+            valid = []
+            for row_number, record in chunk:
+                cleaned, errors = validate_record(record)
+                if errors:
+                    result['failed'] += 1
+                    if len(result['errors']) < MAX_REPORTED_ERRORS:
+                        result['errors'].append({'row': row_number, 'errors': errors})
+                else:
+                    valid.append(cleaned)
+            if not valid:
+                continue
+
+            with transaction.atomic():
+                category_ids = _resolve_categories(
+                    user, {row['category'] for row in valid if row['category']}
+                )
+                transactions = [
+                    Transaction(
+                        user=user,
+                        category_id=category_ids.get(row['category']),
+                        amount=row['amount'],
+                        transaction_type=row['transaction_type'],
+                        description=row['description'],
+                        date=row['date']
+                    )
+                    for row in valid
+                ]
+                score_new_expenses(user.id, transactions)
+                Transaction.objects.bulk_create(transactions, batch_size=chunk_size)
+
+            result['created'] += len(valid)
+            chunk_first = min(row['date'] for row in valid)
+            chunk_last = max(row['date'] for row in valid)
+            first_date = min(first_date or chunk_first, chunk_first)
+            last_date = max(last_date or chunk_last, chunk_last)
+    finally:
+        # bulk_create bypasses the signals that maintain the daily rollups and
+        # spending statistics and invalidate cached responses. As chunks commit
+        # one by one, this also runs for those committed before a failure.
+        if result['created']:
+            rebuild_metrics(users=[user], start_date=first_date, end_date=last_date)
+            rebuild_statistics(users=[user])
+            invalidate_user_cache(user.id)
+
+    return result
@@ -0,0 +1,247 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    'api_request_duration_seconds': ('Time spent handling the request', DURATION_BUCKETS),
+    'api_request_queries': ('SQL queries executed per request', QUERY_BUCKETS),
+    'api_request_sql_duration_seconds': ('Time spent in SQL per request', DURATION_BUCKETS),
+    'api_request_serialization_duration_seconds': (
+        'Time spent rendering the response body', DURATION_BUCKETS
+    ),
+    'api_response_size_bytes': ('Size of the response body', SIZE_BUCKETS),
+}
+
+
+class QueryRecorder:
+    """Database execute wrapper counting queries and their time.
+
+    Unlike connection.queries this works with DEBUG off and keeps no SQL
+    text beyond a count per distinct statement, used to spot N+1 patterns.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+
+class MetricsRegistry:
+    """In-process request metrics rendered in the Prometheus text format.
+
+    Each server process keeps its own numbers, so scrape every process (or
+    sum them) when running several workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = Counter()
+            self._histograms = {}
+            self._cache_requests = Counter()
+
+    def _observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = {
+                'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0
+            }
+        for position, bound in enumerate(buckets):
+            if value <= bound:
+                histogram['buckets'][position] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+    def observe(self, endpoint, method, status, duration, queries, sql_duration,
+                serialization_duration, size):
+        labels = (('endpoint', endpoint), ('method', method))
+        with self._lock:
+            self._requests[labels + (('status', str(status)),)] += 1
+            self._observe('api_request_duration_seconds', labels, duration)
+            self._observe('api_request_queries', labels, queries)
+            self._observe('api_request_sql_duration_seconds', labels, sql_duration)
+            self._observe(
+                'api_request_serialization_duration_seconds', labels, serialization_duration
+            )
+            self._observe('api_response_size_bytes', labels, size)
+
+    def count_cache(self, name, result):
+        """Count a lookup of the per-user response cache; ``result`` is hit or miss."""
+        with self._lock:
+            self._cache_requests[(('name', name), ('result', result))] += 1
+
+    def cache_requests(self, name, result):
+        with self._lock:
+            return self._cache_requests[(('name', name), ('result', result))]
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        def format_labels(labels, extra=()):
+            pairs = []
+            for name, value in list(labels) + list(extra):
+                value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                pairs.append(f'{name}="{value}"')
+            return '{' + ','.join(pairs) + '}'
+
+        with self._lock:
+            requests = sorted(self._requests.items())
+            cache_requests = sorted(self._cache_requests.items())
+            histograms = sorted(
+                (key, dict(value, buckets=list(value['buckets'])))
+                for key, value in self._histograms.items()
+            )
+
+        lines = [
+            '# HELP api_requests_total Requests handled',
+            '# TYPE api_requests_total counter',
+        ]
+        lines += [
+            f'api_requests_total{format_labels(labels)} {count}' for labels, count in requests
+        ]
+        lines += [
+            '# HELP api_cache_requests_total Per-user response cache lookups',
+            '# TYPE api_cache_requests_total counter',
+        ]
+        lines += [
+            f'api_cache_requests_total{format_labels(labels)} {count}'
+            for labels, count in cache_requests
+        ]
+        for name, (description, buckets) in HISTOGRAMS.items():
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+            for (metric, labels), histogram in histograms:
+                if metric != name:
+                    continue
+                for bound, count in zip(buckets, histogram['buckets']):
+                    lines.append(f'{name}_bucket{format_labels(labels, [("le", bound)])} {count}')
+                lines.append(
+                    f'{name}_bucket{format_labels(labels, [("le", "+Inf")])} '
+                    f'{histogram["count"]}'
+                )
+                lines.append(f'{name}_sum{format_labels(labels)} {histogram["sum"]}')
+                lines.append(f'{name}_count{format_labels(labels)} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+class InstrumentationMiddleware:
+    """Measure every request and report it in Server-Timing and ``metrics``.
+
+    Records the query count and SQL time of all database connections, the
+    time spent rendering the response body and its size, labelled by the
+    resolved view name. With API_N_PLUS_ONE_THRESHOLD set, statements run
+    at least that many times in one request are logged as likely N+1s.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            # Keeps the chain async under ASGI, so async views are not run
+            # through a thread
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'API_INSTRUMENTATION', True):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        request._serialization_duration = 0.0
+        start = time.perf_counter()
+        with self._record_queries(recorder):
+            response = self.get_response(request)
+        return self._finish(request, response, recorder, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'API_INSTRUMENTATION', True):
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        request._serialization_duration = 0.0
+        start = time.perf_counter()
+        # Connections are per thread: the request's queries run in the
+        # thread sync_to_async uses for it, so the wrappers go on its
+        # connections
+        stack = await sync_to_async(self._record_queries)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._finish(request, response, recorder, time.perf_counter() - start)
+
+    def _record_queries(self, recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def _finish(self, request, response, recorder, duration):
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.view_name if match is not None else 'unresolved'
+        serialization = request._serialization_duration
+        size = len(response.content) if not response.streaming else 0
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={recorder.duration * 1000:.2f};desc="{recorder.count} queries"',
+            f'serialize;dur={serialization * 1000:.2f}',
+            f'total;dur={duration * 1000:.2f}',
+        ])
+        metrics.observe(
+            endpoint, request.method, response.status_code, duration,
+            recorder.count, recorder.duration, serialization, size
+        )
+        self._log_repeated_queries(endpoint, request, recorder)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook returns
+        started = time.perf_counter()
+
+        def finished(rendered):
+            request._serialization_duration += time.perf_counter() - started
+
+        response.add_post_render_callback(finished)
+        return response
+
+    def _log_repeated_queries(self, endpoint, request, recorder):
+        threshold = getattr(settings, 'API_N_PLUS_ONE_THRESHOLD', None)
+        if not threshold:
+            return
+        for sql, count in recorder.statements.most_common():
+            if count < threshold:
+                break
+            logger.warning(
+                'Possible N+1 in %s %s (%s): statement ran %d times: %s',
+                request.method, request.path, endpoint, count, sql
+            )
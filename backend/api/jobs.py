@@ -0,0 +1,161 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from ml_models.utils.forecasting import DEFAULT_ENGINE, daily_history
+from ml_models.utils.model_registry import default_registry, transaction_fingerprint
+from ml_models.utils.prediction import (
+    MIN_DATA_POINTS, forecast_with_model, model_key, not_enough_data_response,
+    train_expense_model
+)
+
+from .models import CategoryMetric, FinancialMetric, MLJob, Transaction
+
+
+def enqueue_training(user, engine=None, job_type='EXPENSE_MODEL'):
+    """Queue a model refresh for ``user``, reusing an already pending job."""
+    lookup = {
+        'user': user, 'job_type': job_type, 'engine': engine or DEFAULT_ENGINE,
+        'status': 'PENDING',
+    }
+    try:
+        with transaction.atomic():
+            job, _ = MLJob.objects.get_or_create(**lookup)
+    except IntegrityError:
+        # Another request queued the job between our lookup and insert
+        job = MLJob.objects.get(**lookup)
+    return job
+
+
+def claim_jobs(limit):
+    """Atomically move up to ``limit`` pending jobs to RUNNING and return them."""
+    claimed = []
+    with transaction.atomic():
+        candidates = MLJob.objects.select_for_update(skip_locked=True).filter(
+            status='PENDING'
+        ).order_by('created_at').values_list('id', flat=True)[:limit]
+        for job_id in list(candidates):
+            # The status filter keeps two workers from claiming the same job
+            # on backends without SELECT ... FOR UPDATE (SQLite).
+            if MLJob.objects.filter(id=job_id, status='PENDING').update(
+                status='RUNNING',
+                started_at=timezone.now(),
+                attempts=F('attempts') + 1
+            ):
+                claimed.append(job_id)
+    return list(MLJob.objects.filter(id__in=claimed).order_by('created_at'))
+
+
+def requeue_stale_jobs(stale_after=timedelta(minutes=30)):
+    """Return RUNNING jobs abandoned by a crashed worker to the queue."""
+    stale = MLJob.objects.filter(
+        status='RUNNING', started_at__lt=timezone.now() - stale_after
+    )
+    requeued = 0
+    for job in stale:
+        try:
+            with transaction.atomic():
+                requeued += MLJob.objects.filter(id=job.id, status='RUNNING').update(
+                    status='PENDING'
+                )
+        except IntegrityError:
+            # A newer job for the same user is already pending
+            MLJob.objects.filter(id=job.id).update(
+                status='FAILED', error='Abandoned by worker', finished_at=timezone.now()
+            )
+    return requeued
+
+
+def load_expense_history(user_id):
+    """Return the daily expense history of ``user_id`` from the daily rollups.
+
+    Reads one row per day and category rather than every transaction.
+    Spending without a category is what the daily totals hold beyond the
+    per-category rollups.
+    """
+    daily = FinancialMetric.objects.filter(user_id=user_id).order_by().values_list(
+        'date', Cast('total_expenses', FloatField())
+    )
+    by_category = CategoryMetric.objects.filter(
+        user_id=user_id, total_expenses__gt=0
+    ).order_by().values_list('date', 'category_id', Cast('total_expenses', FloatField()))
+
+    dates, category_ids, amounts = [], [], []
+    categorised = defaultdict(float)
+    for date, category_id, amount in by_category:
+        dates.append(date)
+        category_ids.append(category_id)
+        amounts.append(amount)
+        categorised[date] += amount
+    start = end = None
+    for date, amount in daily:
+        start = min(start or date, date)
+        end = max(end or date, date)
+        remainder = amount - categorised[date]
+        if remainder > 0.005:
+            dates.append(date)
+            category_ids.append(None)
+            amounts.append(remainder)
+    if start is None:
+        return None
+    return daily_history(dates, category_ids, amounts, start, end)
+
+
+def train_user_model(user_id, registry=None, engine=None):
+    """Fit and store the ``engine`` model for ``user_id``; return its fingerprint.
+
+    Runs inside the worker's process pool, so it only takes picklable
+    arguments and does its own queries.
+    """
+    registry = registry or default_registry
+    transactions = Transaction.objects.filter(user_id=user_id)
+    fingerprint = transaction_fingerprint(transactions)
+    if registry.get(model_key(user_id, engine), fingerprint) is None:
+        history = load_expense_history(user_id)
+        if history is None or transactions.count() < MIN_DATA_POINTS:
+            raise ValueError('Not enough historical data to train a model')
+        registry.put(model_key(user_id, engine), fingerprint, train_expense_model(history, engine))
+    return fingerprint
+
+
+def finish_job(job, fingerprint='', error=''):
+    MLJob.objects.filter(id=job.id).update(
+        status='FAILED' if error else 'DONE',
+        fingerprint=fingerprint,
+        error=error,
+        finished_at=timezone.now()
+    )
+
+
+def expense_predictions(user, days_ahead=30, registry=None, engine=None):
+    """Serve predictions without training in the request.
+
+    Uses the model for the current data when it exists. Otherwise a refresh
+    is queued for the ML worker and the last good model answers in the
+    meantime, flagged with ``stale``. With no model at all the response only
+    reports the queued job.
+    """
+    registry = registry or default_registry
+    transactions = Transaction.objects.filter(user=user)
+    fingerprint = transaction_fingerprint(transactions)
+
+    bundle = registry.get(model_key(user.id, engine), fingerprint)
+    if bundle is not None:
+        return forecast_with_model(bundle, days_ahead)
+
+    data_points = transactions.count()
+    if data_points < MIN_DATA_POINTS:
+        return not_enough_data_response(data_points)
+
+    job = enqueue_training(user, engine)
+    _, bundle = registry.latest(model_key(user.id, engine))
+    if bundle is None:
+        return {'status': 'training', 'job_id': job.id}
+    response = forecast_with_model(bundle, days_ahead)
+    response['stale'] = True
+    response['job_id'] = job.id
+    return response
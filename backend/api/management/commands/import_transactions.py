@@ -0,0 +1,53 @@
+import codecs
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from api.importers import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_ENCODING, PARSERS, READ_ERRORS, detect_format,
+    import_transactions
+)
+
+
+class Command(BaseCommand):
+    help = 'Import transactions for a user from a CSV, OFX or QIF file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument('--user', required=True, help='Username to import for')
+        parser.add_argument('--format', choices=sorted(PARSERS),
+                            help='Input format (defaults to the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Rows validated and inserted per database transaction')
+        parser.add_argument('--encoding', default=DEFAULT_ENCODING,
+                            help='Text encoding of the file, e.g. latin-1')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["user"]}" does not exist')
+
+        import_format = options['format'] or detect_format(options['path'])
+        try:
+            codecs.lookup(options['encoding'])
+        except LookupError:
+            raise CommandError(f'Unknown encoding "{options["encoding"]}"')
+        try:
+            with open(options['path'], encoding=options['encoding'], newline='') as stream:
+                result = import_transactions(
+                    user, PARSERS[import_format](stream), chunk_size=options['chunk_size']
+                )
+        except (OSError,) + READ_ERRORS as exc:
+            raise CommandError(str(exc))
+
+        for error in result['errors']:
+            self.stderr.write(f'Row {error["row"]}: {error["errors"]}')
+        summary = f'Imported {result["created"]} transactions ({result["failed"]} rows failed)'
+        if not result['complete']:
+            row = next(error['row'] for error in result['errors'] if 'file' in error['errors'])
+            raise CommandError(
+                f'{summary}; stopped at row {row}, which could not be read. '
+                f'Pass --encoding if the file is not UTF-8.'
+            )
+        self.stdout.write(self.style.SUCCESS(summary))
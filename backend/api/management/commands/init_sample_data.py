@@ -1,101 +1,249 @@
 from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from api.anomalies import score_new_expenses
+from api.cache import bump_user_versions
+from api.metrics import rebuild_metrics
+from api.statistics import rebuild_statistics
 from api.models import Category, Transaction, Budget, SavingsGoal
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
+from itertools import islice
+import calendar
+import heapq
 import random
 from decimal import Decimal
 
+CATEGORIES = [
+    'Groceries',
+    'Rent',
+    'Utilities',
+    'Transportation',
+    'Entertainment',
+    'Healthcare',
+    'Shopping',
+    'Dining Out',
+    'Savings',
+    'Investment'
+]
+
+# (category, day of month, typical amount) paid every month
+RECURRING_EXPENSES = [
+    ('Rent', 1, 1200),
+    ('Utilities', 5, 150),
+    ('Entertainment', 12, 15),
+    ('Savings', 28, 300),
+]
+
+# Typical amount of a single discretionary purchase per category
+DISCRETIONARY_EXPENSES = {
+    'Groceries': 60,
+    'Transportation': 25,
+    'Entertainment': 40,
+    'Healthcare': 80,
+    'Shopping': 70,
+    'Dining Out': 35,
+}
+
+# Spending multiplier per calendar month: holidays, summer travel and the
+# January slowdown.
+SEASONALITY = {1: 0.8, 2: 0.9, 7: 1.15, 8: 1.2, 11: 1.2, 12: 1.5}
+WEEKEND_CATEGORIES = {'Entertainment', 'Dining Out', 'Shopping'}
+
+
 class Command(BaseCommand):
     help = 'Initialize sample data for testing'
 
-    def handle(self, *args, **kwargs):
-        # Create test user
-        user, created = User.objects.get_or_create(
-            username='testuser',
-            email='test@example.com'
-        )
-        if created:
-            user.set_password('testpass123')
-            user.save()
-            self.stdout.write(self.style.SUCCESS('Created test user'))
-
-        # Create categories
-        categories = [
-            'Groceries',
-            'Rent',
-            'Utilities',
-            'Transportation',
-            'Entertainment',
-            'Healthcare',
-            'Shopping',
-            'Dining Out',
-            'Savings',
-            'Investment'
-        ]
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1,
+                            help='Number of sample users to create')
+        parser.add_argument('--transactions-per-user', type=int, default=100,
+                            help='Number of transactions generated for each user')
+        parser.add_argument('--years', type=float, default=0.25,
+                            help='Length of the generated history in years')
+        parser.add_argument('--categories', type=int, default=len(CATEGORIES),
+                            help='Number of categories per user')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Random seed for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows per bulk insert')
 
-        created_categories = []
-        for cat_name in categories:
-            category, created = Category.objects.get_or_create(
-                name=cat_name,
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        users = self.create_users(options['users'])
+
+        today = timezone.now().date()
+        start_date = today - timedelta(days=max(1, int(options['years'] * 365)))
+        category_names = (CATEGORIES + [
+            f'Category {i}' for i in range(len(CATEGORIES) + 1, options['categories'] + 1)
+        ])[:options['categories']]
+
+        pending = []
+        created = 0
+        for user in users:
+            categories = self.create_categories(user, category_names)
+            transactions = self.generate_transactions(
+                rng, user, categories, start_date, today, options['transactions_per_user']
+            )
+            while True:
+                batch = list(islice(transactions, batch_size))
+                if not batch:
+                    break
+                # Score in date order, as if the history had been entered live
+                score_new_expenses(user.id, batch)
+                pending.extend(batch)
+                if len(pending) >= batch_size:
+                    Transaction.objects.bulk_create(pending, batch_size=batch_size)
+                    created += len(pending)
+                    pending = []
+            self.create_budgets_and_goals(rng, user, categories, today)
+        Transaction.objects.bulk_create(pending, batch_size=batch_size)
+        created += len(pending)
+        self.stdout.write(self.style.SUCCESS(f'Created {created} sample transactions'))
+
+        # bulk_create bypasses the signals that maintain the daily rollups and
+        # spending statistics and invalidate cached responses
+        rebuild_metrics(users=users, start_date=start_date, end_date=today)
+        rebuild_statistics(users=users)
+        bump_user_versions([user.id for user in users])
+        self.stdout.write(self.style.SUCCESS('Sample data initialization completed'))
+
+    def create_users(self, count):
+        usernames = ['testuser'] + [f'testuser{i}' for i in range(2, count + 1)]
+        usernames = usernames[:count]
+        existing = set(User.objects.filter(
+            username__in=usernames
+        ).values_list('username', flat=True))
+        # Hash the shared password once; PBKDF2 per user would dominate.
+        password = make_password('testpass123')
+        User.objects.bulk_create([
+            User(username=username, email=f'{username}@example.com', password=password)
+            for username in usernames if username not in existing
+        ], batch_size=1000)
+        if len(existing) < len(usernames):
+            self.stdout.write(self.style.SUCCESS(
+                f'Created {len(usernames) - len(existing)} test users'
+            ))
+        return list(User.objects.filter(username__in=usernames).order_by('id'))
+
+    def create_categories(self, user, names):
+        categories = {
+            category.name: category
+            for category in Category.objects.filter(user=user, name__in=names)
+        }
+        missing = [
+            Category(
+                name=name,
                 user=user,
-                defaults={'description': f'Expenses related to {cat_name.lower()}'}
+                description=f'Expenses related to {name.lower()}'
             )
-            created_categories.append(category)
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Created category: {cat_name}'))
-
-        # Create transactions
-        start_date = timezone.now() - timedelta(days=90)
-        for i in range(100):
-            date = start_date + timedelta(days=random.randint(0, 90))
-            category = random.choice(created_categories)
-            transaction_type = random.choice(['INCOME', 'EXPENSE'])
-            amount = Decimal(str(round(random.uniform(10, 1000), 2)))
-
-            Transaction.objects.create(
+            for name in names if name not in categories
+        ]
+        for category in Category.objects.bulk_create(missing):
+            categories[category.name] = category
+        return categories
+
+    def generate_transactions(self, rng, user, categories, start_date, end_date, count):
+        """Yield unsaved transactions with monthly bills, salary and seasonal spending.
+
+        Transactions come in date order without being collected first, so
+        memory use does not grow with ``count``.
+        """
+        recurring_names = {name for name, _, _ in RECURRING_EXPENSES} | {'Investment'}
+        discretionary = [
+            (category, DISCRETIONARY_EXPENSES.get(name, 50))
+            for name, category in categories.items() if name not in recurring_names
+        ] or [(category, 50) for category in categories.values()]
+        salary = round(rng.uniform(3000, 7000), 2)
+
+        def transaction(category, amount, transaction_type, description, day):
+            return Transaction(
                 user=user,
                 category=category,
-                amount=amount,
+                amount=Decimal(str(round(max(amount, 0.01), 2))),
                 transaction_type=transaction_type,
-                description=f'Sample {transaction_type.lower()} for {category.name}',
-                date=date
+                description=description,
+                date=day
             )
 
-        self.stdout.write(self.style.SUCCESS('Created sample transactions'))
-
-        # Create budgets
-        for category in created_categories:
-            if category.name not in ['Savings', 'Investment']:
-                Budget.objects.create(
-                    user=user,
-                    category=category,
-                    amount=Decimal(str(round(random.uniform(500, 2000), 2))),
-                    start_date=timezone.now().date().replace(day=1),
-                    end_date=(timezone.now().date().replace(day=1) + timedelta(days=30))
-                )
+        # Monthly salary and bills until the history or the row budget runs
+        # out; a handful per month, so these are listed up front
+        scheduled = []
+        year, month = start_date.year, start_date.month
+        while (year, month) <= (end_date.year, end_date.month) and len(scheduled) < count:
+            days_in_month = calendar.monthrange(year, month)[1]
+            payments = [(date(year, month, min(25, days_in_month)), None)] + [
+                (date(year, month, min(day_of_month, days_in_month)), name)
+                for name, day_of_month, _ in RECURRING_EXPENSES if name in categories
+            ]
+            scheduled.extend(sorted(
+                (day, name or '') for day, name in payments if start_date <= day <= end_date
+            ))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        scheduled = scheduled[:count]
 
-        self.stdout.write(self.style.SUCCESS('Created sample budgets'))
+        def recurring():
+            amounts = {name: amount for name, _, amount in RECURRING_EXPENSES}
+            for day, name in scheduled:
+                if not name:
+                    yield transaction(None, salary, 'INCOME', 'Monthly salary', day)
+                else:
+                    yield transaction(
+                        categories[name], amounts[name] * rng.uniform(0.95, 1.05), 'EXPENSE',
+                        f'Monthly {name.lower()} payment', day
+                    )
 
-        # Create savings goals
-        goals = [
-            'Emergency Fund',
-            'New Car',
-            'Vacation',
-            'Down Payment'
-        ]
+        yield from heapq.merge(
+            recurring(),
+            self.discretionary_transactions(
+                rng, discretionary, transaction, start_date, end_date, count - len(scheduled)
+            ),
+            key=lambda transaction: transaction.date
+        )
+
+    def discretionary_transactions(self, rng, discretionary, transaction, start_date,
+                                   end_date, count):
+        # Days uniformly distributed over the range, drawn in ascending order:
+        # the largest of n uniforms is U ** (1 / n), the next the largest of
+        # n - 1 uniforms below it, and so on.
+        days = (end_date - start_date).days + 1
+        position = 1.0
+        for remaining in range(count, 0, -1):
+            position *= rng.random() ** (1 / remaining)
+            day = end_date - timedelta(days=min(int(position * days), days - 1))
+            category, typical = rng.choice(discretionary)
+            amount = typical * SEASONALITY.get(day.month, 1.0) * rng.lognormvariate(0, 0.5)
+            if day.weekday() >= 5 and category.name in WEEKEND_CATEGORIES:
+                amount *= 1.4
+            if rng.random() < 0.03:
+                yield transaction(None, amount * 2, 'INCOME', 'Refund', day)
+            else:
+                yield transaction(
+                    category, amount, 'EXPENSE', f'Sample expense for {category.name}', day
+                )
 
-        for goal_name in goals:
-            target_amount = Decimal(str(round(random.uniform(5000, 20000), 2)))
-            current_amount = Decimal(str(round(random.uniform(0, float(target_amount)), 2)))
-            
-            SavingsGoal.objects.create(
+    def create_budgets_and_goals(self, rng, user, categories, today):
+        month_start = today.replace(day=1)
+        Budget.objects.bulk_create([
+            Budget(
                 user=user,
-                name=goal_name,
-                target_amount=target_amount,
-                current_amount=current_amount,
-                target_date=timezone.now().date() + timedelta(days=random.randint(180, 365))
+                category=category,
+                amount=Decimal(str(round(rng.uniform(500, 2000), 2))),
+                start_date=month_start,
+                end_date=month_start + timedelta(days=30)
             )
+            for name, category in categories.items() if name not in ['Savings', 'Investment']
+        ])
 
-        self.stdout.write(self.style.SUCCESS('Created sample savings goals'))
-        self.stdout.write(self.style.SUCCESS('Sample data initialization completed'))
\ No newline at end of file
+        goals = []
+        for goal_name in ['Emergency Fund', 'New Car', 'Vacation', 'Down Payment']:
+            target_amount = Decimal(str(round(rng.uniform(5000, 20000), 2)))
+            goals.append(SavingsGoal(
+                user=user,
+                name=goal_name,
+                target_amount=target_amount,
+                current_amount=Decimal(str(round(rng.uniform(0, float(target_amount)), 2))),
+                target_date=today + timedelta(days=rng.randint(180, 365))
+            ))
+        SavingsGoal.objects.bulk_create(goals)
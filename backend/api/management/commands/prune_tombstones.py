@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from api.sync import prune_tombstones
+from datetime import timedelta
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='Keep tombstones this many days instead of the setting')
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options['days']) if options['days'] is not None else None
+        count = prune_tombstones(older_than)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {count} tombstones'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from api.anomalies import rebuild_anomaly_scores
+from api.cache import bump_user_versions
+from api.metrics import rebuild_metrics
+from api.statistics import rebuild_statistics
+from datetime import date
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily rollups, spending statistics and anomaly scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames',
+                            help='Only rebuild metrics for this username (repeatable)')
+        parser.add_argument('--start', help='First date to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last date to rebuild (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            start_date = date.fromisoformat(options['start']) if options['start'] else None
+            end_date = date.fromisoformat(options['end']) if options['end'] else None
+        except ValueError as exc:
+            raise CommandError(f'Invalid date: {exc}')
+
+        users = None
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+            if not users.exists():
+                raise CommandError('No matching users found')
+
+        count = rebuild_metrics(users=users, start_date=start_date, end_date=end_date)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt metrics for {count} user-days'))
+
+        # Statistics span each user's whole history, so the date range does not apply
+        count = rebuild_statistics(users=users)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} spending statistics'))
+
+        count = rebuild_anomaly_scores(users=users)
+        self.stdout.write(self.style.SUCCESS(f'Rescored {count} expenses'))
+
+        # The rebuilds write in bulk, without the signals that invalidate
+        # cached responses
+        bump_user_versions((users or User.objects.all()).values_list('id', flat=True))
@@ -0,0 +1,58 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connections
+from api.jobs import load_expense_history
+from api.models import Transaction
+from ml_models.utils.model_registry import default_registry, transaction_fingerprint
+from ml_models.utils.forecasting import DEFAULT_ENGINE, ENGINES
+from ml_models.utils.prediction import MIN_DATA_POINTS, fit_many, model_key
+
+
+class Command(BaseCommand):
+    help = 'Refit the expense models of every user whose data changed (nightly job)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of training processes')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Users whose histories are loaded and fitted together')
+        parser.add_argument('--engine', choices=sorted(ENGINES), default=DEFAULT_ENGINE,
+                            help='Forecasting engine to fit')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        engine = options['engine']
+        fitted = skipped = 0
+        user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+
+        for offset in range(0, len(user_ids), options['batch_size']):
+            histories = {}
+            fingerprints = {}
+            for user_id in user_ids[offset:offset + options['batch_size']]:
+                transactions = Transaction.objects.filter(user_id=user_id)
+                fingerprint = transaction_fingerprint(transactions)
+                if default_registry.get(model_key(user_id, engine), fingerprint) is not None:
+                    continue
+                fingerprints[user_id] = fingerprint
+                if transactions.count() < MIN_DATA_POINTS:
+                    skipped += 1
+                    continue
+                histories[user_id] = load_expense_history(user_id)
+
+            # Forked training processes must not share database connections
+            connections.close_all()
+            bundles = fit_many(histories, workers=options['workers'], engine=engine)
+            for user_id, bundle in bundles.items():
+                if bundle is None:
+                    skipped += 1
+                    continue
+                default_registry.put(model_key(user_id, engine), fingerprints[user_id], bundle)
+                fitted += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Fitted {fitted} models ({skipped} users without enough history) '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
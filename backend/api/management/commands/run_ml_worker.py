@@ -0,0 +1,59 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from api.jobs import claim_jobs, finish_job, requeue_stale_jobs, train_user_model
+
+
+class Command(BaseCommand):
+    help = 'Train queued ML models in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of training processes')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait between polls of an empty queue')
+        parser.add_argument('--stale-after', type=int, default=30,
+                            help='Minutes after which a RUNNING job is requeued')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty instead of polling')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        requeued = requeue_stale_jobs(timedelta(minutes=options['stale_after']))
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs')
+
+        # Forked children must not share the parent's database connections
+        connections.close_all()
+        running = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            while True:
+                for job in claim_jobs(workers - len(running)):
+                    running[pool.submit(
+                        train_user_model, job.user_id, engine=job.engine or None
+                    )] = job
+                    self.stdout.write(f'Started job {job.id} for user {job.user_id}')
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, _ = wait(running, timeout=options['poll_interval'],
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    try:
+                        finish_job(job, fingerprint=future.result())
+                        self.stdout.write(self.style.SUCCESS(
+                            f'Finished job {job.id} for user {job.user_id}'
+                        ))
+                    except Exception as exc:
+                        finish_job(job, error=str(exc) or exc.__class__.__name__)
+                        self.stderr.write(f'Failed job {job.id} for user {job.user_id}: {exc}')
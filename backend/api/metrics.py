@@ -0,0 +1,110 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import Transaction, FinancialMetric, CategoryMetric
+
+SAVINGS_RATE_LIMIT = Decimal('999.99')
+
+
+def savings_rate(total_income, total_expenses):
+    """Return the savings rate percentage, clamped to the model field's range."""
+    if total_income <= 0:
+        return Decimal('0')
+    rate = (Decimal(total_income) - Decimal(total_expenses)) * 100 / Decimal(total_income)
+    rate = max(-SAVINGS_RATE_LIMIT, min(SAVINGS_RATE_LIMIT, rate))
+    return rate.quantize(Decimal('0.01'))
+
+
+def _split_amount(transaction_type, amount):
+    if transaction_type == 'INCOME':
+        return amount, Decimal('0')
+    return Decimal('0'), amount
+
+
+def _adjust(model, lookup, income, expenses):
+    if income > 0 or expenses > 0:
+        metric, _ = model.objects.select_for_update().get_or_create(**lookup)
+    else:
+        # Never create rows for removals: the row may already be gone because
+        # its user is being deleted in the same cascade.
+        metric = model.objects.select_for_update().filter(**lookup).first()
+        if metric is None:
+            return
+    metric.total_income += income
+    metric.total_expenses += expenses
+    if model is FinancialMetric:
+        metric.savings_rate = savings_rate(metric.total_income, metric.total_expenses)
+    metric.save()
+
+
+def apply_transaction(user_id, date, category_id, transaction_type, amount, sign=1):
+    """Add (sign=1) or remove (sign=-1) one transaction from the daily rollups."""
+    income, expenses = _split_amount(transaction_type, Decimal(amount) * sign)
+    with transaction.atomic():
+        _adjust(FinancialMetric, {'user_id': user_id, 'date': date}, income, expenses)
+        if category_id is not None:
+            _adjust(
+                CategoryMetric,
+                {'user_id': user_id, 'date': date, 'category_id': category_id},
+                income, expenses
+            )
+
+
+def rebuild_metrics(users=None, start_date=None, end_date=None, batch_size=1000):
+    """Recompute the daily rollups from raw transactions for a date range.
+
+    ``users`` may be a queryset or list of users (or ids); ``None`` means all.
+    Returns the number of (user, date) rows written.
+    """
+    filters = {}
+    if users is not None:
+        filters['user__in'] = users
+    if start_date is not None:
+        filters['date__gte'] = start_date
+    if end_date is not None:
+        filters['date__lte'] = end_date
+
+    daily = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    by_category = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    totals = Transaction.objects.filter(**filters).values(
+        'user_id', 'date', 'category_id', 'transaction_type'
+    ).annotate(total=Sum('amount')).order_by()
+
+    for row in totals.iterator():
+        income, expenses = _split_amount(row['transaction_type'], row['total'])
+        key = (row['user_id'], row['date'])
+        daily[key][0] += income
+        daily[key][1] += expenses
+        if row['category_id'] is not None:
+            category_key = key + (row['category_id'],)
+            by_category[category_key][0] += income
+            by_category[category_key][1] += expenses
+
+    with transaction.atomic():
+        FinancialMetric.objects.filter(**filters).delete()
+        CategoryMetric.objects.filter(**filters).delete()
+        FinancialMetric.objects.bulk_create([
+            FinancialMetric(
+                user_id=user_id,
+                date=date,
+                total_income=income,
+                total_expenses=expenses,
+                savings_rate=savings_rate(income, expenses)
+            )
+            for (user_id, date), (income, expenses) in daily.items()
+        ], batch_size=batch_size)
+        CategoryMetric.objects.bulk_create([
+            CategoryMetric(
+                user_id=user_id,
+                date=date,
+                category_id=category_id,
+                total_income=income,
+                total_expenses=expenses
+            )
+            for (user_id, date, category_id), (income, expenses) in by_category.items()
+        ], batch_size=batch_size)
+
+    return len(daily)
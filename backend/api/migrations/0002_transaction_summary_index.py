@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "date", "transaction_type", "category"],
+                name="api_txn_user_date_type_cat",
+            ),
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:28
+
+import django.db.models.deletion
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_metrics(apps, schema_editor):
+    Transaction = apps.get_model("api", "Transaction")
+    FinancialMetric = apps.get_model("api", "FinancialMetric")
+    CategoryMetric = apps.get_model("api", "CategoryMetric")
+
+    daily = defaultdict(lambda: [Decimal("0"), Decimal("0")])
+    by_category = defaultdict(lambda: [Decimal("0"), Decimal("0")])
+    totals = (
+        Transaction.objects.values("user_id", "date", "category_id", "transaction_type")
+        .annotate(total=Sum("amount"))
+        .order_by()
+    )
+    for row in totals.iterator():
+        index = 0 if row["transaction_type"] == "INCOME" else 1
+        daily[(row["user_id"], row["date"])][index] += row["total"]
+        if row["category_id"] is not None:
+            key = (row["user_id"], row["date"], row["category_id"])
+            by_category[key][index] += row["total"]
+
+    FinancialMetric.objects.all().delete()
+    metrics = []
+    for (user_id, date), (income, expenses) in daily.items():
+        rate = Decimal("0")
+        if income > 0:
+            rate = (income - expenses) * 100 / income
+            rate = max(Decimal("-999.99"), min(Decimal("999.99"), rate))
+        metrics.append(
+            FinancialMetric(
+                user_id=user_id,
+                date=date,
+                total_income=income,
+                total_expenses=expenses,
+                savings_rate=rate.quantize(Decimal("0.01")),
+            )
+        )
+    FinancialMetric.objects.bulk_create(metrics, batch_size=1000)
+    CategoryMetric.objects.bulk_create(
+        [
+            CategoryMetric(
+                user_id=user_id,
+                date=date,
+                category_id=category_id,
+                total_income=income,
+                total_expenses=expenses,
+            )
+            for (user_id, date, category_id), (income, expenses) in by_category.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_transaction_summary_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryMetric",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "total_income",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10),
+                ),
+                (
+                    "total_expenses",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="api.category"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("user", "date", "category")},
+            },
+        ),
+        migrations.RunPython(backfill_metrics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Cast, ExtractMonth, ExtractWeekDay
+
+
+def backfill_statistics(apps, schema_editor):
+    Transaction = apps.get_model("api", "Transaction")
+    SpendingStatistic = apps.get_model("api", "SpendingStatistic")
+
+    expenses = Transaction.objects.filter(transaction_type="EXPENSE")
+    amount = Cast("amount", FloatField())
+    groupings = [
+        ("ALL", Cast(0, FloatField())),
+        ("MONTH", ExtractMonth("date")),
+        # ExtractWeekDay counts from Sunday=1; convert to Monday=0
+        ("WEEKDAY", (ExtractWeekDay("date") + 5) % 7),
+        ("CATEGORY", F("category_id")),
+    ]
+    statistics = []
+    for dimension, key_expression in groupings:
+        queryset = expenses.annotate(group_key=key_expression)
+        if dimension == "CATEGORY":
+            queryset = queryset.filter(category_id__isnull=False)
+        grouped = (
+            queryset.values("user_id", "group_key")
+            .annotate(
+                count=Count("id"),
+                total=Sum("amount"),
+                float_total=Sum(amount),
+                squares=Sum(amount * amount),
+            )
+            .order_by()
+        )
+        for row in grouped.iterator():
+            mean = row["float_total"] / row["count"]
+            statistics.append(
+                SpendingStatistic(
+                    user_id=row["user_id"],
+                    dimension=dimension,
+                    key=int(row["group_key"]),
+                    count=row["count"],
+                    total=row["total"],
+                    mean=mean,
+                    m2=max(0.0, row["squares"] - row["count"] * mean * mean),
+                )
+            )
+    SpendingStatistic.objects.bulk_create(statistics, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_mljob"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SpendingStatistic",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("ALL", "All expenses"),
+                            ("MONTH", "Calendar month"),
+                            ("WEEKDAY", "Day of week"),
+                            ("CATEGORY", "Category"),
+                        ],
+                        max_length=8,
+                    ),
+                ),
+                ("key", models.BigIntegerField(default=0)),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("mean", models.FloatField(default=0)),
+                ("m2", models.FloatField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "transaction_type", "amount"],
+                name="api_txn_user_type_amount",
+            ),
+        ),
+        migrations.AddField(
+            model_name="spendingstatistic",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="spendingstatistic",
+            unique_together={("user", "dimension", "key")},
+        ),
+        migrations.RunPython(backfill_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_spendingstatistic"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnomalyBaseline",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.BigIntegerField(default=0)),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("mean", models.FloatField(default=0)),
+                ("variance", models.FloatField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="anomaly_score",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "anomaly_score"], name="api_txn_user_anomaly"
+            ),
+        ),
+        migrations.AddField(
+            model_name="anomalybaseline",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="anomalybaseline",
+            unique_together={("user", "key")},
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_transaction_anomaly_score"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="mljob",
+            name="api_mljob_one_pending_per_user",
+        ),
+        migrations.AddField(
+            model_name="mljob",
+            name="engine",
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name="mljob",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "PENDING")),
+                fields=("user", "job_type", "engine"),
+                name="api_mljob_one_pending_per_user",
+            ),
+        ),
+    ]
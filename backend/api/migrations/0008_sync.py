@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_category_updated_at(apps, schema_editor):
+    # Existing categories count as last changed when they were created
+    Category = apps.get_model("api", "Category")
+    Category.objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_mljob_engine"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "entity",
+                    models.CharField(
+                        choices=[
+                            ("transactions", "Transaction"),
+                            ("categories", "Category"),
+                            ("budgets", "Budget"),
+                        ],
+                        max_length=12,
+                    ),
+                ),
+                ("object_id", models.BigIntegerField()),
+                ("deleted_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_category_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="budget",
+            index=models.Index(
+                fields=["user", "updated_at", "id"], name="api_budget_user_updated"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                fields=["user", "updated_at", "id"], name="api_cat_user_updated"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "updated_at", "id"], name="api_txn_user_updated"
+            ),
+        ),
+        migrations.AddField(
+            model_name="tombstone",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tombstone",
+            index=models.Index(
+                fields=["user", "entity", "deleted_at", "id"],
+                name="api_tombstone_user_deleted",
+            ),
+        ),
+    ]
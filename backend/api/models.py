@@ -7,6 +7,7 @@ class Category(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
     def __str__(self):
@@ -14,6 +15,9 @@ class Category(models.Model):
 
     class Meta:
         verbose_name_plural = "Categories"
+        indexes = [
+            models.Index(fields=['user', 'updated_at', 'id'], name='api_cat_user_updated'),
+        ]
 
 class Transaction(models.Model):
     TRANSACTION_TYPES = [
@@ -31,12 +35,28 @@ class Transaction(models.Model):
     transaction_type = models.CharField(max_length=7, choices=TRANSACTION_TYPES)
     description = models.TextField()
     date = models.DateField()
+    # Robust z-score against the user's recent expenses, set by api.anomalies
+    anomaly_score = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.transaction_type} - {self.amount} - {self.date}"
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'date', 'transaction_type', 'category'],
+                name='api_txn_user_date_type_cat'
+            ),
+            models.Index(
+                fields=['user', 'transaction_type', 'amount'],
+                name='api_txn_user_type_amount'
+            ),
+            models.Index(fields=['user', 'anomaly_score'], name='api_txn_user_anomaly'),
+            models.Index(fields=['user', 'updated_at', 'id'], name='api_txn_user_updated'),
+        ]
+
 class Budget(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
@@ -53,6 +73,11 @@ class Budget(models.Model):
     def __str__(self):
         return f"{self.category.name} - {self.amount} ({self.start_date} to {self.end_date})"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at', 'id'], name='api_budget_user_updated'),
+        ]
+
 class SavingsGoal(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
@@ -86,3 +111,115 @@ class FinancialMetric(models.Model):
 
     class Meta:
         unique_together = ['user', 'date']
+
+class CategoryMetric(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    date = models.DateField()
+    total_income = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total_expenses = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Metrics for {self.category.name} on {self.date}"
+
+    class Meta:
+        unique_together = ['user', 'date', 'category']
+
+class MLJob(models.Model):
+    JOB_TYPES = [
+        ('EXPENSE_MODEL', 'Expense model training'),
+    ]
+    STATUSES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    job_type = models.CharField(max_length=20, choices=JOB_TYPES, default='EXPENSE_MODEL')
+    engine = models.CharField(max_length=20, blank=True)  # forecasting engine to fit
+    status = models.CharField(max_length=7, choices=STATUSES, default='PENDING')
+    fingerprint = models.CharField(max_length=64, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.job_type} for user {self.user_id} ({self.status})"
+
+    class Meta:
+        constraints = [
+            # At most one queued job of each type and engine per user
+            models.UniqueConstraint(
+                fields=['user', 'job_type', 'engine'],
+                condition=models.Q(status='PENDING'),
+                name='api_mljob_one_pending_per_user'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='api_mljob_status_created'),
+        ]
+
+class SpendingStatistic(models.Model):
+    DIMENSIONS = [
+        ('ALL', 'All expenses'),
+        ('MONTH', 'Calendar month'),
+        ('WEEKDAY', 'Day of week'),
+        ('CATEGORY', 'Category'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    dimension = models.CharField(max_length=8, choices=DIMENSIONS)
+    key = models.BigIntegerField(default=0)  # month 1-12, weekday 0-6 or category id
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    mean = models.FloatField(default=0)
+    m2 = models.FloatField(default=0)  # sum of squared deviations (Welford)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.dimension} {self.key} statistics for user {self.user_id}"
+
+    class Meta:
+        unique_together = ['user', 'dimension', 'key']
+
+class AnomalyBaseline(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.BigIntegerField(default=0)  # category id, or 0 for all expenses
+    count = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(default=0)  # exponentially decayed
+    variance = models.FloatField(default=0)  # exponentially decayed
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Anomaly baseline {self.key} for user {self.user_id}"
+
+    class Meta:
+        unique_together = ['user', 'key']
+
+class Tombstone(models.Model):
+    """Records a deleted row so sync clients can drop their copy."""
+    ENTITIES = [
+        ('transactions', 'Transaction'),
+        ('categories', 'Category'),
+        ('budgets', 'Budget'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    entity = models.CharField(max_length=12, choices=ENTITIES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Deleted {self.entity} {self.object_id} of user {self.user_id}"
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'entity', 'deleted_at', 'id'], name='api_tombstone_user_deleted'
+            ),
+        ]
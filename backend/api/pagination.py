@@ -0,0 +1,106 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """Page-number pagination with an opt-in keyset (cursor) mode.
+
+    Sending a ``cursor`` query parameter (empty for the first page) switches
+    to keyset pagination over the view's ``keyset_ordering``, e.g.
+    ``('-date', '-id')``. Each page is fetched with a ``WHERE (date, id) <
+    (last_date, last_id)`` style filter instead of an OFFSET, and no COUNT
+    query is run, so every page costs the same and rows inserted meanwhile
+    never shift the results.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.ordering = tuple(getattr(view, 'keyset_ordering', ('-id',)))
+        page_size = self.get_page_size(request)
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            queryset = queryset.filter(self._after(queryset.model, self.decode_cursor(cursor)))
+
+        rows = list(queryset.order_by(*self.ordering)[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.last_position = self._position(rows[-1]) if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.last_position)
+        )
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        return None
+
+    def encode_cursor(self, position):
+        payload = json.dumps(position, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            position = json.loads(payload)
+        except (ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def _position(self, instance):
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip('-'))
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return position
+
+    def _after(self, model, position):
+        """Build the row-value comparison that selects rows after ``position``."""
+        try:
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from .models import Category, Transaction, Budget, SavingsGoal, FinancialMetric
+from django.contrib.auth.password_validation import validate_password
+from .models import Category, Transaction, Budget, SavingsGoal, FinancialMetric, MLJob
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,6 +10,35 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('id', 'username', 'email', 'first_name', 'last_name')
         read_only_fields = ('id',)
 
+class RegisterSerializer(serializers.ModelSerializer):
+    password = serializers.CharField(write_only=True, style={'input_type': 'password'})
+
+    class Meta:
+        model = User
+        fields = ('username', 'email', 'password', 'first_name', 'last_name')
+
+    def validate(self, attrs):
+        validate_password(attrs['password'], User(**{
+            key: value for key, value in attrs.items() if key != 'password'
+        }))
+        return attrs
+
+    def create(self, validated_data):
+        return User.objects.create_user(**validated_data)
+
+class LoginSerializer(serializers.Serializer):
+    username = serializers.CharField()
+    password = serializers.CharField(style={'input_type': 'password'})
+
+    def validate(self, attrs):
+        user = authenticate(
+            self.context.get('request'), username=attrs['username'], password=attrs['password']
+        )
+        if user is None:
+            raise serializers.ValidationError('Invalid username or password.')
+        attrs['user'] = user
+        return attrs
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -24,7 +55,7 @@ class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at', 'user')
+        read_only_fields = ('created_at', 'updated_at', 'user', 'anomaly_score')
 
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
@@ -60,4 +91,11 @@ class FinancialMetricSerializer(serializers.ModelSerializer):
     class Meta:
         model = FinancialMetric
         fields = '__all__'
-        read_only_fields = ('created_at', 'user')
\ No newline at end of file
+        read_only_fields = ('created_at', 'user')
+
+class MLJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MLJob
+        fields = ('id', 'job_type', 'engine', 'status', 'fingerprint', 'error', 'attempts',
+                  'created_at', 'started_at', 'finished_at')
+        read_only_fields = fields
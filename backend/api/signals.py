@@ -0,0 +1,119 @@
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .anomalies import drop_category_baseline, record_expense, score_expense
+from .authentication import user_cache
+from .cache import invalidate_user_cache
+from .metrics import apply_transaction
+from .models import Budget, Category, FinancialMetric, SavingsGoal, Tombstone, Transaction
+from .statistics import apply_expense, drop_category_statistics
+
+ROLLUP_FIELDS = ('user_id', 'date', 'category_id', 'transaction_type', 'amount')
+SCORED_FIELDS = ('category_id', 'transaction_type', 'amount')
+SYNCED_MODELS = {Transaction: 'transactions', Category: 'categories', Budget: 'budgets'}
+# Models whose rows the cached API responses are computed from
+CACHED_MODELS = (Transaction, Category, Budget, SavingsGoal, FinancialMetric)
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_transaction(sender, instance, raw=False, **kwargs):
+    """Keep the stored row so post_save can move it out of its old rollup."""
+    instance._previous_rollup = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_rollup = sender.objects.filter(
+        pk=instance.pk
+    ).values(*ROLLUP_FIELDS).first()
+
+
+@receiver(pre_save, sender=Transaction)
+def score_transaction(sender, instance, raw=False, **kwargs):
+    """Score new and re-categorised expenses against the user's baselines."""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_rollup', None)
+    if previous is not None and all(
+        previous[field] == getattr(instance, field) for field in SCORED_FIELDS
+    ):
+        return
+    instance.anomaly_score, instance._anomaly_baselines = score_expense(
+        *(getattr(instance, field) for field in ('user_id',) + SCORED_FIELDS)
+    )
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollups_on_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_rollup', None)
+    if previous is not None:
+        apply_transaction(*(previous[field] for field in ROLLUP_FIELDS), sign=-1)
+        apply_expense(*(previous[field] for field in ROLLUP_FIELDS), sign=-1)
+    apply_transaction(*(getattr(instance, field) for field in ROLLUP_FIELDS))
+    apply_expense(*(getattr(instance, field) for field in ROLLUP_FIELDS))
+    if created:
+        # Decayed baselines cannot forget a value, so only inserts feed them
+        record_expense(
+            *(getattr(instance, field) for field in ('user_id',) + SCORED_FIELDS),
+            baselines=getattr(instance, '_anomaly_baselines', None)
+        )
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    apply_transaction(*(getattr(instance, field) for field in ROLLUP_FIELDS), sign=-1)
+    apply_expense(*(getattr(instance, field) for field in ROLLUP_FIELDS), sign=-1)
+
+
+@receiver(pre_delete, sender=Category)
+def touch_category_transactions(sender, instance, **kwargs):
+    """Mark the transactions that lose their category as changed for sync.
+
+    on_delete=SET_NULL clears the category with an UPDATE that leaves
+    updated_at alone and sends no signals, so the category's statistics and
+    anomaly baseline are dropped here too.
+    """
+    Transaction.objects.filter(category=instance).update(updated_at=timezone.now())
+    drop_category_statistics(instance.user_id, instance.pk)
+    drop_category_baseline(instance.user_id, instance.pk)
+
+
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    """Remember deleted rows so sync/ can report them."""
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is User:
+        return  # the user's tombstones are deleted along with them
+    Tombstone.objects.create(
+        user_id=instance.user_id, entity=SYNCED_MODELS[sender], object_id=instance.pk
+    )
+
+
+for model in SYNCED_MODELS:
+    post_delete.connect(record_tombstone, sender=model, dispatch_uid=f'tombstone-{model.__name__}')
+
+
+def invalidate_cached_responses(sender, instance, origin=None, **kwargs):
+    """Bump the owner's data version, so their cached responses are recomputed."""
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is User:
+        return  # nothing of a deleted user is served again
+    invalidate_user_cache(instance.user_id)
+
+
+for model in CACHED_MODELS:
+    post_save.connect(
+        invalidate_cached_responses, sender=model, dispatch_uid=f'cache-save-{model.__name__}'
+    )
+    post_delete.connect(
+        invalidate_cached_responses, sender=model, dispatch_uid=f'cache-delete-{model.__name__}'
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    """Drop the user from the token authentication cache of this process."""
+    user_cache.evict(instance.pk)
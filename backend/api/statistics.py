@@ -0,0 +1,223 @@
+import math
+from datetime import date as date_type
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, ExtractMonth, ExtractWeekDay
+from django.utils import timezone
+
+from .models import SpendingStatistic, Transaction
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def _keys(date, category_id):
+    keys = [('ALL', 0), ('MONTH', date.month), ('WEEKDAY', date.weekday())]
+    if category_id is not None:
+        keys.append(('CATEGORY', category_id))
+    return keys
+
+
+def _welford(statistic, amount, sign):
+    """Add (sign=1) or remove (sign=-1) ``amount`` from a running mean/variance."""
+    x = float(amount)
+    if sign > 0:
+        statistic.count += 1
+        delta = x - statistic.mean
+        statistic.mean += delta / statistic.count
+        statistic.m2 += delta * (x - statistic.mean)
+    elif statistic.count <= 1:
+        statistic.count, statistic.mean, statistic.m2 = 0, 0.0, 0.0
+    else:
+        previous_mean = statistic.mean
+        statistic.count -= 1
+        statistic.mean = (previous_mean * (statistic.count + 1) - x) / statistic.count
+        statistic.m2 = max(0.0, statistic.m2 - (x - statistic.mean) * (x - previous_mean))
+    statistic.total += Decimal(amount) * sign
+
+
+def apply_expense(user_id, date, category_id, transaction_type, amount, sign=1):
+    """Fold one expense into (sign=1) or out of (sign=-1) the user's statistics."""
+    if transaction_type != 'EXPENSE':
+        return
+    if not isinstance(date, date_type):
+        date = date_type.fromisoformat(str(date))
+    keys = _keys(date, category_id)
+    lookup = Q()
+    for dimension, key in keys:
+        lookup |= Q(dimension=dimension, key=key)
+
+    with transaction.atomic():
+        existing = _lock_statistics(user_id, lookup)
+        if sign < 0 and not existing:
+            # Nothing to remove from, e.g. the user is being deleted
+            return
+        if sign > 0 and len(existing) < len(keys):
+            # First expense of a kind: insert the missing rows, skipping any a
+            # concurrent first expense has just inserted (a plain insert would
+            # fail on the unique key), then lock them all.
+            SpendingStatistic.objects.bulk_create([
+                SpendingStatistic(user_id=user_id, dimension=dimension, key=key)
+                for dimension, key in keys if (dimension, key) not in existing
+            ], ignore_conflicts=True)
+            existing = _lock_statistics(user_id, lookup)
+        now = timezone.now()
+        for dimension, key in keys:
+            statistic = existing.get((dimension, key))
+            if statistic is not None:
+                _welford(statistic, amount, sign)
+                statistic.updated_at = now
+        SpendingStatistic.objects.bulk_update(
+            existing.values(), ['count', 'total', 'mean', 'm2', 'updated_at']
+        )
+
+
+def _lock_statistics(user_id, lookup):
+    return {
+        (statistic.dimension, statistic.key): statistic
+        for statistic in SpendingStatistic.objects.select_for_update().filter(
+            lookup, user_id=user_id
+        )
+    }
+
+
+def drop_category_statistics(user_id, category_id):
+    """Drop the statistics of a category whose expenses become uncategorised.
+
+    The ALL, MONTH and WEEKDAY rows already count those expenses, so only
+    the CATEGORY row goes.
+    """
+    SpendingStatistic.objects.filter(
+        user_id=user_id, dimension='CATEGORY', key=category_id
+    ).delete()
+
+
+def compute_statistics(user_ids=None):
+    """Build unsaved statistics rows for ``user_ids`` (all users if None) in SQL."""
+    expenses = Transaction.objects.filter(transaction_type='EXPENSE')
+    if user_ids is not None:
+        expenses = expenses.filter(user_id__in=user_ids)
+    amount = Cast('amount', FloatField())
+    groupings = [
+        ('ALL', None),
+        ('MONTH', ExtractMonth('date')),
+        # ExtractWeekDay counts from Sunday=1; convert to Monday=0
+        ('WEEKDAY', (ExtractWeekDay('date') + 5) % 7),
+        ('CATEGORY', F('category_id')),
+    ]
+
+    rows = []
+    for dimension, key_expression in groupings:
+        queryset = expenses
+        if key_expression is None:
+            queryset = queryset.annotate(group_key=Cast(0, FloatField()))
+        else:
+            queryset = queryset.annotate(group_key=key_expression)
+        if dimension == 'CATEGORY':
+            queryset = queryset.filter(category_id__isnull=False)
+        grouped = queryset.values('user_id', 'group_key').annotate(
+            count=Count('id'),
+            total=Sum('amount'),
+            float_total=Sum(amount),
+            squares=Sum(amount * amount),
+        ).order_by()
+        for row in grouped.iterator():
+            mean = row['float_total'] / row['count']
+            rows.append(SpendingStatistic(
+                user_id=row['user_id'],
+                dimension=dimension,
+                key=int(row['group_key']),
+                count=row['count'],
+                total=row['total'],
+                mean=mean,
+                m2=max(0.0, row['squares'] - row['count'] * mean * mean),
+            ))
+    return rows
+
+
+def rebuild_statistics(users=None, batch_size=1000):
+    """Recompute the spending statistics of ``users`` (all if None) from scratch."""
+    user_ids = None
+    if users is not None:
+        user_ids = [getattr(user, 'pk', user) for user in users]
+    rows = compute_statistics(user_ids)
+    with transaction.atomic():
+        existing = SpendingStatistic.objects.all()
+        if user_ids is not None:
+            existing = existing.filter(user_id__in=user_ids)
+        existing.delete()
+        SpendingStatistic.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def _std(statistic):
+    if statistic.count < 2:
+        return 0.0
+    return math.sqrt(statistic.m2 / (statistic.count - 1))
+
+
+def analysis_from_statistics(user):
+    """Answer analyze_spending_patterns from the stored statistics.
+
+    Everything except the unusual-expense examples comes from at most a
+    couple of dozen statistics rows; the examples use an indexed lookup of
+    the expenses above the threshold.
+    """
+    statistics = {}
+    for statistic in SpendingStatistic.objects.filter(user=user, count__gt=0):
+        statistics.setdefault(statistic.dimension, {})[statistic.key] = statistic
+    if 'ALL' not in statistics:
+        if not Transaction.objects.filter(user=user).exists():
+            return {'error': 'No transaction data available'}
+        return {'error': 'No expense data available'}
+
+    months = statistics.get('MONTH', {})
+    weekdays = statistics.get('WEEKDAY', {})
+    categories = statistics.get('CATEGORY', {})
+    month_keys = sorted(months)
+    top_categories = sorted(categories.values(), key=lambda s: (-s.total, s.key))[:3]
+
+    overall = statistics['ALL'][0]
+    threshold = overall.mean + 2 * _std(overall)
+    unusual = Transaction.objects.filter(
+        user=user, transaction_type='EXPENSE', amount__gt=Decimal(repr(threshold))
+    )
+
+    return {
+        'monthly_patterns': {
+            'highest_spending_month': max(month_keys, key=lambda m: months[m].total),
+            'lowest_spending_month': min(month_keys, key=lambda m: months[m].total),
+            'average_monthly_expenses': round(
+                sum(months[m].mean for m in month_keys) / len(month_keys), 2
+            )
+        },
+        'daily_patterns': {
+            'highest_spending_day': DAY_NAMES[max(
+                sorted(weekdays), key=lambda d: weekdays[d].mean
+            )],
+            'spending_by_day': {
+                DAY_NAMES[day]: round(weekdays[day].mean, 2) for day in sorted(weekdays)
+            }
+        },
+        'category_insights': {
+            'top_spending_categories': [
+                {'category_id': statistic.key, 'total_amount': round(float(statistic.total), 2)}
+                for statistic in top_categories
+            ]
+        },
+        'unusual_expenses': {
+            'threshold': round(threshold, 2),
+            'count': unusual.count(),
+            'examples': [
+                {
+                    'date': transaction_date.strftime('%Y-%m-%d'),
+                    'amount': round(float(amount), 2),
+                    'category_id': category_id
+                }
+                for transaction_date, amount, category_id in unusual.order_by('id').values_list(
+                    'date', 'amount', 'category_id'
+                )[:5]
+            ]
+        }
+    }
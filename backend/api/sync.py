@@ -0,0 +1,160 @@
+import base64
+import json
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Tombstone
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class ExpiredCursor(InvalidCursor):
+    pass
+
+
+def _retention():
+    return timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 90))
+
+
+def _overlap():
+    return timedelta(seconds=getattr(settings, 'SYNC_OVERLAP_SECONDS', 30))
+
+
+def encode_cursor(cursor):
+    payload = json.dumps(cursor, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    """Return the cursor dict encoded in ``value``, or None for an empty value.
+
+    Raises InvalidCursor for malformed cursors and ExpiredCursor for cursors
+    older than the tombstone retention, whose deletes may be gone.
+    """
+    if not value:
+        return None
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+        issued = float(cursor['at'])
+        positions = [
+            None if cursor[key] is None
+            else (datetime.fromisoformat(cursor[key][0]), int(cursor[key][1]))
+            for key in ('updated', 'deleted')
+        ]
+    except (ValueError, TypeError, KeyError, IndexError):
+        raise InvalidCursor('Invalid cursor')
+    if issued < time.time() - _retention().total_seconds():
+        raise ExpiredCursor('Cursor expired')
+    return {
+        'updated': positions[0],
+        'deleted': positions[1],
+        'issued': datetime.fromtimestamp(issued, dt_timezone.utc),
+    }
+
+
+def _after(field, position):
+    if position is None:
+        return Q()
+    timestamp, pk = position
+    # The redundant lower bound lets the (user, updated_at, id) index seek to
+    # the cursor; the OR alone makes SQLite scan every row of the user
+    return Q(**{f'{field}__gte': timestamp}) & (
+        Q(**{f'{field}__gt': timestamp}) | Q(id__gt=pk)
+    )
+
+
+def _behind(field, position, since):
+    # Rows at or before the position, stamped ``since`` or later
+    timestamp, pk = position
+    return Q(**{f'{field}__gte': since, f'{field}__lte': timestamp}) & (
+        Q(**{f'{field}__lt': timestamp}) | Q(id__lte=pk)
+    )
+
+
+def _overlapping(queryset, field, position, cursor, limit):
+    # Timestamps are taken when a row is saved, not when its transaction
+    # commits, so a row can become visible behind a cursor that has already
+    # passed it. Such rows were saved less than the overlap before the cursor
+    # was issued; they are read again, newest first, and clients upsert them.
+    if position is None:
+        return []
+    since = cursor['issued'] - _overlap()
+    if since > position[0]:
+        return []
+    rows = queryset.filter(_behind(field, position, since)).order_by(f'-{field}', '-id')
+    return list(rows[:limit])[::-1]
+
+
+def _position(timestamp, pk):
+    return [timestamp.isoformat(), pk]
+
+
+def changes(queryset, user, entity, cursor=None, limit=DEFAULT_LIMIT):
+    """Return the rows and deletes of ``entity`` since ``cursor``.
+
+    ``queryset`` holds the user's rows of the entity. Rows come in
+    (updated_at, id) order and deletes from the tombstones in (deleted_at,
+    id) order, at most ``limit`` of each, so the work done depends on the
+    number of changes rather than the size of the history. Returns a dict
+    with ``updated`` (model instances), ``deleted`` (ids), ``cursor`` and
+    ``has_more``. Without a cursor every row is returned and deletes start
+    from now. Rows and deletes stamped shortly before the cursor are sent
+    again (see _overlapping), so clients must apply them idempotently.
+    """
+    issued = time.time()
+    rows = list(queryset.filter(
+        _after('updated_at', cursor and cursor['updated'])
+    ).order_by('updated_at', 'id')[:limit + 1])
+    tombstones = Tombstone.objects.filter(user=user, entity=entity)
+    if cursor is None:
+        latest = tombstones.order_by('-deleted_at', '-id').values_list('deleted_at', 'id').first()
+        deleted, deleted_position = [], latest and _position(*latest)
+    else:
+        deleted = list(tombstones.filter(
+            _after('deleted_at', cursor['deleted'])
+        ).order_by('deleted_at', 'id').values_list('deleted_at', 'id', 'object_id')[:limit + 1])
+        deleted_position = cursor['deleted'] and _position(*cursor['deleted'])
+
+    has_more = len(rows) > limit or len(deleted) > limit
+    rows, deleted = rows[:limit], deleted[:limit]
+    if rows:
+        updated_position = _position(rows[-1].updated_at, rows[-1].id)
+    else:
+        updated_position = cursor and cursor['updated'] and _position(*cursor['updated'])
+    if deleted:
+        deleted_position = _position(*deleted[-1][:2])
+
+    if cursor is not None:
+        # Behind the cursor, so it does not move; keyed by id against duplicates
+        rows = list({
+            row.id: row for row in _overlapping(
+                queryset, 'updated_at', cursor['updated'], cursor, limit
+            ) + rows
+        }.values())
+        deleted = _overlapping(
+            tombstones.values_list('deleted_at', 'id', 'object_id'), 'deleted_at',
+            cursor['deleted'], cursor, limit
+        ) + deleted
+    return {
+        'updated': rows,
+        'deleted': list(dict.fromkeys(object_id for _, _, object_id in deleted)),
+        'cursor': encode_cursor({
+            'updated': updated_position, 'deleted': deleted_position, 'at': issued
+        }),
+        'has_more': has_more,
+    }
+
+
+def prune_tombstones(older_than=None):
+    """Delete tombstones past the retention; their cursors have expired anyway."""
+    cutoff = timezone.now() - (older_than or _retention())
+    return Tombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
@@ -0,0 +1,94 @@
+"""Worker process for the concurrency tests in test_database.
+
+Run as ``python -m api.tests.concurrent_writer <command> ...`` from the
+backend directory, with DATABASE_URL selecting the database:
+
+- ``setup`` creates a user with a category and prints its id
+- ``write <user id> <count>`` prints ``ready``, waits for a line on stdin and
+  then writes ``count`` transactions, updating every fifth one
+- ``check <user id>`` prints the transaction totals next to the rollups
+- ``cleanup <user id>`` deletes the user and its data
+"""
+import json
+import os
+import sys
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+
+def setup():
+    user = User.objects.create_user(username=f'writer-{uuid.uuid4().hex[:12]}')
+    Category.objects.create(user=user, name='Groceries')
+    print(user.id)
+
+
+def write(user_id, count):
+    user = User.objects.get(pk=user_id)
+    category = Category.objects.get(user=user)
+    print('ready', flush=True)
+    sys.stdin.readline()
+    start = date(2024, 1, 1)
+    for i in range(count):
+        # Few dates, so every writer updates the same rollup rows
+        transaction = Transaction.objects.create(
+            user=user,
+            category=category,
+            amount=Decimal(10 + i % 7),
+            # Expenses first: every writer's first one creates the same
+            # statistics rows at once
+            transaction_type='INCOME' if i % 4 == 3 else 'EXPENSE',
+            description=f'Concurrent {i}',
+            date=start + timedelta(days=i % 3)
+        )
+        if i % 5 == 0:
+            transaction.amount += 1
+            transaction.save()
+
+
+def check(user_id):
+    transactions = Transaction.objects.filter(user_id=user_id)
+    totals = {
+        kind: str(transactions.filter(transaction_type=kind).aggregate(
+            total=Sum('amount'))['total'] or 0)
+        for kind in ('INCOME', 'EXPENSE')
+    }
+    metrics = FinancialMetric.objects.filter(user_id=user_id).aggregate(
+        income=Sum('total_income'), expenses=Sum('total_expenses')
+    )
+    statistic = SpendingStatistic.objects.filter(user_id=user_id, dimension='ALL').first()
+    journal_mode = None
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+    print(json.dumps({
+        'transactions': transactions.count(),
+        'expenses': transactions.filter(transaction_type='EXPENSE').count(),
+        'income_total': totals['INCOME'],
+        'expense_total': totals['EXPENSE'],
+        'metric_income': str(metrics['income'] or 0),
+        'metric_expenses': str(metrics['expenses'] or 0),
+        'statistic_count': statistic.count if statistic else 0,
+        'journal_mode': journal_mode,
+    }))
+
+
+def cleanup(user_id):
+    User.objects.filter(pk=user_id).delete()
+
+
+if __name__ == '__main__':
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finance_tracker.settings')
+    import django
+
+    django.setup()
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.db.models import Sum
+
+    from api.models import Category, FinancialMetric, SpendingStatistic, Transaction
+
+    command, *args = sys.argv[1:]
+    {'setup': setup, 'write': write, 'check': check, 'cleanup': cleanup}[command](
+        *map(int, args)
+    )
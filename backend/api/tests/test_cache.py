@@ -0,0 +1,176 @@
+import tempfile
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from finance_tracker.caches import cache_config, check_shared_cache, default_cache_url
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..cache import get_user_version, invalidate_user_cache
+from ..instrumentation import metrics
+from ..models import Budget, Category, FinancialMetric, SavingsGoal, Transaction
+
+
+class CacheConfigTestCase(SimpleTestCase):
+    def test_cache_urls(self):
+        self.assertEqual(
+            cache_config('locmem://', '/srv/app')['BACKEND'],
+            'django.core.cache.backends.locmem.LocMemCache'
+        )
+        config = cache_config('file:///var/tmp/finance-cache', '/srv/app', max_entries=50)
+        self.assertEqual(config['LOCATION'], '/var/tmp/finance-cache')
+        self.assertEqual(config['OPTIONS'], {'MAX_ENTRIES': 50})
+        self.assertEqual(
+            cache_config('file://cache', '/srv/app')['LOCATION'], str(Path('/srv/app/cache'))
+        )
+        config = cache_config('redis://cache.internal:6379/1', '/srv/app', timeout=60)
+        self.assertEqual(config['BACKEND'], 'django.core.cache.backends.redis.RedisCache')
+        self.assertEqual(config['LOCATION'], 'redis://cache.internal:6379/1')
+        self.assertEqual(config['TIMEOUT'], 60)
+        with self.assertRaises(ValueError):
+            cache_config('memcached://localhost', '/srv/app')
+
+    def test_deployments_default_to_a_shared_cache(self):
+        self.assertEqual(default_cache_url(debug=True), 'locmem://')
+        config = cache_config(default_cache_url(debug=False), '/srv/app')
+        self.assertEqual(config['BACKEND'], 'django.core.cache.backends.filebased.FileBasedCache')
+        self.assertEqual(config['LOCATION'], str(Path('/srv/app/cache')))
+
+        locmem = {'default': cache_config('locmem://', '/srv/app')}
+        with override_settings(DEBUG=False, CACHES=locmem):
+            self.assertEqual(
+                [warning.id for warning in check_shared_cache(None)], ['finance_tracker.W001']
+            )
+        with override_settings(DEBUG=True, CACHES=locmem):
+            self.assertEqual(check_shared_cache(None), [])
+        with override_settings(DEBUG=False, CACHES={'default': config}):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class CachedResponseTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.user = User.objects.create_user(username='cacheuser', password='testpass123')
+        self.other = User.objects.create_user(username='otheruser', password='testpass123')
+        self.category = Category.objects.create(name='Groceries', user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def add_transaction(self, amount='12.50'):
+        return Transaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal(amount),
+            transaction_type='EXPENSE', description='Cached', date=date(2025, 3, 4)
+        )
+
+    def test_repeated_requests_are_served_from_the_cache(self):
+        self.add_transaction()
+        paths = [
+            '/api/categories/', f'/api/categories/{self.category.id}/', '/api/transactions/',
+            '/api/transactions/monthly_summary/?month=3&year=2025',
+            '/api/transactions/timeseries/?start=2025-01-01&end=2025-06-30',
+            '/api/budgets/status/', '/api/savings-goals/', '/api/financial-metrics/',
+        ]
+        for path in paths:
+            first = self.client.get(path)
+            self.assertEqual(first.status_code, status.HTTP_200_OK)
+            with self.assertNumQueries(0):
+                second = self.client.get(path)
+            self.assertEqual(second.data, first.data)
+
+            # Conditional requests for an unchanged version answer 304
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=second['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.assertEqual(metrics.cache_requests('category-list', 'miss'), 1)
+        self.assertEqual(metrics.cache_requests('category-list', 'hit'), 2)
+        self.assertIn(
+            'api_cache_requests_total{name="category-list",result="hit"} 2', metrics.render()
+        )
+
+        # Query strings are part of the key
+        response = self.client.get('/api/transactions/?search=nothing')
+        self.assertEqual(response.data['results'], [])
+
+    def test_writes_invalidate_cached_responses(self):
+        writes = {
+            '/api/transactions/': lambda: self.add_transaction('7.00'),
+            '/api/categories/': lambda: Category.objects.create(name='Rent', user=self.user),
+            '/api/budgets/': lambda: Budget.objects.create(
+                user=self.user, category=self.category, amount=Decimal('100.00'),
+                start_date=date(2025, 3, 1), end_date=date(2025, 3, 31)
+            ),
+            '/api/savings-goals/': lambda: SavingsGoal.objects.create(
+                user=self.user, name='Holiday', target_amount=Decimal('500.00'),
+                target_date=date(2026, 1, 1)
+            ),
+            '/api/financial-metrics/': lambda: FinancialMetric.objects.create(
+                user=self.user, date=date(2024, 12, 31)
+            ),
+        }
+        for path, write in writes.items():
+            before = self.client.get(path).data
+            write()
+            after = self.client.get(path).data
+            self.assertEqual(len(after['results']), len(before['results']) + 1, path)
+
+        # Deletes too
+        Category.objects.filter(name='Rent').get().delete()
+        self.assertEqual(len(self.client.get('/api/categories/').data['results']), 1)
+
+        # Other users' writes leave the cache alone
+        self.client.get('/api/categories/')
+        Category.objects.create(name='Elsewhere', user=self.other)
+        with self.assertNumQueries(0):
+            self.client.get('/api/categories/')
+
+    def test_users_never_share_cached_responses(self):
+        Category.objects.create(name='Private', user=self.other)
+        other_client = APIClient()
+        other_client.force_authenticate(user=self.other)
+
+        mine = self.client.get('/api/categories/').data['results']
+        theirs = other_client.get('/api/categories/').data['results']
+        self.assertEqual([c['name'] for c in mine], ['Groceries'])
+        self.assertEqual([c['name'] for c in theirs], ['Private'])
+
+        # Even if two users' keys collided, entries record their owner
+        with mock.patch('api.cache._cache_key', return_value='api:colliding-key'):
+            cache.clear()
+            self.client.get('/api/categories/')
+            theirs = other_client.get('/api/categories/').data['results']
+        self.assertEqual([c['name'] for c in theirs], ['Private'])
+
+        # Anonymous requests are rejected, not answered from someone's entry
+        response = APIClient().get('/api/categories/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_version_is_bumped_again_on_commit(self):
+        version = get_user_version(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                invalidate_user_cache(self.user.id)
+                inside = get_user_version(self.user.id)
+        self.assertGreater(inside, version)
+        self.assertEqual(len(callbacks), 1)
+        self.assertGreater(get_user_version(self.user.id), inside)
+
+    def test_file_backend(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(CACHES={'default': cache_config(
+            f'file://{directory.name}', '/unused'
+        )}):
+            self.add_transaction()
+            first = self.client.get('/api/transactions/')
+            with self.assertNumQueries(0):
+                second = self.client.get('/api/transactions/')
+            self.assertEqual(second.data, first.data)
+            self.assertTrue(any(Path(directory.name).iterdir()))
+            cache.clear()
@@ -0,0 +1,98 @@
+import io
+import random
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Count, Sum
+from django.test import TestCase
+
+from ..cache import get_user_version
+from ..management.commands.init_sample_data import Command as InitSampleData
+from ..models import (
+    Budget, Category, CategoryMetric, FinancialMetric, SavingsGoal, SpendingStatistic,
+    Transaction
+)
+
+SAMPLE_OPTIONS = {
+    'users': 2, 'transactions_per_user': 60, 'years': 0.5, 'categories': 6, 'batch_size': 25
+}
+
+
+class InitSampleDataTestCase(TestCase):
+    def generate(self, seed):
+        call_command('init_sample_data', seed=seed, stdout=io.StringIO(), **SAMPLE_OPTIONS)
+        return list(Transaction.objects.order_by('user__username', 'date', 'id').values_list(
+            'user__username', 'category__name', 'amount', 'transaction_type', 'description',
+            'date', 'anomaly_score'
+        ))
+
+    def clear(self):
+        # Anomaly baselines and statistics go with the users
+        User.objects.all().delete()
+
+    def test_same_seed_generates_the_same_rows(self):
+        first = self.generate(seed=42)
+        self.clear()
+        self.assertEqual(self.generate(seed=42), first)
+        self.clear()
+        self.assertNotEqual(self.generate(seed=7), first)
+
+    def test_row_counts_follow_the_options(self):
+        self.generate(seed=1)
+        users = User.objects.order_by('username')
+        self.assertEqual([user.username for user in users], ['testuser', 'testuser2'])
+        for user in users:
+            self.assertEqual(Transaction.objects.filter(user=user).count(), 60)
+            self.assertEqual(Category.objects.filter(user=user).count(), 6)
+            # Every category but Savings and Investment, which are not among the first 6
+            self.assertEqual(Budget.objects.filter(user=user).count(), 6)
+            self.assertEqual(SavingsGoal.objects.filter(user=user).count(), 4)
+
+    def test_rollups_statistics_and_cache_are_rebuilt(self):
+        existing = User.objects.create_user(username='testuser', password='testpass123')
+        version = get_user_version(existing.id)
+        self.generate(seed=3)
+
+        for user in User.objects.all():
+            transactions = Transaction.objects.filter(user=user)
+            expenses = transactions.filter(transaction_type='EXPENSE')
+            metrics = FinancialMetric.objects.filter(user=user).aggregate(
+                income=Sum('total_income'), expenses=Sum('total_expenses')
+            )
+            self.assertEqual(
+                metrics['income'],
+                transactions.filter(transaction_type='INCOME').aggregate(Sum('amount'))[
+                    'amount__sum']
+            )
+            self.assertEqual(metrics['expenses'], expenses.aggregate(Sum('amount'))['amount__sum'])
+            self.assertEqual(
+                CategoryMetric.objects.filter(user=user).aggregate(Sum('total_expenses'))[
+                    'total_expenses__sum'],
+                expenses.exclude(category=None).aggregate(Sum('amount'))['amount__sum']
+            )
+            self.assertEqual(
+                SpendingStatistic.objects.get(user=user, dimension='ALL').count, expenses.count()
+            )
+            by_category = dict(SpendingStatistic.objects.filter(
+                user=user, dimension='CATEGORY'
+            ).values_list('key', 'count'))
+            self.assertEqual(by_category, dict(expenses.exclude(category=None).values(
+                'category_id').annotate(count=Count('id')).values_list('category_id', 'count')))
+            self.assertTrue(expenses.exclude(anomaly_score=None).exists())
+
+        self.assertGreater(get_user_version(existing.id), version)
+
+    def test_transactions_are_generated_in_date_order(self):
+        user = User.objects.create_user(username='ordered', password='testpass123')
+        categories = InitSampleData().create_categories(user, ['Groceries', 'Rent', 'Shopping'])
+        transactions = list(InitSampleData().generate_transactions(
+            random.Random(5), user, categories, date(2024, 1, 10), date(2024, 12, 20), 500
+        ))
+        self.assertEqual(len(transactions), 500)
+        days = [transaction.date for transaction in transactions]
+        self.assertEqual(days, sorted(days))
+        self.assertTrue(date(2024, 1, 10) <= days[0] and days[-1] <= date(2024, 12, 20))
+        self.assertEqual(
+            sum(transaction.description == 'Monthly salary' for transaction in transactions), 11
+        )
@@ -0,0 +1,213 @@
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from ml_models.utils.forecasting import ENGINES, calendar_features
+from ml_models.utils.model_registry import ModelRegistry
+from ml_models.utils.prediction import (
+    forecast_many, forecast_with_model, iter_transaction_frames, model_key,
+    prepare_daily_history, prepare_transaction_data
+)
+
+from ..jobs import (
+    claim_jobs, enqueue_training, expense_predictions, finish_job, load_expense_history,
+    train_user_model
+)
+from ..metrics import rebuild_metrics
+from ..models import Category, MLJob, Transaction
+
+
+class MLJobTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(name='Groceries', user=self.user)
+        storage = tempfile.TemporaryDirectory()
+        self.addCleanup(storage.cleanup)
+        self.registry = ModelRegistry(storage.name)
+
+    def add_transactions(self, count):
+        today = timezone.now().date()
+        Transaction.objects.bulk_create([
+            Transaction(
+                user=self.user,
+                category=self.category,
+                amount=Decimal(10 + i % 7),
+                transaction_type='EXPENSE',
+                description=f'Expense {i}',
+                date=today - timedelta(days=i)
+            )
+            for i in range(count)
+        ])
+        rebuild_metrics(users=[self.user])
+
+    def test_enqueue_deduplicates_pending_jobs(self):
+        """Test only one pending job is kept per user"""
+        first = enqueue_training(self.user)
+        self.assertEqual(enqueue_training(self.user), first)
+
+        self.assertEqual(claim_jobs(5), [first])
+        self.assertEqual(claim_jobs(5), [])
+        # A job queued while another one runs is a separate refresh
+        self.assertNotEqual(enqueue_training(self.user), first)
+
+    def test_predictions_serve_last_model_while_retraining(self):
+        """Test predictions never train inline and fall back to the last model"""
+        self.add_transactions(40)
+
+        response = expense_predictions(self.user, registry=self.registry)
+        self.assertEqual(response['status'], 'training')
+        job = MLJob.objects.get(id=response['job_id'])
+
+        self.assertEqual(claim_jobs(1), [job])
+        finish_job(job, fingerprint=train_user_model(self.user.id, registry=self.registry))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'DONE')
+
+        response = expense_predictions(self.user, days_ahead=7, registry=self.registry)
+        self.assertEqual(len(response['predictions']), 7)
+        self.assertNotIn('stale', response)
+
+        self.add_transactions(1)
+        response = expense_predictions(self.user, days_ahead=7, registry=self.registry)
+        self.assertTrue(response['stale'])
+        self.assertEqual(len(response['predictions']), 7)
+        self.assertEqual(MLJob.objects.get(id=response['job_id']).status, 'PENDING')
+
+    def test_forecast_many_matches_single_user_forecasts(self):
+        """Test batch forecasting across users matches per-user forecasts"""
+        self.add_transactions(40)
+        other_user = User.objects.create_user(username='otheruser', password='testpass123')
+        histories = {
+            self.user.id: load_expense_history(self.user.id),
+            other_user.id: load_expense_history(other_user.id),
+        }
+
+        forecasts = forecast_many(histories, days_ahead=10, workers=2)
+
+        self.assertEqual(forecasts[other_user.id]['current_data_points'], 0)
+        forecast = forecasts[self.user.id]
+        tomorrow = timezone.now().date() + timedelta(days=1)
+        self.assertEqual(len(forecast['predictions']), 10)
+        self.assertEqual(forecast['predictions'][0]['date'], tomorrow.isoformat())
+
+        fingerprint = train_user_model(self.user.id, registry=self.registry)
+        single = forecast_with_model(
+            self.registry.get(model_key(self.user.id), fingerprint), days_ahead=10
+        )
+        self.assertEqual(forecast, single)
+
+    def test_rollup_history_matches_transactions(self):
+        """Test the rollup-based training history matches aggregating transactions"""
+        self.add_transactions(20)
+        Transaction.objects.create(
+            user=self.user,
+            amount=Decimal('7.50'),
+            transaction_type='EXPENSE',
+            description='Uncategorised',
+            date=timezone.now().date() - timedelta(days=3)
+        )
+        Transaction.objects.create(
+            user=self.user,
+            category=self.category,
+            amount=Decimal('500.00'),
+            transaction_type='INCOME',
+            description='Salary',
+            date=timezone.now().date() - timedelta(days=25)
+        )
+
+        expected = prepare_daily_history(Transaction.objects.filter(user=self.user))
+        history = load_expense_history(self.user.id)
+        self.assertEqual(len(history['total']), 26)
+        self.assertEqual(history['total'].round(2).tolist(), expected['total'].round(2).tolist())
+        self.assertEqual(list(history['categories'].columns), [self.category.id])
+        self.assertEqual(
+            history['categories'][self.category.id].round(2).tolist(),
+            expected['categories'][self.category.id].round(2).tolist()
+        )
+        self.assertAlmostEqual(history['total'].sum() - history['categories'].sum().sum(), 7.5)
+
+    def test_transaction_loader_builds_typed_columns(self):
+        """Test transactions load as typed columns, chunk by chunk"""
+        self.add_transactions(5)
+        Transaction.objects.create(
+            user=self.user, amount=Decimal('1234.56'), transaction_type='INCOME',
+            description='Salary', date=timezone.now().date()
+        )
+        transactions = Transaction.objects.filter(user=self.user)
+
+        self.assertEqual(
+            [len(frame) for frame in iter_transaction_frames(transactions, chunk_size=4)], [4, 2]
+        )
+        df = prepare_transaction_data(transactions.order_by('id'), chunk_size=4)
+        self.assertEqual(len(df), 6)
+        self.assertEqual(str(df['date'].dtype), 'datetime64[ns]')
+        self.assertEqual(str(df['amount'].dtype), 'float64')
+        self.assertEqual(list(df['transaction_type'].cat.categories), ['INCOME', 'EXPENSE'])
+        self.assertEqual(str(df['category_id'].dtype), 'category')
+        self.assertEqual(str(df['month'].dtype), 'int8')
+        self.assertAlmostEqual(df['amount'].sum(), 10 + 11 + 12 + 13 + 14 + 1234.56)
+        self.assertEqual(
+            df.groupby('transaction_type', observed=True)['amount'].count().to_dict(),
+            {'INCOME': 1, 'EXPENSE': 5}
+        )
+        self.assertEqual(int(df['category_id'].isna().sum()), 1)
+        self.assertEqual(set(df['category_id'].dropna()), {self.category.id})
+
+        self.assertIsNone(prepare_transaction_data(Transaction.objects.none()))
+
+    def test_each_engine_forecasts_daily_totals(self):
+        """Test every engine is trained and cached under its own registry key"""
+        self.add_transactions(60)
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                job = enqueue_training(self.user, engine)
+                self.assertEqual(job.engine, engine)
+                fingerprint = train_user_model(self.user.id, registry=self.registry, engine=engine)
+                self.assertIsNotNone(
+                    self.registry.get(model_key(self.user.id, engine), fingerprint)
+                )
+
+                response = expense_predictions(
+                    self.user, days_ahead=14, registry=self.registry, engine=engine
+                )
+                self.assertEqual(response['engine'], engine)
+                self.assertEqual(len(response['predictions']), 14)
+                categories = response['category_predictions']
+                self.assertEqual([c['category_id'] for c in categories], [self.category.id])
+                self.assertEqual(len(categories[0]['predictions']), 14)
+                # 60 days of 10-16 expenses a day
+                for prediction in response['predictions']:
+                    self.assertGreaterEqual(prediction['predicted_amount'], 0)
+                    self.assertLess(prediction['predicted_amount'], 100)
+
+    def test_forecast_shares_the_calendar_features(self):
+        """Test the total and category models of a forecast reuse one calendar"""
+        self.add_transactions(60)
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                fingerprint = train_user_model(self.user.id, registry=self.registry, engine=engine)
+                bundle = self.registry.get(model_key(self.user.id, engine), fingerprint)
+                with mock.patch(
+                    'ml_models.utils.prediction.calendar_features', wraps=calendar_features
+                ) as built, mock.patch(
+                    'ml_models.utils.forecasting.calendar_features', wraps=calendar_features
+                ) as rebuilt:
+                    forecast = forecast_with_model(bundle, days_ahead=14)
+                self.assertEqual(built.call_count, 1)
+                rebuilt.assert_not_called()
+
+                dates = np.array(
+                    [p['date'] for p in forecast['predictions']], dtype='datetime64[D]'
+                )
+                self.assertEqual(
+                    [p['predicted_amount'] for p in forecast['predictions']],
+                    [round(float(amount), 2) for amount in bundle['model'].predict(dates)]
+                )
@@ -0,0 +1,69 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.test import SimpleTestCase
+from ml_models.utils.model_registry import ModelRegistry
+from sklearn.linear_model import LinearRegression
+
+
+class ModelRegistryTestCase(SimpleTestCase):
+    def setUp(self):
+        storage = tempfile.TemporaryDirectory()
+        self.addCleanup(storage.cleanup)
+        self.storage_dir = Path(storage.name)
+        self.registry = ModelRegistry(self.storage_dir, max_in_memory=2)
+
+    def stored_files(self):
+        return sorted(path.name for path in self.storage_dir.glob('*.joblib'))
+
+    def test_models_round_trip_through_storage(self):
+        model = LinearRegression().fit(np.arange(10).reshape(-1, 1), np.arange(10) * 2.0 + 1)
+        self.registry.put('7.linear', '10-20250301', {'model': model, 'days': 10})
+        self.assertEqual(self.stored_files(), ['7.linear-10-20250301.joblib'])
+
+        # A fresh registry, as in another process, loads it from disk
+        loaded = ModelRegistry(self.storage_dir).get('7.linear', '10-20250301')
+        self.assertEqual(loaded['days'], 10)
+        self.assertAlmostEqual(loaded['model'].predict([[20]])[0], 41.0)
+        self.assertEqual(
+            ModelRegistry(self.storage_dir).latest('7.linear')[0], '10-20250301'
+        )
+        self.assertIsNone(self.registry.get('7.linear', 'unknown'))
+        self.assertEqual(ModelRegistry(self.storage_dir).latest('8.linear'), (None, None))
+
+    def test_least_recently_used_models_are_evicted(self):
+        for owner in ('a', 'b'):
+            self.registry.put(owner, '1', {'owner': owner})
+        self.registry.get('a', '1')  # now b is the least recently used
+        self.registry.put('c', '1', {'owner': 'c'})
+
+        # Without the files only the models still in memory can be returned
+        for path in self.storage_dir.glob('*.joblib'):
+            path.unlink()
+        self.assertEqual(self.registry.get('a', '1'), {'owner': 'a'})
+        self.assertEqual(self.registry.get('c', '1'), {'owner': 'c'})
+        self.assertIsNone(self.registry.get('b', '1'))
+
+    def test_retraining_replaces_the_stale_model(self):
+        trained = []
+
+        def train(version):
+            trained.append(version)
+            return {'version': version}
+
+        self.assertEqual(self.registry.get_or_train('7', '10-1', lambda: train(1)), {'version': 1})
+        self.assertEqual(self.registry.get_or_train('7', '10-1', lambda: train(2)), {'version': 1})
+        self.assertEqual(trained, [1])
+
+        # New data means a new fingerprint: the model is retrained and the
+        # old one is gone from memory and disk
+        self.assertEqual(self.registry.get_or_train('7', '11-2', lambda: train(3)), {'version': 3})
+        self.assertEqual(trained, [1, 3])
+        self.assertIsNone(self.registry.get('7', '10-1'))
+        self.assertEqual(self.stored_files(), ['7-11-2.joblib'])
+        self.assertEqual(self.registry.latest('7'), ('11-2', {'version': 3}))
+
+        self.registry.invalidate('7')
+        self.assertIsNone(self.registry.get('7', '11-2'))
+        self.assertEqual(self.stored_files(), [])
@@ -1,9 +1,18 @@
 from django.test import TestCase
 from django.contrib.auth.models import User
 from decimal import Decimal
-from .models import Category, Transaction, Budget, SavingsGoal, FinancialMetric
+from ..models import (
+    Category, Transaction, Budget, SavingsGoal, FinancialMetric, CategoryMetric,
+    SpendingStatistic, AnomalyBaseline
+)
+from .. import statistics
+from ..anomalies import rebuild_anomaly_scores
+from ..metrics import rebuild_metrics
+from ..statistics import analysis_from_statistics, rebuild_statistics
+from ml_models.utils.prediction import analyze_spending_patterns
 from django.utils import timezone
 from datetime import timedelta
+from unittest import mock
 
 class ModelTestCase(TestCase):
     def setUp(self):
@@ -92,4 +101,235 @@ class ModelTestCase(TestCase):
         self.assertEqual(metric.user, self.user)
         self.assertEqual(metric.total_income, Decimal('5000.00'))
         self.assertEqual(metric.total_expenses, Decimal('3000.00'))
-        self.assertEqual(metric.savings_rate, Decimal('40.00'))
\ No newline at end of file
+        self.assertEqual(metric.savings_rate, Decimal('40.00'))
+
+
+class FinancialMetricRollupTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.groceries = Category.objects.create(name='Groceries', user=self.user)
+        self.rent = Category.objects.create(name='Rent', user=self.user)
+        self.today = timezone.now().date()
+
+    def create_transaction(self, amount, transaction_type='EXPENSE', category=None, date=None):
+        return Transaction.objects.create(
+            user=self.user,
+            category=category or self.groceries,
+            amount=Decimal(amount),
+            transaction_type=transaction_type,
+            description='Rollup Transaction',
+            date=date or self.today
+        )
+
+    def test_rollups_follow_transaction_writes(self):
+        """Test rollups are kept current on create, update and delete"""
+        self.create_transaction('1000.00', transaction_type='INCOME')
+        expense = self.create_transaction('250.00')
+
+        metric = FinancialMetric.objects.get(user=self.user, date=self.today)
+        self.assertEqual(metric.total_income, Decimal('1000.00'))
+        self.assertEqual(metric.total_expenses, Decimal('250.00'))
+        self.assertEqual(metric.savings_rate, Decimal('75.00'))
+
+        # Move the expense to another day and category
+        yesterday = self.today - timedelta(days=1)
+        expense.date = yesterday
+        expense.category = self.rent
+        expense.save()
+
+        metric.refresh_from_db()
+        self.assertEqual(metric.total_expenses, Decimal('0'))
+        self.assertEqual(metric.savings_rate, Decimal('100.00'))
+        self.assertEqual(
+            CategoryMetric.objects.get(category=self.groceries, date=self.today).total_expenses,
+            Decimal('0')
+        )
+        self.assertEqual(
+            CategoryMetric.objects.get(category=self.rent, date=yesterday).total_expenses,
+            Decimal('250.00')
+        )
+
+        expense.delete()
+        self.assertEqual(
+            FinancialMetric.objects.get(user=self.user, date=yesterday).total_expenses,
+            Decimal('0')
+        )
+
+    def test_rebuild_metrics_matches_incremental_rollups(self):
+        """Test a bulk rebuild reproduces the incrementally maintained rollups"""
+        self.create_transaction('1000.00', transaction_type='INCOME')
+        self.create_transaction('100.00')
+        self.create_transaction('40.00', category=self.rent)
+        self.create_transaction('60.00', date=self.today - timedelta(days=3))
+        expected = list(FinancialMetric.objects.order_by('date').values_list(
+            'date', 'total_income', 'total_expenses', 'savings_rate'
+        ))
+
+        FinancialMetric.objects.all().delete()
+        CategoryMetric.objects.all().delete()
+        self.assertEqual(rebuild_metrics(users=[self.user]), 2)
+
+        self.assertEqual(list(FinancialMetric.objects.order_by('date').values_list(
+            'date', 'total_income', 'total_expenses', 'savings_rate'
+        )), expected)
+        self.assertEqual(CategoryMetric.objects.count(), 3)
+
+    def test_user_deletion_cascades(self):
+        """Test deleting a user with transactions does not recreate rollups"""
+        self.create_transaction('100.00')
+        self.user.delete()
+        self.assertFalse(FinancialMetric.objects.exists())
+        self.assertFalse(CategoryMetric.objects.exists())
+
+
+class SpendingStatisticTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.groceries = Category.objects.create(name='Groceries', user=self.user)
+        self.rent = Category.objects.create(name='Rent', user=self.user)
+        self.today = timezone.now().date()
+
+    def create_transaction(self, amount, days_ago=0, category=None, transaction_type='EXPENSE'):
+        return Transaction.objects.create(
+            user=self.user,
+            category=category,
+            amount=Decimal(amount),
+            transaction_type=transaction_type,
+            description='Statistics Transaction',
+            date=self.today - timedelta(days=days_ago)
+        )
+
+    def assertMatchesFullAnalysis(self):
+        expected = analyze_spending_patterns(Transaction.objects.filter(user=self.user))
+        actual = analysis_from_statistics(self.user)
+        self.assertEqual(actual['monthly_patterns'], expected['monthly_patterns'])
+        self.assertEqual(actual['daily_patterns'], expected['daily_patterns'])
+        self.assertEqual(actual['category_insights'], expected['category_insights'])
+        self.assertEqual(actual['unusual_expenses'], expected['unusual_expenses'])
+
+    def test_statistics_follow_transaction_writes(self):
+        """Test the incremental analysis matches a full recompute after every write"""
+        self.create_transaction('5000.00', transaction_type='INCOME')
+        for index in range(40):
+            self.create_transaction(
+                f'{10 + index * 3 % 17}.25', days_ago=index * 5,
+                category=(self.groceries, self.rent, None)[index % 3]
+            )
+        outlier = self.create_transaction('900.00', days_ago=2, category=self.rent)
+        self.assertMatchesFullAnalysis()
+
+        outlier.amount = Decimal('450.00')
+        outlier.category = self.groceries
+        outlier.date = self.today - timedelta(days=40)
+        outlier.save()
+        self.assertMatchesFullAnalysis()
+
+        outlier.delete()
+        Transaction.objects.filter(user=self.user, category=self.rent).first().delete()
+        self.assertMatchesFullAnalysis()
+
+    def test_concurrent_first_expenses_share_new_statistics(self):
+        """Test a first expense whose rows another transaction just inserted"""
+        self.create_transaction('30.00', category=self.groceries)
+        calls = []
+        lock_statistics = statistics._lock_statistics
+
+        def stale_first_lock(user_id, lookup):
+            calls.append(lookup)
+            # The first look misses the rows above, as if they were committed
+            # by a concurrent transaction just after it
+            return {} if len(calls) == 1 else lock_statistics(user_id, lookup)
+
+        with mock.patch.object(statistics, '_lock_statistics', stale_first_lock):
+            self.create_transaction('50.00', category=self.groceries)
+        self.assertEqual(len(calls), 2)
+
+        statistic = SpendingStatistic.objects.get(
+            user=self.user, dimension='CATEGORY', key=self.groceries.id
+        )
+        self.assertEqual((statistic.count, statistic.total), (2, Decimal('80.00')))
+        self.assertAlmostEqual(statistic.mean, 40.0)
+        self.assertEqual(SpendingStatistic.objects.filter(user=self.user).count(), 4)
+        self.assertMatchesFullAnalysis()
+
+    def test_deleted_category_expenses_become_uncategorised(self):
+        """Test deleting a category drops its statistics and anomaly baseline"""
+        for index in range(12):
+            self.create_transaction(
+                f'{100 + index * 7}.00', days_ago=index * 3,
+                category=(self.groceries, self.rent)[index % 2]
+            )
+        rent_id = self.rent.id
+        self.rent.delete()
+        self.assertFalse(SpendingStatistic.objects.filter(
+            user=self.user, dimension='CATEGORY', key=rent_id
+        ).exists())
+        self.assertFalse(AnomalyBaseline.objects.filter(user=self.user, key=rent_id).exists())
+        self.assertEqual(SpendingStatistic.objects.get(user=self.user, dimension='ALL').count, 12)
+        self.assertMatchesFullAnalysis()
+
+        # The uncategorised expenses keep their place in the remaining statistics
+        Transaction.objects.filter(user=self.user, category=None).first().delete()
+        self.assertMatchesFullAnalysis()
+        rebuild_statistics(users=[self.user])
+        self.assertMatchesFullAnalysis()
+
+    def test_rebuild_statistics_matches_incremental_state(self):
+        """Test a bulk rebuild reproduces the incrementally maintained statistics"""
+        for index in range(10):
+            self.create_transaction(f'{20 + index}.00', days_ago=index, category=self.groceries)
+        fields = ('dimension', 'key', 'count', 'total')
+        expected = list(SpendingStatistic.objects.order_by(*fields).values_list(*fields))
+
+        rebuild_statistics(users=[self.user])
+        self.assertEqual(
+            list(SpendingStatistic.objects.order_by(*fields).values_list(*fields)), expected
+        )
+        self.assertMatchesFullAnalysis()
+
+    def test_no_expenses(self):
+        """Test users without expenses get the same error as the full analysis"""
+        self.create_transaction('100.00', transaction_type='INCOME')
+        self.assertEqual(
+            analysis_from_statistics(self.user), {'error': 'No expense data available'}
+        )
+
+
+class AnomalyScoreTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(name='Groceries', user=self.user)
+
+    def test_rebuild_matches_live_scores(self):
+        """Test replaying the history reproduces the scores given on insert"""
+        start = timezone.now().date() - timedelta(days=30)
+        for index in range(25):
+            Transaction.objects.create(
+                user=self.user,
+                category=self.category if index % 4 else None,
+                amount=Decimal(40 + index % 7 * 3 + (200 if index == 20 else 0)),
+                transaction_type='EXPENSE',
+                description='Scored Transaction',
+                date=start + timedelta(days=index)
+            )
+        expected = list(Transaction.objects.order_by('id').values_list('anomaly_score', flat=True))
+        self.assertIsNone(expected[0])
+        self.assertGreater(expected[20], 10)
+
+        Transaction.objects.update(anomaly_score=None)
+        AnomalyBaseline.objects.all().delete()
+        self.assertEqual(rebuild_anomaly_scores(users=[self.user]), 15)
+        self.assertEqual(
+            list(Transaction.objects.order_by('id').values_list('anomaly_score', flat=True)),
+            expected
+        )
+        self.assertEqual(AnomalyBaseline.objects.filter(user=self.user).count(), 2)
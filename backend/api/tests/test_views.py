@@ -1,12 +1,35 @@
-from django.test import TestCase
+from asgiref.sync import iscoroutinefunction
+from django.test import (
+    AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+)
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from decimal import Decimal
 from django.utils import timezone
-from ..models import Category, Transaction, Budget, SavingsGoal
-from datetime import timedelta
+from .. import views
+from ..authentication import BearerTokenAuthentication, issue_token, user_cache
+from ..cache import get_user_version
+from ..importers import import_transactions
+from ..instrumentation import InstrumentationMiddleware, metrics
+from ..models import Category, Transaction, Budget, SavingsGoal, FinancialMetric, Tombstone
+from ..timeseries import PERIODS, bucket_count, buckets
+from datetime import date, timedelta
+from unittest import mock
+import asyncio
+import csv
+import io
 import json
+import re
+import tempfile
+import threading
+import time
 
 class APITestCase(TestCase):
     def setUp(self):
@@ -16,6 +39,9 @@ class APITestCase(TestCase):
             password='testpass123'
         )
         
+        # Cached responses are keyed by user id, which the test database reuses
+        cache.clear()
+
         # Create API client
         self.client = APIClient()
         self.client.force_authenticate(user=self.user)
@@ -142,4 +168,989 @@ class APITestCase(TestCase):
             self.assertEqual(
                 response.status_code,
                 status.HTTP_401_UNAUTHORIZED
-            )
\ No newline at end of file
+            )
+
+    def test_monthly_summary(self):
+        """Test monthly summary totals and per-category breakdown"""
+        today = timezone.now().date()
+        other = Category.objects.create(name='Other Category', user=self.user)
+        for category, amount, transaction_type in [
+            (self.category, '100.00', 'EXPENSE'),
+            (self.category, '50.00', 'EXPENSE'),
+            (other, '25.00', 'EXPENSE'),
+            (other, '1000.00', 'INCOME'),
+        ]:
+            Transaction.objects.create(
+                user=self.user,
+                category=category,
+                amount=Decimal(amount),
+                transaction_type=transaction_type,
+                description='Summary Transaction',
+                date=today
+            )
+
+        response = self.client.get(
+            '/api/transactions/monthly_summary/',
+            {'month': today.month, 'year': today.year}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_income'], Decimal('1000.00'))
+        self.assertEqual(response.data['total_expenses'], Decimal('175.00'))
+        self.assertEqual(response.data['by_category'], [
+            {'category': 'Test Category', 'amount': Decimal('150.00')},
+            {'category': 'Other Category', 'amount': Decimal('25.00')},
+        ])
+
+    def test_monthly_summary_query_count(self):
+        """Test monthly summary query count does not grow with categories"""
+        today = timezone.now().date()
+
+        def add_categories(count):
+            for i in range(count):
+                category = Category.objects.create(
+                    name=f'Category {Category.objects.count()}',
+                    user=self.user
+                )
+                Transaction.objects.create(
+                    user=self.user,
+                    category=category,
+                    amount=Decimal('10.00'),
+                    transaction_type='EXPENSE',
+                    description='Summary Transaction',
+                    date=today
+                )
+
+        params = {'month': today.month, 'year': today.year}
+        for count in (2, 20):
+            add_categories(count)
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/transactions/monthly_summary/', params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_financial_metrics_are_read_only(self):
+        """Test the derived daily rollups cannot be edited through the API"""
+        Transaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal('10.00'),
+            transaction_type='EXPENSE', description='Rollup', date=timezone.now().date()
+        )
+        response = self.client.get('/api/financial-metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        url = f"/api/financial-metrics/{response.data['results'][0]['id']}/"
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        changes = {'date': str(timezone.now().date()), 'total_expenses': '999.00'}
+        for method in (self.client.patch, self.client.put):
+            response = method(url, changes, format='json')
+            self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        response = self.client.post('/api/financial-metrics/', changes, format='json')
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(self.client.get(url).data['total_expenses'], '10.00')
+
+    def test_monthly_summary_validation(self):
+        """Test invalid months and years are rejected"""
+        for params, field in [
+            ({'month': 13}, 'month'), ({'month': 0}, 'month'), ({'month': 'abc'}, 'month'),
+            ({'year': 'abc'}, 'year'), ({'year': 0}, 'year'), ({'year': 10000}, 'year'),
+        ]:
+            response = self.client.get('/api/transactions/monthly_summary/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn(field, response.data)
+
+        # December of the last representable year is still a valid month
+        response = self.client.get(
+            '/api/transactions/monthly_summary/', {'month': 12, 'year': 9999}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_expenses'], 0)
+
+    def test_transaction_timeseries(self):
+        """Test the timeseries buckets, year-over-year change and query count"""
+        other = Category.objects.create(name='Rent', user=self.user)
+        for day, amount, kind, category in [
+            ('2024-01-09', '5.00', 'EXPENSE', self.category),
+            ('2025-01-05', '10.00', 'EXPENSE', self.category),
+            ('2025-01-06', '7.00', 'EXPENSE', None),
+            ('2025-01-20', '40.00', 'EXPENSE', other),
+            ('2025-02-07', '30.00', 'INCOME', self.category),
+        ]:
+            Transaction.objects.create(
+                user=self.user, category=category, amount=Decimal(amount),
+                transaction_type=kind, description='Trend', date=day
+            )
+
+        params = {'start': '2025-01-01', 'end': '2025-03-31', 'compare': 'yoy'}
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/transactions/timeseries/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual(
+            [str(result['period']) for result in results],
+            ['2025-01-01', '2025-02-01', '2025-03-01']
+        )
+        january = results[0]
+        # The uncategorised expense counts in the totals only
+        self.assertEqual(january['total_expenses'], Decimal('57.00'))
+        self.assertEqual(
+            [(c['category'], c['expenses']) for c in january['by_category']],
+            [('Test Category', Decimal('10.00')), ('Rent', Decimal('40.00'))]
+        )
+        self.assertEqual(january['previous_year']['total_expenses'], Decimal('5.00'))
+        self.assertEqual(january['change']['total_expenses'], Decimal('1040.00'))
+        self.assertIsNone(january['change']['total_income'])
+        self.assertEqual(results[1]['net'], Decimal('30.00'))
+        self.assertEqual(results[2]['by_category'], [])
+
+        response = self.client.get('/api/transactions/timeseries/', {
+            'period': 'week', 'start': '2025-01-01', 'end': '2025-01-12'
+        })
+        self.assertEqual(
+            [(str(r['period']), r['total_expenses']) for r in response.data['results']],
+            [('2024-12-30', Decimal('10.00')), ('2025-01-06', Decimal('7.00'))]
+        )
+        self.assertNotIn('change', response.data['results'][0])
+
+        response = self.client.get('/api/transactions/timeseries/', {'period': 'year'})
+        self.assertEqual(len(response.data['results']), 12)
+
+        for params in ({'period': 'quarter'}, {'start': '2025-02-30'},
+                       {'start': '2025-03-01', 'end': '2025-02-01'},
+                       {'period': 'day', 'start': '2000-01-01'}):
+            response = self.client.get('/api/transactions/timeseries/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_transaction_timeseries_calendar_limits(self):
+        """Test timeseries ranges at the first and last representable dates"""
+        for params, periods in [
+            ({'period': 'day', 'start': '9999-12-31', 'end': '9999-12-31'}, ['9999-12-31']),
+            ({'period': 'week', 'start': '9999-12-31', 'end': '9999-12-31'}, ['9999-12-27']),
+            ({'period': 'month', 'start': '9999-12-01', 'end': '9999-12-31'}, ['9999-12-01']),
+            ({'period': 'year', 'end': '9999-12-31'},
+             [f'{year}-01-01' for year in range(9988, 10000)]),
+            ({'period': 'month', 'end': '0001-03-01'}, ['0001-01-01', '0001-02-01', '0001-03-01']),
+            ({'period': 'week', 'end': '0001-01-10'}, ['0001-01-01', '0001-01-08']),
+            ({'period': 'year', 'start': '0002-01-01', 'end': '0002-12-31', 'compare': 'yoy'},
+             ['0002-01-01']),
+        ]:
+            response = self.client.get('/api/transactions/timeseries/', params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, params)
+            self.assertEqual([str(r['period']) for r in response.data['results']], periods)
+
+        for params in ({'period': 'year', 'start': '0001-01-01', 'end': '0001-12-31',
+                        'compare': 'yoy'},
+                       {'period': 'week', 'start': '0001-06-01', 'compare': 'yoy'},
+                       {'period': 'day', 'start': '0001-01-01', 'end': '9000-01-01'}):
+            response = self.client.get('/api/transactions/timeseries/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+        for period in PERIODS:
+            for start, end in [(date(2024, 12, 30), date(2025, 3, 2)),
+                               (date(2025, 1, 5), date(2025, 1, 5)),
+                               (date.min, date(1, 12, 31)), (date(9999, 1, 1), date.max)]:
+                self.assertEqual(
+                    bucket_count(start, end, period), len(buckets(start, end, period))
+                )
+
+    def test_budget_spent_amounts(self):
+        """Test budget list, detail and status report spent and remaining amounts"""
+        start_date = timezone.now().date()
+        budget = Budget.objects.create(
+            user=self.user,
+            category=self.category,
+            amount=Decimal('500.00'),
+            start_date=start_date,
+            end_date=start_date + timedelta(days=30)
+        )
+        for offset, amount in [(0, '120.00'), (5, '30.50'), (45, '999.00')]:
+            Transaction.objects.create(
+                user=self.user,
+                category=self.category,
+                amount=Decimal(amount),
+                transaction_type='EXPENSE',
+                description='Budget Transaction',
+                date=start_date + timedelta(days=offset)
+            )
+
+        list_data = self.client.get('/api/budgets/').data['results'][0]
+        detail_data = self.client.get(f'/api/budgets/{budget.id}/').data
+        status_data = self.client.get('/api/budgets/status/').data[0]
+        for data in (list_data, detail_data, status_data):
+            self.assertEqual(Decimal(data['spent_amount']), Decimal('150.50'))
+            self.assertEqual(Decimal(data['remaining_amount']), Decimal('349.50'))
+
+    def test_budget_list_query_count(self):
+        """Test budget list and status query counts do not grow with budgets"""
+        start_date = timezone.now().date()
+
+        def add_budgets(count):
+            for i in range(count):
+                category = Category.objects.create(
+                    name=f'Budget Category {Category.objects.count()}',
+                    user=self.user
+                )
+                Budget.objects.create(
+                    user=self.user,
+                    category=category,
+                    amount=Decimal('100.00'),
+                    start_date=start_date,
+                    end_date=start_date + timedelta(days=30)
+                )
+
+        for count in (2, 20):
+            add_budgets(count)
+            with self.assertNumQueries(2):
+                self.client.get('/api/budgets/')
+            with self.assertNumQueries(1):
+                response = self.client.get('/api/budgets/status/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_related_objects_query_count(self):
+        """Test list, retrieve and admin pages load categories in fixed queries"""
+        today = timezone.now().date()
+        categories = [
+            Category.objects.create(name=f'Related Category {i}', user=self.user)
+            for i in range(3)
+        ]
+
+        def add_rows(count):
+            for i in range(count):
+                category = categories[i % len(categories)]
+                Transaction.objects.bulk_create([Transaction(
+                    user=self.user, category=category, amount=Decimal('10.00'),
+                    transaction_type='EXPENSE', description='Related', date=today,
+                    anomaly_score=5.0
+                )])
+                Budget.objects.create(
+                    user=self.user, category=category, amount=Decimal('100.00'),
+                    start_date=today, end_date=today + timedelta(days=30)
+                )
+
+        self.user.is_staff = True
+        self.user.is_superuser = True
+        self.user.save()
+        self.client.force_login(self.user)
+
+        admin_queries = {}
+        for count, page_size in ((5, 5), (25, 30)):
+            add_rows(count)
+            params = {'page_size': page_size}
+            # Count, page and the page's categories
+            with self.assertNumQueries(3):
+                response = self.client.get('/api/transactions/', params)
+            self.assertTrue(all(row['category_name'] for row in response.data['results']))
+            with self.assertNumQueries(2):
+                self.client.get('/api/transactions/', dict(params, cursor=''))
+            with self.assertNumQueries(3):
+                self.client.get('/api/transactions/anomalies/', params)
+            with self.assertNumQueries(2):
+                self.client.get('/api/budgets/', params)
+            budget = Budget.objects.filter(user=self.user).first()
+            with self.assertNumQueries(1):
+                self.client.get(f'/api/budgets/{budget.id}/')
+
+            for page in ('transaction', 'budget', 'categorymetric'):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(f'/admin/api/{page}/')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                admin_queries.setdefault(page, []).append(len(queries))
+        for page, counts in admin_queries.items():
+            self.assertEqual(counts[0], counts[1], page)
+
+    def test_transaction_export(self):
+        """Test JSON Lines and CSV exports match the serialized transactions"""
+        today = timezone.now().date()
+        for amount, category, description in (
+            (Decimal('1234.57'), self.category, 'Rent, "flat" 2'),
+            (Decimal('0.10'), None, 'Caf\u00e9\nbill'),
+            (Decimal('99999999.99'), self.category, 'Large'),
+        ):
+            Transaction.objects.create(
+                user=self.user, category=category, amount=amount,
+                transaction_type='EXPENSE', description=description, date=today
+            )
+        other = User.objects.create_user(username='exportother', password='testpass123')
+        Transaction.objects.create(
+            user=other, amount=Decimal('5.00'), transaction_type='EXPENSE',
+            description='Other user', date=today
+        )
+        serialized = {
+            row['id']: row
+            for row in self.client.get('/api/transactions/', {'page_size': 100}).data['results']
+        }
+
+        response = self.client.get('/api/transactions/export/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        exported = [json.loads(line) for line in lines]
+        self.assertEqual(len(exported), 3)
+        for row in exported:
+            # The serializer leaves out category_name without a category
+            expected = {'category_name': None}
+            expected.update(json.loads(json.dumps(serialized[row['id']])))
+            self.assertEqual(row, expected)
+
+        response = self.client.get('/api/transactions/export/', {'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(
+            [(row['amount'], row['description']) for row in rows],
+            [(serialized[int(row['id'])]['amount'], serialized[int(row['id'])]['description'])
+             for row in rows]
+        )
+        self.assertEqual(rows[0]['amount'], '1234.57')
+        self.assertEqual(rows[1]['category_name'], '')
+
+        response = self.client.get('/api/transactions/export/', HTTP_ACCEPT='text/csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        response = self.client.get('/api/transactions/export/', {'format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_transaction_import(self):
+        """Test CSV bulk import creates valid rows and reports invalid ones"""
+        csv_file = SimpleUploadedFile('export.csv', (
+            'date,amount,transaction_type,category,description\n'
+            '2024-01-05,100.50,EXPENSE,Test Category,Groceries\n'
+            '2024-01-06,-20.00,,Transport,Bus ticket\n'
+            'not-a-date,10.00,EXPENSE,Test Category,Broken row\n'
+            '2024-01-07,2500.00,INCOME,,Salary\n'
+        ).encode())
+
+        response = self.client.post(
+            '/api/transactions/bulk/', {'file': csv_file}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['failed'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 3)
+        self.assertIn('date', response.data['errors'][0]['errors'])
+
+        transport = Category.objects.get(user=self.user, name='Transport')
+        bus_ticket = Transaction.objects.get(description='Bus ticket')
+        self.assertEqual(bus_ticket.category, transport)
+        self.assertEqual(bus_ticket.transaction_type, 'EXPENSE')
+        self.assertEqual(bus_ticket.amount, Decimal('20.00'))
+
+        summary = self.client.get(
+            '/api/transactions/monthly_summary/', {'month': 1, 'year': 2024}
+        ).data
+        self.assertEqual(summary['total_income'], Decimal('2500.00'))
+        self.assertEqual(summary['total_expenses'], Decimal('120.50'))
+
+    def test_bulk_transaction_import_formats(self):
+        """Test bulk import of OFX and QIF files and JSON lists"""
+        ofx_file = SimpleUploadedFile('statement.ofx', (
+            'OFXHEADER:100\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n'
+            '<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>20240105120000\n'
+            '<TRNAMT>-42.10\n<NAME>Coffee shop\n</STMTTRN>\n'
+            '</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n'
+        ).encode())
+        qif_file = SimpleUploadedFile('export.qif', (
+            '!Type:Bank\nD01/06/2024\nT-15.00\nPBakery\nLTest Category\n^\n'
+            "D1/07'24\nT1,200.00\nPEmployer\n^\n"
+        ).encode())
+
+        for upload, created in [(ofx_file, 1), (qif_file, 2)]:
+            response = self.client.post(
+                '/api/transactions/bulk/', {'file': upload}, format='multipart'
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(response.data['created'], created)
+
+        response = self.client.post('/api/transactions/bulk/', [
+            {'date': '2024-01-08', 'amount': '9.99', 'transaction_type': 'EXPENSE',
+             'description': 'Snack'},
+            {'date': '2024-01-08', 'amount': 'abc', 'transaction_type': 'EXPENSE',
+             'description': 'Broken'},
+            {'date': '2024-01-08', 'amount': '5.00', 'description': '  '},
+            5,
+            None,
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['failed'], 4)
+        self.assertEqual(
+            [list(error['errors']) for error in response.data['errors']],
+            [['amount'], ['description'], ['non_field_errors'], ['non_field_errors']]
+        )
+
+        self.assertEqual(Transaction.objects.get(description='Coffee shop').amount,
+                         Decimal('42.10'))
+        employer = Transaction.objects.get(description='Employer')
+        self.assertEqual(employer.transaction_type, 'INCOME')
+        self.assertEqual(employer.amount, Decimal('1200.00'))
+        self.assertEqual(Transaction.objects.get(description='Bakery').category, self.category)
+
+    def test_bulk_transaction_import_encodings(self):
+        """Test files in other encodings are rejected, or read with ?encoding"""
+        content = (
+            'date,amount,transaction_type,category,description\n'
+            '2024-01-05,12.00,EXPENSE,Caf\xe9,Cr\xeape stand\n'
+        ).encode('latin-1')
+
+        response = self.client.post('/api/transactions/bulk/', {
+            'file': SimpleUploadedFile('bank.csv', content)
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['created'], 0)
+        self.assertFalse(response.data['complete'])
+        self.assertIn('file', response.data['errors'][0]['errors'])
+
+        response = self.client.post('/api/transactions/bulk/', {
+            'file': SimpleUploadedFile('bank.csv', content), 'encoding': 'latin-1'
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Transaction.objects.get().description, 'Cr\xeape stand')
+
+        response = self.client.post('/api/transactions/bulk/', {
+            'file': SimpleUploadedFile('bank.csv', content), 'encoding': 'klingon'
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('encoding', response.data)
+
+    def test_import_command(self):
+        """Test the import command reports unreadable files as command errors"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = f'{directory.name}/bank.csv'
+        with open(path, 'w', encoding='latin-1') as stream:
+            stream.write('date,amount,description\n2024-01-05,-3.20,Caf\xe9\n')
+
+        with self.assertRaisesMessage(CommandError, 'could not be read'):
+            call_command('import_transactions', path, user='testuser', stderr=io.StringIO())
+        self.assertFalse(Transaction.objects.exists())
+
+        stdout = io.StringIO()
+        call_command(
+            'import_transactions', path, user='testuser', encoding='latin-1', stdout=stdout
+        )
+        self.assertIn('Imported 1 transactions', stdout.getvalue())
+        self.assertEqual(Transaction.objects.get().description, 'Caf\xe9')
+
+    def test_failed_import_keeps_committed_chunks_consistent(self):
+        """Test chunks committed before a failure get their rollups and cache bump"""
+        records = [
+            (row, {'date': f'2024-02-0{row}', 'amount': '-10.00', 'description': 'Chunked'})
+            for row in (1, 2, 3)
+        ]
+        version = get_user_version(self.user.id)
+        with mock.patch('api.importers.score_new_expenses',
+                        side_effect=[None, RuntimeError('database went away')]):
+            with self.assertRaises(RuntimeError):
+                import_transactions(self.user, records, chunk_size=1)
+
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+        metric = FinancialMetric.objects.get(user=self.user)
+        self.assertEqual(str(metric.date), '2024-02-01')
+        self.assertEqual(metric.total_expenses, Decimal('10.00'))
+        self.assertGreater(get_user_version(self.user.id), version)
+
+    def test_transaction_keyset_pagination(self):
+        """Test cursor pagination walks every row once without COUNT queries"""
+        today = timezone.now().date()
+        for i in range(25):
+            Transaction.objects.create(
+                user=self.user,
+                category=self.category,
+                amount=Decimal('10.00'),
+                transaction_type='EXPENSE',
+                description=f'Paged Transaction {i}',
+                date=today - timedelta(days=i // 3)
+            )
+
+        seen = []
+        url = '/api/transactions/?cursor=&page_size=10'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            for query in queries.captured_queries:
+                self.assertNotIn('COUNT(', query['sql'])
+                self.assertNotIn('OFFSET', query['sql'])
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+            if len(seen) == 10:
+                # Rows inserted ahead of the cursor must not shift later pages
+                Transaction.objects.create(
+                    user=self.user,
+                    category=self.category,
+                    amount=Decimal('10.00'),
+                    transaction_type='EXPENSE',
+                    description='Late Transaction',
+                    date=today
+                )
+
+        expected = list(Transaction.objects.filter(user=self.user).exclude(
+            description='Late Transaction'
+        ).order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+        response = self.client.get('/api/transactions/?cursor=garbage')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_spending_analysis_caching(self):
+        """Test analysis responses are cached, validated and invalidated by writes"""
+        today = timezone.now().date()
+        for i in range(5):
+            Transaction.objects.create(
+                user=self.user,
+                category=self.category,
+                amount=Decimal(10 * (i + 1)),
+                transaction_type='EXPENSE',
+                description='Analysis Transaction',
+                date=today - timedelta(days=i)
+            )
+
+        response = self.client.get('/api/transactions/analysis/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        top = response.data['category_insights']['top_spending_categories']
+        self.assertEqual(top, [{'category_id': self.category.id, 'total_amount': 150.0}])
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/transactions/analysis/')
+        self.assertEqual(cached.data, response.data)
+
+        response = self.client.get('/api/transactions/analysis/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Transaction.objects.create(
+            user=self.user,
+            category=self.category,
+            amount=Decimal('100.00'),
+            transaction_type='EXPENSE',
+            description='Analysis Transaction',
+            date=today
+        )
+        response = self.client.get('/api/transactions/analysis/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        top = response.data['category_insights']['top_spending_categories']
+        self.assertEqual(top[0]['total_amount'], 250.0)
+
+        # Another user never sees this user's cached analysis
+        other_user = User.objects.create_user(username='otheruser', password='testpass123')
+        self.client.force_authenticate(user=other_user)
+        response = self.client.get('/api/transactions/analysis/')
+        self.assertEqual(response.data, {'error': 'No transaction data available'})
+
+    def test_expense_predictions_endpoint(self):
+        """Test predictions report missing history without training"""
+        response = self.client.get('/api/transactions/predictions/', {'days': 7})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['current_data_points'], 0)
+        self.assertIn('ETag', response)
+
+        response = self.client.get('/api/transactions/predictions/', {'days': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get('/api/transactions/predictions/', {'engine': 'unknown'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/transactions/predictions/', {'engine': 'linear'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_anomalies_endpoint(self):
+        """Test unusual expenses are scored on insert and listed"""
+        today = timezone.now().date()
+        for i in range(20):
+            Transaction.objects.create(
+                user=self.user,
+                category=self.category,
+                amount=Decimal(48 + i % 5),
+                transaction_type='EXPENSE',
+                description='Usual Transaction',
+                date=today - timedelta(days=i)
+            )
+        usual = Transaction.objects.create(
+            user=self.user,
+            category=self.category,
+            amount=Decimal('52.00'),
+            transaction_type='EXPENSE',
+            description='Usual Transaction',
+            date=today
+        )
+        unusual = Transaction.objects.create(
+            user=self.user,
+            category=self.category,
+            amount=Decimal('500.00'),
+            transaction_type='EXPENSE',
+            description='Unusual Transaction',
+            date=today
+        )
+        self.assertLess(usual.anomaly_score, 3)
+        self.assertGreater(unusual.anomaly_score, 10)
+
+        # Scoring reads and updates the baseline rows once, never the history
+        with CaptureQueriesContext(connection) as queries:
+            Transaction.objects.create(
+                user=self.user,
+                category=self.category,
+                amount=Decimal('50.00'),
+                transaction_type='EXPENSE',
+                description='Usual Transaction',
+                date=today
+            )
+        baseline_queries = [q['sql'] for q in queries if 'api_anomalybaseline' in q['sql']]
+        self.assertEqual(len(baseline_queries), 2)
+        self.assertFalse([
+            q['sql'] for q in queries if q['sql'].startswith('SELECT') and
+            'FROM "api_transaction"' in q['sql']
+        ])
+
+        response = self.client.get('/api/transactions/anomalies/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data['results']], [unusual.id])
+
+        response = self.client.get('/api/transactions/anomalies/', {'min_score': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_request_instrumentation(self):
+        """Test Server-Timing headers, the metrics endpoint and N+1 logging"""
+        metrics.reset()
+        response = self.client.get('/api/categories/')
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+        # Metrics are for staff only
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('# TYPE api_request_queries histogram', body)
+        self.assertIn(
+            'api_requests_total{endpoint="category-list",method="GET",status="200"} 1', body
+        )
+        self.assertIn(
+            'api_request_duration_seconds_count{endpoint="category-list",method="GET"} 1', body
+        )
+        self.assertIn('api_response_size_bytes_bucket{endpoint="category-list"', body)
+
+        with mock.patch('api.instrumentation.logger.warning') as warning:
+            self.client.get('/api/categories/')
+        warning.assert_not_called()
+        cache.clear()  # the list above is cached by now
+        with override_settings(API_N_PLUS_ONE_THRESHOLD=1):
+            with self.assertLogs('api.instrumentation', level='WARNING') as logs:
+                self.client.get('/api/categories/')
+        self.assertIn('api_category', logs.output[-1])
+
+    @override_settings(SYNC_OVERLAP_SECONDS=0)  # see test_delta_sync_overlap
+    def test_delta_sync(self):
+        """Test sync returns only rows changed or deleted since the cursors"""
+        today = timezone.now().date()
+        kept = Transaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal('10.00'),
+            transaction_type='EXPENSE', description='Kept', date=today
+        )
+        edited = Transaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal('20.00'),
+            transaction_type='EXPENSE', description='Edited', date=today
+        )
+        removed = Transaction.objects.create(
+            user=self.user, amount=Decimal('30.00'), transaction_type='INCOME',
+            description='Removed', date=today
+        )
+        doomed = Category.objects.create(name='Doomed', user=self.user)
+        orphan = Transaction.objects.create(
+            user=self.user, category=doomed, amount=Decimal('40.00'),
+            transaction_type='EXPENSE', description='Orphan', date=today
+        )
+        budget = Budget.objects.create(
+            user=self.user, category=doomed, amount=Decimal('100.00'),
+            start_date=today, end_date=today + timedelta(days=30)
+        )
+        other = User.objects.create_user(username='syncother', password='testpass123')
+        Category.objects.create(name='Other', user=other)
+
+        response = self.client.get('/api/sync/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row['id'] for row in response.data['transactions']['updated']],
+            [kept.id, edited.id, removed.id, orphan.id]
+        )
+        self.assertEqual(len(response.data['categories']['updated']), 2)
+        self.assertEqual(response.data['budgets']['updated'][0]['id'], budget.id)
+        self.assertEqual(response.data['transactions']['deleted'], [])
+        cursors = {entity: data['cursor'] for entity, data in response.data.items()}
+
+        # Nothing changed: no rows, and the same queries however long the history
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/sync/', cursors)
+        self.assertTrue(all(
+            not data['updated'] and not data['deleted'] and not data['has_more']
+            for data in response.data.values()
+        ))
+        self.assertEqual(len(queries), 6)
+        cursors = {entity: data['cursor'] for entity, data in response.data.items()}
+
+        edited.description = 'Edited again'
+        edited.save()
+        removed_id, doomed_id, budget_id = removed.id, doomed.id, budget.id
+        removed.delete()
+        new_category = Category.objects.create(name='New', user=self.user)
+        doomed.delete()
+
+        response = self.client.get('/api/sync/', cursors)
+        transactions = response.data['transactions']
+        self.assertEqual(
+            {row['id']: row['category'] for row in transactions['updated']},
+            {edited.id: self.category.id, orphan.id: None}
+        )
+        self.assertEqual(transactions['deleted'], [removed_id])
+        self.assertEqual(
+            [row['id'] for row in response.data['categories']['updated']], [new_category.id]
+        )
+        self.assertEqual(response.data['categories']['deleted'], [doomed_id])
+        self.assertEqual(response.data['budgets']['deleted'], [budget_id])
+
+        # Small pages report has_more until the entity is caught up
+        response = self.client.get('/api/sync/', {'entities': 'transactions', 'limit': 2})
+        self.assertEqual(list(response.data), ['transactions'])
+        self.assertTrue(response.data['transactions']['has_more'])
+        seen = [row['id'] for row in response.data['transactions']['updated']]
+        response = self.client.get('/api/sync/', {
+            'entities': 'transactions', 'limit': 2,
+            'transactions': response.data['transactions']['cursor']
+        })
+        self.assertFalse(response.data['transactions']['has_more'])
+        seen += [row['id'] for row in response.data['transactions']['updated']]
+        self.assertEqual(sorted(seen), sorted([kept.id, edited.id, orphan.id]))
+
+        response = self.client.get('/api/sync/', {'transactions': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/sync/', {'entities': 'goals'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=0):
+            response = self.client.get('/api/sync/', cursors)
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+        # Deleting a user takes their rows without leaving tombstones behind
+        other_id = other.id
+        other.delete()
+        self.assertFalse(Tombstone.objects.filter(user_id=other_id).exists())
+
+    def test_delta_sync_overlap(self):
+        """Test rows and deletes committed behind an issued cursor are still sent"""
+        today = timezone.now().date()
+
+        def create(description):
+            return Transaction.objects.create(
+                user=self.user, amount=Decimal('10.00'), transaction_type='EXPENSE',
+                description=description, date=today
+            )
+
+        create('Deleted first').delete()
+        later = create('Later')
+        response = self.client.get('/api/sync/', {'entities': 'transactions'})
+        cursor = response.data['transactions']['cursor']
+
+        # Saved before the rows the cursor has passed, committed after it was issued
+        late = create('Late')
+        Transaction.objects.filter(pk=late.pk).update(
+            updated_at=later.updated_at - timedelta(milliseconds=1)
+        )
+        late_deleted = create('Late delete')
+        late_deleted_id = late_deleted.id
+        late_deleted.delete()
+        Tombstone.objects.filter(object_id=late_deleted_id).update(
+            deleted_at=later.updated_at - timedelta(milliseconds=1)
+        )
+
+        response = self.client.get(
+            '/api/sync/', {'entities': 'transactions', 'transactions': cursor}
+        )
+        transactions = response.data['transactions']
+        ids = [row['id'] for row in transactions['updated']]
+        self.assertIn(late.id, ids)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertIn(late_deleted_id, transactions['deleted'])
+
+        # Once a cursor is issued after the overlap nothing is sent again
+        with mock.patch('api.sync.time.time', return_value=time.time() + 60):
+            response = self.client.get('/api/sync/', {
+                'entities': 'transactions', 'transactions': transactions['cursor']
+            })
+            response = self.client.get('/api/sync/', {
+                'entities': 'transactions',
+                'transactions': response.data['transactions']['cursor']
+            })
+        self.assertEqual(response.data['transactions']['updated'], [])
+        self.assertEqual(response.data['transactions']['deleted'], [])
+
+    def test_token_authentication(self):
+        """Test register and login issue tokens that authenticate requests"""
+        client = APIClient()
+        response = client.post('/api/auth/register/', {
+            'username': 'tokenuser', 'email': 'token@example.com',
+            'password': 'Str0ng-passphrase'
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['user']['username'], 'tokenuser')
+        token = response.data['token']
+
+        response = client.post('/api/auth/register/', {
+            'username': 'weakuser', 'password': '123'
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', str(response.data))
+
+        response = client.post('/api/auth/login/', {
+            'username': 'tokenuser', 'password': 'wrong'
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = client.post('/api/auth/login/', {
+            'username': 'tokenuser', 'password': 'Str0ng-passphrase'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["token"]}')
+        response = client.get('/api/categories/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Known users are authenticated without touching the database
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.assertNumQueries(0):
+            user, _ = BearerTokenAuthentication().authenticate(request)
+        self.assertEqual(user.username, 'tokenuser')
+
+        for header in (f'Bearer {token}x', 'Bearer', 'Bearer a b'):
+            client.credentials(HTTP_AUTHORIZATION=header)
+            response = client.get('/api/categories/')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with override_settings(API_TOKEN_TTL=-1):
+            response = client.get('/api/categories/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Changing the password revokes the tokens issued before
+        user.set_password('An0ther-passphrase')
+        user.save()
+        response = client.get('/api/categories/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        user_cache.clear()
+
+class DashboardTestCase(TransactionTestCase):
+    """The dashboard computes its ML parts in other threads, which only see
+    committed rows, hence TransactionTestCase."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='dashboarduser', password='testpass123')
+        category = Category.objects.create(name='Groceries', user=self.user)
+        today = timezone.now().date()
+        for i in range(15):
+            Transaction.objects.create(
+                user=self.user, category=category, amount=Decimal(20 + i),
+                transaction_type='INCOME' if i % 5 == 0 else 'EXPENSE',
+                description=f'Dashboard {i}', date=today - timedelta(days=i)
+            )
+        Budget.objects.create(
+            user=self.user, category=category, amount=Decimal('500.00'),
+            start_date=today.replace(day=1), end_date=today + timedelta(days=30)
+        )
+        SavingsGoal.objects.create(
+            user=self.user, name='Holiday', target_amount=Decimal('1000.00'),
+            current_amount=Decimal('250.00'), target_date=today + timedelta(days=90)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.token = issue_token(self.user)
+
+    def tearDown(self):
+        user_cache.clear()
+
+    def test_dashboard_combines_the_endpoints(self):
+        response = asyncio.run(AsyncClient().get(
+            '/api/dashboard/', headers={'Authorization': f'Bearer {self.token}'}
+        ))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        data = json.loads(response.content)
+
+        def endpoint(path):
+            return json.loads(self.client.get(path).content)
+
+        today = timezone.now().date()
+        self.assertEqual(data['summary'], endpoint(
+            f'/api/transactions/monthly_summary/?month={today.month}&year={today.year}'
+        ))
+        self.assertEqual(
+            data['recent_transactions'], endpoint('/api/transactions/?page=1')['results']
+        )
+        self.assertEqual(data['budgets'], endpoint('/api/budgets/status/'))
+        goal = SavingsGoal.objects.get(user=self.user)
+        self.assertEqual(data['savings_goals'], [endpoint(f'/api/savings-goals/{goal.id}/')])
+        self.assertEqual(data['predictions'], endpoint('/api/transactions/predictions/'))
+        self.assertEqual(data['analysis'], endpoint('/api/transactions/analysis/'))
+
+        # The synchronous test client (and WSGI) serve it too
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        response = client.get('/api/dashboard/')
+        self.assertEqual(json.loads(response.content)['budgets'], data['budgets'])
+
+    def test_dashboard_is_served_asynchronously(self):
+        """Test the instrumentation keeps the middleware chain async and still counts queries"""
+        # A sync-only middleware would make Django run it, and everything
+        # outside the view, in a thread on every ASGI request
+        self.assertTrue(iscoroutinefunction(InstrumentationMiddleware(views.dashboard_view)))
+        self.assertFalse(iscoroutinefunction(InstrumentationMiddleware(views.login_view)))
+
+        metrics.reset()
+        response = asyncio.run(AsyncClient().get(
+            '/api/dashboard/', headers={'Authorization': f'Bearer {self.token}'}
+        ))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        queries = int(re.search(r'desc="(\d+) queries"', response['Server-Timing']).group(1))
+        self.assertGreater(queries, 0)
+        self.assertIn(
+            'api_requests_total{endpoint="dashboard",method="GET",status="200"} 1',
+            metrics.render()
+        )
+
+    def test_ml_parts_run_concurrently(self):
+        # Each part waits for the other, so running them one after the other
+        # would break the barrier instead of answering
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wait(*args, **kwargs):
+            barrier.wait()
+            return {'status': 'ok'}
+
+        with mock.patch('api.views.expense_predictions', wait), \
+                mock.patch('api.views.analysis_from_statistics', wait):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+            response = client.get('/api/dashboard/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = json.loads(response.content)
+        self.assertEqual(data['predictions'], {'status': 'ok'})
+        self.assertEqual(data['analysis'], {'status': 'ok'})
+
+    def test_dashboard_requires_authentication(self):
+        response = APIClient().get('/api/dashboard/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer invalid')
+        response = client.get('/api/dashboard/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(json.loads(response.content), {'detail': 'Invalid token.'})
+
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(
+            client.post('/api/dashboard/').status_code, status.HTTP_405_METHOD_NOT_ALLOWED
+        )
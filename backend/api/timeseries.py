@@ -0,0 +1,167 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import BigIntegerField, CharField, DateField, F, Q, Sum, Value
+from django.db.models.functions import Trunc
+
+from .models import CategoryMetric, FinancialMetric
+
+PERIODS = ('day', 'week', 'month', 'year')
+DEFAULT_PERIOD = 'month'
+DEFAULT_BUCKETS = 12
+MAX_BUCKETS = 1000
+
+
+def bucket_start(day, period):
+    """Return the first day of the ``period`` containing ``day``, like Trunc."""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    if period == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_bucket(start, period):
+    """Return the start of the bucket after ``start``, or None past date.max."""
+    try:
+        if period == 'day':
+            return start + timedelta(days=1)
+        if period == 'week':
+            return start + timedelta(weeks=1)
+        if period == 'month':
+            return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+        return date(start.year + 1, 1, 1)
+    except (OverflowError, ValueError):
+        return None
+
+
+def previous_bucket(start, period):
+    """Return the start of the bucket before ``start``, or None before date.min."""
+    if start == date.min:
+        return None
+    return bucket_start(start - timedelta(days=1), period)
+
+
+def buckets(start, end, period):
+    """Return the starts of the ``period`` buckets overlapping [start, end]."""
+    current, starts = bucket_start(start, period), []
+    while current is not None and current <= end:
+        starts.append(current)
+        current = next_bucket(current, period)
+    return starts
+
+
+def bucket_count(start, end, period):
+    """Return len(buckets(start, end, period)) without building the list."""
+    if start > end:
+        return 0
+    if period == 'day':
+        return (end - start).days + 1
+    if period == 'week':
+        return (bucket_start(end, period) - bucket_start(start, period)).days // 7 + 1
+    if period == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return end.year - start.year + 1
+
+
+def year_earlier(day, period):
+    """Return ``day`` a year earlier; weeks move back 52 weeks to keep the weekday.
+
+    Raises OverflowError or ValueError before date.min.
+    """
+    if period == 'week':
+        return day - timedelta(weeks=52)
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:  # 29 February
+        return day.replace(year=day.year - 1, day=28)
+
+
+def _rollup_rows(user, period, ranges):
+    # Totals (with a null category) and per-category totals by bucket, as one
+    # UNION ALL over the daily rollups
+    in_ranges = Q()
+    for start, end in ranges:
+        in_ranges |= Q(date__gte=start, date__lte=end)
+    # Rollups are daily already; truncating to the day would only cost a
+    # function call per row (a Python one on SQLite)
+    bucket = F('date') if period == 'day' else Trunc('date', period, output_field=DateField())
+    totals = FinancialMetric.objects.filter(in_ranges, user=user).annotate(
+        bucket=bucket,
+        category_key=Value(None, output_field=BigIntegerField()),
+        category_name=Value(None, output_field=CharField())
+    ).values('bucket', 'category_key', 'category_name').annotate(
+        income=Sum('total_income'), expenses=Sum('total_expenses')
+    ).order_by()
+    # Annotations throughout, so both sides select their columns in the same order
+    by_category = CategoryMetric.objects.filter(in_ranges, user=user).annotate(
+        bucket=bucket, category_key=F('category_id'), category_name=F('category__name')
+    ).values('bucket', 'category_key', 'category_name').annotate(
+        income=Sum('total_income'), expenses=Sum('total_expenses')
+    ).order_by()
+    return totals.union(by_category, all=True)
+
+
+def _change(current, previous):
+    if not previous:
+        return None
+    return ((current - previous) * 100 / previous).quantize(Decimal('0.01'))
+
+
+def timeseries(user, period, start, end, year_over_year=False):
+    """Income, expenses and per-category totals of ``user`` by ``period``.
+
+    Every bucket overlapping [start, end] is returned, empty ones included;
+    the first and last only count the days inside the range. With
+    ``year_over_year`` each bucket also carries the totals of the same days
+    a year earlier and the percentage change. One query reads the daily
+    rollups, whatever the range.
+    """
+    ranges = [(start, end)]
+    if year_over_year:
+        ranges.append((year_earlier(start, period), year_earlier(end, period)))
+
+    zero = Decimal('0')
+    grouped = {}
+    for row in _rollup_rows(user, period, ranges):
+        entry = grouped.setdefault(
+            row['bucket'], {'income': zero, 'expenses': zero, 'categories': []}
+        )
+        income, expenses = row['income'] or zero, row['expenses'] or zero
+        if row['category_key'] is None:
+            entry['income'], entry['expenses'] = income, expenses
+        else:
+            entry['categories'].append({
+                'category_id': row['category_key'],
+                'category': row['category_name'],
+                'income': income,
+                'expenses': expenses,
+            })
+
+    empty = {'income': zero, 'expenses': zero, 'categories': []}
+    results = []
+    for bucket in buckets(start, end, period):
+        entry = grouped.get(bucket, empty)
+        result = {
+            'period': bucket,
+            'total_income': entry['income'],
+            'total_expenses': entry['expenses'],
+            'net': entry['income'] - entry['expenses'],
+            'by_category': sorted(entry['categories'], key=lambda c: c['category_id']),
+        }
+        if year_over_year:
+            previous_bucket = bucket_start(year_earlier(bucket, period), period)
+            previous = grouped.get(previous_bucket, empty)
+            result['previous_year'] = {
+                'period': previous_bucket,
+                'total_income': previous['income'],
+                'total_expenses': previous['expenses'],
+            }
+            result['change'] = {
+                'total_income': _change(entry['income'], previous['income']),
+                'total_expenses': _change(entry['expenses'], previous['expenses']),
+            }
+        results.append(result)
+    return results
@@ -2,7 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     CategoryViewSet, TransactionViewSet, BudgetViewSet,
-    SavingsGoalViewSet, FinancialMetricViewSet
+    SavingsGoalViewSet, FinancialMetricViewSet, MLJobViewSet, metrics_view, sync_view,
+    login_view, register_view, dashboard_view
 )
 
 router = DefaultRouter()
@@ -11,7 +12,13 @@ router.register(r'transactions', TransactionViewSet, basename='transaction')
 router.register(r'budgets', BudgetViewSet, basename='budget')
 router.register(r'savings-goals', SavingsGoalViewSet, basename='savings-goal')
 router.register(r'financial-metrics', FinancialMetricViewSet, basename='financial-metric')
+router.register(r'ml-jobs', MLJobViewSet, basename='ml-job')
 
 urlpatterns = [
+    path('auth/login/', login_view, name='login'),
+    path('auth/register/', register_view, name='register'),
+    path('metrics/', metrics_view, name='metrics'),
+    path('sync/', sync_view, name='sync'),
+    path('dashboard/', dashboard_view, name='dashboard'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,119 +1,594 @@
-from rest_framework import viewsets, permissions, filters
-from rest_framework.decorators import action
+from rest_framework import viewsets, permissions, filters, status, exceptions
+from rest_framework.decorators import (
+    action, api_view, authentication_classes, permission_classes
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 from rest_framework.response import Response
-from django.db.models import Sum, F
+from rest_framework.settings import api_settings
+from asgiref.sync import sync_to_async
+from django.db.models import (
+    Sum, F, OuterRef, Subquery, Value, DecimalField, ExpressionWrapper
+)
+from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.db import close_old_connections
 from django.utils import timezone
-from .models import Category, Transaction, Budget, SavingsGoal, FinancialMetric
+from ml_models.utils.forecasting import DEFAULT_ENGINE, ENGINES
+from ml_models.utils.prediction import analyze_spending_patterns
+from .authentication import issue_token
+from .cache import CachedResponseMixin, cached_user_data, cached_user_response
+from .exporters import EXPORTERS, CSVRenderer, JSONLinesRenderer, export_rows
+from .importers import DEFAULT_ENCODING, PARSERS, detect_format, import_transactions
+from .instrumentation import metrics as request_metrics
+from .jobs import expense_predictions
+from .models import (
+    Category, Transaction, Budget, SavingsGoal, FinancialMetric, CategoryMetric, MLJob
+)
 from .serializers import (
     CategorySerializer, TransactionSerializer, BudgetSerializer,
-    SavingsGoalSerializer, FinancialMetricSerializer, UserSerializer
+    SavingsGoalSerializer, FinancialMetricSerializer, MLJobSerializer, UserSerializer,
+    LoginSerializer, RegisterSerializer
 )
-from datetime import datetime, timedelta
+from .statistics import analysis_from_statistics
+from .timeseries import (
+    DEFAULT_BUCKETS, DEFAULT_PERIOD, MAX_BUCKETS, PERIODS, bucket_count, bucket_start,
+    previous_bucket, timeseries, year_earlier
+)
+from .sync import DEFAULT_LIMIT, MAX_LIMIT, ExpiredCursor, InvalidCursor, changes, decode_cursor
+from django.http import HttpResponse, StreamingHttpResponse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import MAXYEAR, MINYEAR, date, datetime
+import asyncio
+import calendar
+import codecs
+import io
 from decimal import Decimal
 
-class CategoryViewSet(viewsets.ModelViewSet):
+DASHBOARD_RECENT_TRANSACTIONS = 10
+DASHBOARD_FORECAST_DAYS = 30
+
+class CategoryViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         return Category.objects.filter(user=self.request.user)
 
-class TransactionViewSet(viewsets.ModelViewSet):
+SUMMARY_TOTALS = {
+    'total_income': Sum('total_income'),
+    'total_expenses': Sum('total_expenses'),
+}
+
+def month_rollups(user, year, month):
+    """Querysets of a month's daily totals and its expenses per category.
+
+    They read the daily rollups maintained by api.signals, so the cost
+    depends on the number of days in the month, not of transactions.
+    """
+    # A date range keeps the lookups index friendly, unlike
+    # date__month/date__year which wrap the column in a function.
+    start_date = date(year, month, 1)
+    end_date = date(year, month, calendar.monthrange(year, month)[1])
+    daily = FinancialMetric.objects.filter(
+        user=user,
+        date__gte=start_date,
+        date__lte=end_date
+    )
+    by_category = CategoryMetric.objects.filter(
+        user=user,
+        date__gte=start_date,
+        date__lte=end_date
+    ).values('category_id', 'category__name').annotate(
+        amount=Sum('total_expenses')
+    ).filter(amount__gt=0).order_by('category_id')
+    return daily, by_category
+
+def summary_data(totals, by_category):
+    return {
+        'total_income': totals['total_income'] or 0,
+        'total_expenses': totals['total_expenses'] or 0,
+        'by_category': [
+            {'category': row['category__name'], 'amount': row['amount']}
+            for row in by_category
+        ]
+    }
+
+def prediction_params(days_ahead, engine):
+    """Cache parameters of a forecast, and the start of the day it is for."""
+    # Forecasts start tomorrow, so they also change when the day does
+    start_of_day = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    params = {'days': days_ahead, 'date': start_of_day.date().isoformat(), 'engine': engine}
+    return params, start_of_day
+
+def prediction_cacheable(data):
+    # Answers from an outdated model must not outlive the retraining job
+    return 'job_id' not in data
+
+class TransactionViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['description', 'category__name']
     ordering_fields = ['date', 'amount', 'created_at']
+    keyset_ordering = ('-date', '-id')
+    # predictions and analysis cache themselves; export streams
+    cached_actions = ('list', 'retrieve', 'monthly_summary', 'timeseries', 'anomalies')
 
     def get_queryset(self):
-        return Transaction.objects.filter(user=self.request.user)
+        # category_name is serialized for every row. Categories are fetched in
+        # one extra query per page rather than joined, as a join would also be
+        # evaluated for every row an OFFSET skips on deep pages.
+        return Transaction.objects.filter(user=self.request.user).prefetch_related('category')
 
     @action(detail=False, methods=['get'])
     def monthly_summary(self, request):
-        month = request.query_params.get('month', timezone.now().month)
-        year = request.query_params.get('year', timezone.now().year)
+        today = timezone.now()
+        errors, values = {}, {}
+        for name, default, low, high in [
+            ('month', today.month, 1, 12), ('year', today.year, MINYEAR, MAXYEAR)
+        ]:
+            try:
+                values[name] = int(request.query_params.get(name, default))
+            except ValueError:
+                errors[name] = ['A valid integer is required.']
+                continue
+            if not low <= values[name] <= high:
+                errors[name] = [f'Must be between {low} and {high}.']
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        month, year = values['month'], values['year']
+        daily, by_category = month_rollups(request.user, year, month)
+        return Response(summary_data(daily.aggregate(**SUMMARY_TOTALS), by_category))
+
+    @action(detail=False, methods=['get'])
+    def timeseries(self, request):
+        """Income, expense and category totals per ``?period`` (day, week,
+        month or year) from ``?start`` to ``?end``, by default the last 12.
 
-        transactions = self.get_queryset().filter(
-            date__month=month,
-            date__year=year
+        ``?compare=yoy`` adds the same days a year earlier and the change.
+        """
+        period = request.query_params.get('period') or DEFAULT_PERIOD
+        if period not in PERIODS:
+            return Response({'period': [f'"{period}" is not a valid choice.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            end = date.fromisoformat(request.query_params['end']) \
+                if request.query_params.get('end') else timezone.now().date()
+            start = date.fromisoformat(request.query_params['start']) \
+                if request.query_params.get('start') else None
+        except ValueError:
+            return Response({'detail': 'Dates must be in YYYY-MM-DD format.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if start is None:
+            start = bucket_start(end, period)
+            for _ in range(DEFAULT_BUCKETS - 1):
+                # Fewer buckets near date.min
+                start = previous_bucket(start, period) or start
+        if start > end:
+            return Response({'detail': 'start must not be after end.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if bucket_count(start, end, period) > MAX_BUCKETS:
+            return Response({'detail': f'The range spans more than {MAX_BUCKETS} periods.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        year_over_year = request.query_params.get('compare') == 'yoy'
+        if year_over_year:
+            try:
+                year_earlier(bucket_start(start, period), period)
+            except (OverflowError, ValueError):
+                return Response({'detail': 'There is no year before start to compare with.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'period': period,
+            'start': start,
+            'end': end,
+            'results': timeseries(request.user, period, start, end, year_over_year)
+        })
+
+    @action(detail=False, methods=['get'])
+    def predictions(self, request):
+        try:
+            days_ahead = min(max(int(request.query_params.get('days', 30)), 1), 365)
+        except ValueError:
+            return Response({'days': ['A valid integer is required.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        engine = request.query_params.get('engine') or DEFAULT_ENGINE
+        if engine not in ENGINES:
+            return Response({'engine': [f'"{engine}" is not a valid choice.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        params, start_of_day = prediction_params(days_ahead, engine)
+        return cached_user_response(
+            request, 'predictions',
+            lambda: expense_predictions(request.user, days_ahead, engine=engine),
+            params=params,
+            cacheable=prediction_cacheable,
+            not_modified_before=start_of_day.timestamp()
         )
 
-        summary = {
-            'total_income': transactions.filter(
-                transaction_type='INCOME'
-            ).aggregate(total=Sum('amount'))['total'] or 0,
-            'total_expenses': transactions.filter(
-                transaction_type='EXPENSE'
-            ).aggregate(total=Sum('amount'))['total'] or 0,
-            'by_category': []
-        }
+    @action(detail=False, methods=['get'])
+    def analysis(self, request):
+        """Spending analysis from the incrementally maintained statistics.
 
-        for category in Category.objects.filter(user=request.user):
-            category_expenses = transactions.filter(
-                category=category,
-                transaction_type='EXPENSE'
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            if category_expenses > 0:
-                summary['by_category'].append({
-                    'category': category.name,
-                    'amount': category_expenses
-                })
+        ``?recompute=true`` runs the full pandas analysis over every transaction.
+        """
+        if request.query_params.get('recompute', '').lower() in ('1', 'true', 'yes'):
+            return cached_user_response(
+                request, 'analysis-full',
+                lambda: analyze_spending_patterns(self.get_queryset())
+            )
+        return cached_user_response(
+            request, 'analysis',
+            lambda: analysis_from_statistics(request.user)
+        )
 
-        return Response(summary)
+    @action(detail=False, methods=['get'])
+    def anomalies(self, request):
+        """Expenses scored at or above ``?min_score`` (ANOMALY_THRESHOLD by default)."""
+        try:
+            min_score = float(request.query_params.get('min_score', settings.ANOMALY_THRESHOLD))
+        except ValueError:
+            return Response({'min_score': ['A valid number is required.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.filter_queryset(self.get_queryset()).filter(anomaly_score__gte=min_score)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        return Response(self.get_serializer(queryset, many=True).data)
 
-class BudgetViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'], renderer_classes=[JSONLinesRenderer, CSVRenderer])
+    def export(self, request):
+        """Stream every matching transaction as JSON Lines or, with ``?format=csv``, CSV.
+
+        Rows bypass the serializer and are encoded by api.exporters while
+        they are read, so memory use does not grow with the history.
+        """
+        export_format = request.accepted_renderer.format
+        queryset = self.filter_queryset(
+            Transaction.objects.filter(user=request.user)
+        ).order_by('date', 'id')
+        response = StreamingHttpResponse(
+            EXPORTERS[export_format](export_rows(queryset)),
+            content_type=request.accepted_renderer.media_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="transactions.{export_format}"'
+        return response
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Import many transactions from an uploaded CSV/OFX/QIF file or a JSON list.
+
+        Categories are referenced by name and created when missing. Files are
+        read as UTF-8 unless another ``encoding`` (e.g. latin-1) is given.
+        """
+        upload = request.FILES.get('file')
+        if upload is not None:
+            import_format = request.data.get('format') or detect_format(upload.name)
+            if import_format not in PARSERS:
+                return Response(
+                    {'format': [f'Unsupported format "{import_format}".']},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            encoding = request.data.get('encoding') or DEFAULT_ENCODING
+            try:
+                codecs.lookup(encoding)
+            except LookupError:
+                return Response(
+                    {'encoding': [f'Unknown encoding "{encoding}".']},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            stream = io.TextIOWrapper(upload.file, encoding=encoding, newline='')
+            records = PARSERS[import_format](stream)
+        elif isinstance(request.data, list):
+            records = enumerate(request.data, start=1)
+        else:
+            return Response(
+                {'detail': 'Upload a file or send a list of transactions.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        result = import_transactions(request.user, records)
+        return Response(
+            result,
+            status=status.HTTP_201_CREATED if result['created'] else status.HTTP_400_BAD_REQUEST
+        )
+
+def with_spending(budgets):
+    """Annotate budgets with spent_amount and remaining_amount.
+
+    Spent amounts come from the per-category daily rollups in one correlated
+    subquery, so listing budgets costs a fixed number of queries however many
+    budgets the user has.
+    """
+    spent = CategoryMetric.objects.filter(
+        user=OuterRef('user'),
+        category=OuterRef('category'),
+        date__gte=OuterRef('start_date'),
+        date__lte=OuterRef('end_date')
+    ).order_by().values('category').annotate(
+        total=Sum('total_expenses')
+    ).values('total')
+    amount_field = DecimalField(max_digits=10, decimal_places=2)
+
+    return budgets.annotate(
+        spent_amount=Coalesce(
+            Subquery(spent, output_field=amount_field),
+            Value(Decimal('0')),
+            output_field=amount_field
+        )
+    ).annotate(
+        remaining_amount=ExpressionWrapper(
+            F('amount') - F('spent_amount'),
+            output_field=amount_field
+        )
+    )
+
+def budget_status(budget):
+    return {
+        'id': budget.id,
+        'category': budget.category_id,
+        'category_name': budget.category.name,
+        'amount': budget.amount,
+        'start_date': budget.start_date,
+        'end_date': budget.end_date,
+        'spent_amount': budget.spent_amount,
+        'remaining_amount': budget.remaining_amount
+    }
+
+class BudgetViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = BudgetSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['category__name']
     ordering_fields = ['start_date', 'end_date', 'amount']
+    keyset_ordering = ('-start_date', '-id')
+    cached_actions = ('list', 'retrieve', 'status')
 
     def get_queryset(self):
-        return Budget.objects.filter(user=self.request.user)
+        return with_spending(
+            Budget.objects.filter(user=self.request.user).select_related('category')
+        )
 
-    def get_expenses_for_budget(self, budget):
-        return Transaction.objects.filter(
-            user=self.request.user,
-            category=budget.category,
-            transaction_type='EXPENSE',
-            date__gte=budget.start_date,
-            date__lte=budget.end_date
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    @action(detail=False, methods=['get'])
+    def status(self, request):
+        budgets = self.filter_queryset(self.get_queryset()).order_by('start_date', 'id')
+        return Response([budget_status(budget) for budget in budgets])
 
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        spent = self.get_expenses_for_budget(instance)
-        data = self.get_serializer(instance).data
-        data['spent_amount'] = spent
-        data['remaining_amount'] = instance.amount - spent
-        return Response(data)
+def with_progress(goal, data):
+    if goal.target_amount > 0:
+        progress = (goal.current_amount / goal.target_amount) * 100
+        data['progress_percentage'] = round(progress, 2)
+    return data
 
-class SavingsGoalViewSet(viewsets.ModelViewSet):
+class SavingsGoalViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = SavingsGoalSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name']
     ordering_fields = ['target_date', 'target_amount']
+    keyset_ordering = ('target_date', 'id')
 
     def get_queryset(self):
         return SavingsGoal.objects.filter(user=self.request.user)
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        data = self.get_serializer(instance).data
-        if instance.target_amount > 0:
-            progress = (instance.current_amount / instance.target_amount) * 100
-            data['progress_percentage'] = round(progress, 2)
-        return Response(data)
+        return Response(with_progress(instance, self.get_serializer(instance).data))
 
-class FinancialMetricViewSet(viewsets.ModelViewSet):
+class FinancialMetricViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    # Rollups maintained by api.signals; edits would put them out of step
+    # with the transactions and the per-category rollups
     serializer_class = FinancialMetricSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['date']
+    keyset_ordering = ('-date', '-id')
 
     def get_queryset(self):
         return FinancialMetric.objects.filter(user=self.request.user)
+
+class MLJobViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = MLJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['created_at']
+    keyset_ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        return MLJob.objects.filter(user=self.request.user)
+
+def token_response(user, status_code=status.HTTP_200_OK):
+    return Response(
+        {'token': issue_token(user), 'user': UserSerializer(user).data}, status=status_code
+    )
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def login_view(request):
+    """Exchange a username and password for an API token."""
+    serializer = LoginSerializer(data=request.data, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    return token_response(serializer.validated_data['user'])
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def register_view(request):
+    """Create an account and return an API token for it."""
+    serializer = RegisterSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    return token_response(serializer.save(), status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def metrics_view(request):
+    """Request metrics of this process in the Prometheus text format."""
+    return HttpResponse(
+        request_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+# Entity -> (rows of the user, serializer) served by sync_view
+SYNC_ENTITIES = {
+    'transactions': (
+        lambda user: Transaction.objects.filter(user=user).prefetch_related('category'),
+        TransactionSerializer
+    ),
+    'categories': (lambda user: Category.objects.filter(user=user), CategorySerializer),
+    'budgets': (
+        lambda user: with_spending(Budget.objects.filter(user=user).select_related('category')),
+        BudgetSerializer
+    ),
+}
+
+@api_view(['GET'])
+def sync_view(request):
+    """Rows created, changed or deleted since the cursors the client holds.
+
+    Pass the cursor returned for each entity as ``?transactions=...`` etc.;
+    without one the entity is sent in full. ``?entities=`` limits the
+    entities returned and ``?limit=`` the rows per entity; keep calling
+    while any entity reports ``has_more``. A budget's spent amount changes
+    with its transactions, not the budget, so refresh it from budgets/status/.
+    """
+    entities = request.query_params.get('entities')
+    entities = entities.split(',') if entities else list(SYNC_ENTITIES)
+    unknown = [entity for entity in entities if entity not in SYNC_ENTITIES]
+    if unknown:
+        return Response({'entities': [f'Unknown entities: {", ".join(unknown)}.']},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        return Response({'limit': ['A valid integer is required.']},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        cursors = {
+            entity: decode_cursor(request.query_params.get(entity)) for entity in entities
+        }
+    except ExpiredCursor as error:
+        return Response({'detail': f'{error}; sync again without a cursor.'},
+                        status=status.HTTP_410_GONE)
+    except InvalidCursor as error:
+        return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = {}
+    for entity in entities:
+        rows, serializer_class = SYNC_ENTITIES[entity]
+        result = changes(rows(request.user), request.user, entity, cursors[entity], limit)
+        result['updated'] = serializer_class(
+            result['updated'], many=True, context={'request': request}
+        ).data
+        data[entity] = result
+    return Response(data)
+
+# Bounds the ML work dashboards run at once; each thread has its own connection
+ml_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'DASHBOARD_ML_WORKERS', 4), thread_name_prefix='dashboard-ml'
+)
+
+def _in_ml_executor(func):
+    def run():
+        close_old_connections()
+        try:
+            return func()
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False, executor=ml_executor)()
+
+def _authenticate(request):
+    """Return the user of a plain Django request the way DRF views would, or
+    the APIException to answer with."""
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    try:
+        user = Request(request, authenticators=authenticators).user
+    except exceptions.APIException as error:
+        return None, error
+    if not user.is_authenticated:
+        return None, exceptions.NotAuthenticated()
+    return user, None
+
+def _json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(
+        JSONRenderer().render(data), status=status_code, content_type='application/json'
+    )
+
+async def _dashboard_summary(user):
+    today = timezone.now().date()
+    daily, by_category = month_rollups(user, today.year, today.month)
+    totals = await daily.aaggregate(**SUMMARY_TOTALS)
+    return summary_data(totals, [row async for row in by_category])
+
+async def _dashboard_transactions(user):
+    transactions = Transaction.objects.filter(user=user).select_related(
+        'category'
+    ).order_by('-date', '-id')[:DASHBOARD_RECENT_TRANSACTIONS]
+    return TransactionSerializer([t async for t in transactions], many=True).data
+
+async def _dashboard_budgets(user):
+    budgets = with_spending(
+        Budget.objects.filter(user=user).select_related('category')
+    ).order_by('start_date', 'id')
+    return [budget_status(budget) async for budget in budgets]
+
+async def _dashboard_goals(user):
+    goals = SavingsGoal.objects.filter(user=user).order_by('target_date', 'id')
+    return [
+        with_progress(goal, SavingsGoalSerializer(goal).data) async for goal in goals
+    ]
+
+def _dashboard_predictions(user):
+    params, _ = prediction_params(DASHBOARD_FORECAST_DAYS, DEFAULT_ENGINE)
+    return cached_user_data(
+        user.id, 'predictions',
+        lambda: expense_predictions(user, DASHBOARD_FORECAST_DAYS, engine=DEFAULT_ENGINE),
+        params=params, cacheable=prediction_cacheable
+    )
+
+def _dashboard_analysis(user):
+    return cached_user_data(user.id, 'analysis', lambda: analysis_from_statistics(user))
+
+async def dashboard_view(request):
+    """Everything the dashboard shows, in one response.
+
+    The current month's summary, recent transactions, budget status and
+    savings goals are read with the async ORM while the predictions and
+    spending analysis, which share the cache of their own endpoints, are
+    computed in ml_executor. The parts run concurrently, so the response
+    takes about as long as the slowest of them rather than their sum.
+    """
+    if request.method != 'GET':
+        return _json_response(
+            {'detail': f'Method "{request.method}" not allowed.'},
+            status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+    user, error = await sync_to_async(_authenticate)(request)
+    if error is not None:
+        response = _json_response({'detail': error.detail}, error.status_code)
+        if error.status_code == status.HTTP_401_UNAUTHORIZED:
+            authenticator = api_settings.DEFAULT_AUTHENTICATION_CLASSES[0]()
+            response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+        return response
+
+    summary, transactions, budgets, goals, predictions, analysis = await asyncio.gather(
+        _dashboard_summary(user),
+        _dashboard_transactions(user),
+        _dashboard_budgets(user),
+        _dashboard_goals(user),
+        _in_ml_executor(lambda: _dashboard_predictions(user)),
+        _in_ml_executor(lambda: _dashboard_analysis(user)),
+    )
+    return _json_response({
+        'summary': summary,
+        'recent_transactions': transactions,
+        'budgets': budgets,
+        'savings_goals': goals,
+        'predictions': predictions,
+        'analysis': analysis,
+    })
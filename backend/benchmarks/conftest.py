@@ -0,0 +1,121 @@
+"""Options and fixtures of the API benchmark suite.
+
+Run from the backend directory::
+
+    python -m pytest benchmarks --bench-scales 1k,100k,1m
+
+Every case is compared with baselines.json and fails when its query count
+grows, or its latency or peak memory exceeds the baseline by more than the
+tolerance. ``--bench-save`` records the current numbers as the new baseline.
+"""
+import io
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+BASELINE_FILE = BENCHMARK_DIR / 'baselines.json'
+# Transactions seeded for the benchmark user at each scale
+SCALES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+
+sys.path.insert(0, str(BENCHMARK_DIR.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finance_tracker.settings')
+# Keep the models trained for the predictions endpoint out of saved_models
+os.environ.setdefault('ML_MODEL_DIR', tempfile.mkdtemp(prefix='finance-benchmark-models-'))
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption('--bench-scales', default='1k',
+                    help=f'Comma separated data scales to run ({", ".join(SCALES)})')
+    group.addoption('--bench-rounds', type=int, default=5,
+                    help='Timed runs per case; the median is compared')
+    group.addoption('--bench-tolerance', type=float, default=0.5,
+                    help='Allowed relative latency and memory growth over the baseline')
+    group.addoption('--bench-save', action='store_true',
+                    help='Write the measured numbers to baselines.json')
+    group.addoption('--bench-keepdb', action='store_true',
+                    help='Keep the seeded database between runs (SQLite: benchmarks/*.sqlite3)')
+
+
+def pytest_configure(config):
+    import django
+    from django.conf import settings
+
+    if config.getoption('--bench-keepdb'):
+        database = settings.DATABASES['default']
+        if database['ENGINE'] == 'django.db.backends.sqlite3':
+            # The default SQLite test database lives in memory
+            database.setdefault('TEST', {})['NAME'] = str(BENCHMARK_DIR / 'benchmark.sqlite3')
+    django.setup()
+
+
+def pytest_generate_tests(metafunc):
+    if 'scale' in metafunc.fixturenames:
+        scales = metafunc.config.getoption('--bench-scales').split(',')
+        unknown = set(scales) - set(SCALES)
+        if unknown:
+            raise pytest.UsageError(f'Unknown benchmark scales: {", ".join(sorted(unknown))}')
+        metafunc.parametrize('scale', scales, indirect=True, scope='session')
+
+
+@pytest.fixture(scope='session')
+def database(request):
+    from django.test.utils import (
+        setup_databases, setup_test_environment, teardown_databases,
+        teardown_test_environment
+    )
+
+    keepdb = request.config.getoption('--bench-keepdb')
+    setup_test_environment(debug=False)
+    old_config = setup_databases(verbosity=0, interactive=False, keepdb=keepdb)
+    yield
+    teardown_databases(old_config, verbosity=0, keepdb=keepdb)
+    teardown_test_environment()
+
+
+@pytest.fixture(scope='session')
+def scale(request, database):
+    """Seed one user with the scale's transactions and return its details."""
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+
+    from api.jobs import train_user_model
+    from api.models import Budget, Transaction
+
+    name = request.param
+    count = SCALES[name]
+    user = User.objects.filter(username='testuser').first()
+    if user is None or Transaction.objects.filter(user=user).count() != count:
+        call_command('flush', interactive=False, verbosity=0)
+        call_command(
+            'init_sample_data', users=1, transactions_per_user=count, years=3, seed=42,
+            stdout=io.StringIO()
+        )
+        user = User.objects.get(username='testuser')
+    train_user_model(user.id)
+    latest = Transaction.objects.filter(user=user).latest('date').date
+    return {
+        'name': name,
+        'user': user,
+        'transactions': count,
+        'budget_id': Budget.objects.filter(user=user).values_list('id', flat=True).first(),
+        'month': latest.month,
+        'year': latest.year,
+    }
+
+
+@pytest.fixture(scope='session')
+def baselines(request):
+    """The committed baselines; measured cases are saved on exit with --bench-save."""
+    stored = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    measured = {}
+    yield stored, measured
+    if request.config.getoption('--bench-save') and measured:
+        for scale_name, cases in measured.items():
+            stored.setdefault(scale_name, {}).update(cases)
+        BASELINE_FILE.write_text(json.dumps(stored, indent=2, sort_keys=True) + '\n')
@@ -0,0 +1,180 @@
+"""Latency, query count and peak memory of the API endpoints and ML functions."""
+import gc
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+import pytest
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.test import APIClient
+
+from api.instrumentation import QueryRecorder
+from api.jobs import load_expense_history
+from api.models import Transaction
+from api.statistics import analysis_from_statistics
+from ml_models.utils.prediction import (
+    analyze_spending_patterns, forecast_with_model, prepare_daily_history,
+    train_expense_model
+)
+
+# Slack on top of the relative tolerance, so timer and allocator noise does
+# not fail cases that only take a millisecond or a few KiB
+LATENCY_SLACK_MS = 2.0
+MEMORY_SLACK_KIB = 64.0
+
+# Name -> function of the seeded scale returning the request path
+ENDPOINTS = {
+    'categories-list': lambda scale: '/api/categories/',
+    'transactions-list': lambda scale: '/api/transactions/',
+    'transactions-list-deep-page': (
+        lambda scale: f'/api/transactions/?page={scale["transactions"] // 20}'
+    ),
+    'transactions-list-cursor': lambda scale: '/api/transactions/?cursor=',
+    'transactions-search': lambda scale: '/api/transactions/?search=groceries',
+    'transactions-monthly-summary': (
+        lambda scale: f'/api/transactions/monthly_summary/?month={scale["month"]}'
+                      f'&year={scale["year"]}'
+    ),
+    'transactions-analysis': lambda scale: '/api/transactions/analysis/',
+    'transactions-analysis-recompute': (
+        lambda scale: '/api/transactions/analysis/?recompute=true'
+    ),
+    'transactions-predictions': lambda scale: '/api/transactions/predictions/',
+    'transactions-anomalies': lambda scale: '/api/transactions/anomalies/',
+    'transactions-timeseries-monthly-yoy': (
+        lambda scale: f'/api/transactions/timeseries/?end={scale["year"]}-{scale["month"]:02d}-28'
+                      f'&compare=yoy'
+    ),
+    'transactions-timeseries-daily': (
+        lambda scale: f'/api/transactions/timeseries/?period=day&start={scale["year"] - 1}-01-01'
+                      f'&end={scale["year"]}-12-31'
+    ),
+    'transactions-export-jsonl': lambda scale: '/api/transactions/export/',
+    'transactions-export-csv': lambda scale: '/api/transactions/export/?format=csv',
+    'budgets-list': lambda scale: '/api/budgets/',
+    'budgets-detail': lambda scale: f'/api/budgets/{scale["budget_id"]}/',
+    'budgets-status': lambda scale: '/api/budgets/status/',
+    'savings-goals-list': lambda scale: '/api/savings-goals/',
+    'financial-metrics-list': lambda scale: '/api/financial-metrics/',
+}
+
+
+# The ML cases below take the seeded scale and return the call to measure;
+# their inputs are prepared up front so only the function itself is timed
+
+
+def _analyze_spending_patterns(scale):
+    transactions = Transaction.objects.filter(user=scale['user'])
+    return lambda: analyze_spending_patterns(transactions)
+
+
+def _analysis_from_statistics(scale):
+    return lambda: analysis_from_statistics(scale['user'])
+
+
+def _prepare_daily_history(scale):
+    transactions = Transaction.objects.filter(user=scale['user'])
+    return lambda: prepare_daily_history(transactions)
+
+
+def _load_expense_history(scale):
+    return lambda: load_expense_history(scale['user'].id)
+
+
+def _train_expense_model(scale):
+    history = load_expense_history(scale['user'].id)
+    return lambda: train_expense_model(history)
+
+
+def _forecast_with_model(scale):
+    bundle = train_expense_model(load_expense_history(scale['user'].id))
+    return lambda: forecast_with_model(bundle, 30)
+
+
+ML_FUNCTIONS = {
+    'analyze_spending_patterns': _analyze_spending_patterns,
+    'analysis_from_statistics': _analysis_from_statistics,
+    'prepare_daily_history': _prepare_daily_history,
+    'load_expense_history': _load_expense_history,
+    'train_expense_model': _train_expense_model,
+    'forecast_with_model': _forecast_with_model,
+}
+
+
+def measure(run, rounds):
+    """Return the median latency, query count and peak memory of ``run``.
+
+    The cache is cleared before every run so cached endpoints are measured
+    computing their answer.
+    """
+    cache.clear()
+    run()  # warm up imports and database pages
+    timings = []
+    for _ in range(rounds):
+        cache.clear()
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+
+    # Measured in a separate run because tracemalloc slows allocation down
+    cache.clear()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'latency_ms': round(statistics.median(timings) * 1000, 2),
+        'queries': recorder.count,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def check(baselines, scale, case, result, tolerance):
+    stored, measured = baselines
+    measured.setdefault(scale['name'], {})[case] = result
+    baseline = stored.get(scale['name'], {}).get(case)
+    if baseline is None:
+        pytest.skip(f'No baseline for {scale["name"]}/{case}; run with --bench-save')
+
+    regressions = []
+    if result['queries'] > baseline['queries']:
+        regressions.append(f'{result["queries"]} queries (baseline {baseline["queries"]})')
+    if result['latency_ms'] > baseline['latency_ms'] * (1 + tolerance) + LATENCY_SLACK_MS:
+        regressions.append(
+            f'{result["latency_ms"]} ms (baseline {baseline["latency_ms"]} ms)'
+        )
+    if result['peak_kib'] > baseline['peak_kib'] * (1 + tolerance) + MEMORY_SLACK_KIB:
+        regressions.append(f'{result["peak_kib"]} KiB (baseline {baseline["peak_kib"]} KiB)')
+    assert not regressions, f'{scale["name"]}/{case} regressed: ' + ', '.join(regressions)
+
+
+@pytest.mark.parametrize('case', ENDPOINTS)
+def test_endpoint(case, scale, baselines, request):
+    client = APIClient()
+    client.force_authenticate(user=scale['user'])
+    path = ENDPOINTS[case](scale)
+
+    def run():
+        response = client.get(path)
+        assert response.status_code == 200, response.content[:200]
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+
+    result = measure(run, request.config.getoption('--bench-rounds'))
+    check(baselines, scale, case, result, request.config.getoption('--bench-tolerance'))
+
+
+@pytest.mark.parametrize('case', ML_FUNCTIONS)
+def test_ml_function(case, scale, baselines, request):
+    result = measure(ML_FUNCTIONS[case](scale), request.config.getoption('--bench-rounds'))
+    check(baselines, scale, case, result, request.config.getoption('--bench-tolerance'))
@@ -0,0 +1,70 @@
+"""Cache settings from ``CACHE_URL``."""
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.checks import Warning
+
+REDIS_SCHEMES = ('redis', 'rediss', 'unix')
+LOCMEM_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def default_cache_url(debug):
+    """``locmem://`` for development, otherwise a file cache under the
+    backend directory that every worker process of the host shares."""
+    return 'locmem://' if debug else 'file://cache'
+
+
+def cache_config(url, base_dir, timeout=300, max_entries=10000):
+    """Return a CACHES entry for a cache URL.
+
+    - ``locmem://`` keeps entries in each process (the default)
+    - ``file:///var/tmp/finance-cache`` shares them between the processes of
+      a host; relative paths (``file://cache``) are resolved against ``base_dir``
+    - ``redis://host:6379/0`` (or ``rediss://``, ``unix://``) shares them
+      between hosts through any Redis-compatible server; needs ``redis``
+    - ``dummy://`` disables caching
+
+    Local and file caches cull entries beyond ``max_entries``.
+    """
+    parts = urlsplit(url)
+    if parts.scheme == 'locmem':
+        config = {
+            'BACKEND': LOCMEM_BACKEND,
+            'LOCATION': parts.netloc or 'default',
+        }
+    elif parts.scheme == 'file':
+        path = parts.netloc + parts.path
+        config = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(Path(base_dir) / path),
+        }
+    elif parts.scheme in REDIS_SCHEMES:
+        config = {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': url,
+        }
+    elif parts.scheme == 'dummy':
+        config = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    else:
+        raise ValueError(f'Unsupported CACHE_URL scheme: {parts.scheme!r}')
+    config['TIMEOUT'] = timeout
+    if parts.scheme in ('locmem', 'file'):
+        config['OPTIONS'] = {'MAX_ENTRIES': max_entries}
+    return config
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """Warn when a deployment keeps API responses in a per-process cache.
+
+    A write bumps the user's data version only in the process that handled
+    it, so the other workers would go on serving stale responses.
+    """
+    if settings.DEBUG or settings.CACHES['default']['BACKEND'] != LOCMEM_BACKEND:
+        return []
+    return [Warning(
+        'CACHE_URL is locmem://, a per-process cache.',
+        hint='Unless a single process serves the API, use file:// or redis:// so '
+             'that writes invalidate the cached responses of every worker.',
+        id='finance_tracker.W001',
+    )]
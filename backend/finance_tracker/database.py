@@ -0,0 +1,71 @@
+"""Database settings from ``DATABASE_URL`` and per-connection SQLite tuning."""
+from pathlib import Path
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import django
+
+POSTGRES_SCHEMES = ('postgres', 'postgresql', 'pgsql')
+
+# Applied to every new SQLite connection by configure_sqlite. WAL lets
+# readers run alongside the single writer, and NORMAL sync is durable across
+# application crashes (only a power loss can drop the last commits).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,  # milliseconds to wait for the write lock
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def database_config(url, base_dir, conn_max_age=60, health_checks=True, pool=False):
+    """Return a DATABASES entry for a ``sqlite:///`` or ``postgresql://`` URL.
+
+    Relative SQLite paths are resolved against ``base_dir``. PostgreSQL
+    connections are kept open for ``conn_max_age`` seconds and checked
+    before reuse, or taken from a psycopg 3 pool when ``pool`` is set (Django
+    5.1+; persistent connections are then disabled). Query parameters such
+    as ``sslmode`` become connection OPTIONS.
+    """
+    parts = urlsplit(url)
+    options = dict(parse_qsl(parts.query))
+    if parts.scheme == 'sqlite':
+        path = unquote(parts.path)
+        # sqlite:///db.sqlite3 is relative, sqlite:////var/db.sqlite3 absolute
+        path = path[1:] if path.startswith('/') else path
+        if django.VERSION >= (5, 1):
+            # Take the write lock when a transaction starts, so read-then-write
+            # transactions wait for busy_timeout instead of failing at once
+            options.setdefault('transaction_mode', 'IMMEDIATE')
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path if path == ':memory:' else Path(base_dir) / path,
+            'OPTIONS': options,
+        }
+    if parts.scheme in POSTGRES_SCHEMES:
+        if pool:
+            options['pool'] = True
+        return {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': unquote(parts.path.lstrip('/')),
+            'USER': unquote(parts.username or ''),
+            'PASSWORD': unquote(parts.password or ''),
+            'HOST': parts.hostname or '',
+            'PORT': str(parts.port or ''),
+            'CONN_MAX_AGE': 0 if pool else conn_max_age,
+            'CONN_HEALTH_CHECKS': health_checks,
+            'OPTIONS': options,
+        }
+    raise ValueError(f'Unsupported DATABASE_URL scheme: {parts.scheme!r}')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created receiver applying SQLITE_PRAGMAS to SQLite connections."""
+    if connection.vendor != 'sqlite':
+        return
+    from django.conf import settings
+
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', SQLITE_PRAGMAS)
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
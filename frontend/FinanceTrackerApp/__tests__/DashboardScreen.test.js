@@ -7,25 +7,26 @@ jest.mock('../src/services/api');
 
 describe('DashboardScreen', () => {
   beforeEach(() => {
-    api.getTransactions.mockResolvedValue({
-      total_income: 5000,
-      total_expenses: 3000
-    });
-
-    api.getExpensePredictions.mockResolvedValue({
-      predictions: [
-        { date: '2025-11-01', predicted_amount: 100 },
-        { date: '2025-11-02', predicted_amount: 150 }
-      ],
-      model_accuracy: 85
-    });
-
-    api.getSpendingAnalysis.mockResolvedValue({
-      daily_patterns: {
-        highest_spending_day: 'Friday'
+    api.getDashboard.mockResolvedValue({
+      summary: {
+        total_income: 5000,
+        total_expenses: 3000,
+        by_category: []
+      },
+      predictions: {
+        predictions: [
+          { date: '2025-11-01', predicted_amount: 100 },
+          { date: '2025-11-02', predicted_amount: 150 }
+        ],
+        model_accuracy: 85
       },
-      monthly_patterns: {
-        average_monthly_expenses: 3000
+      analysis: {
+        daily_patterns: {
+          highest_spending_day: 'Friday'
+        },
+        monthly_patterns: {
+          average_monthly_expenses: 3000
+        }
       }
     });
   });
@@ -19,15 +19,11 @@ const DashboardScreen = () => {
 
   const loadDashboardData = async () => {
     try {
-      const [monthlyResponse, predictionsResponse, analysisResponse] = await Promise.all([
-        api.getTransactions({ period: 'monthly' }),
-        api.getExpensePredictions(),
-        api.getSpendingAnalysis(),
-      ]);
+      const dashboard = await api.getDashboard();
 
-      setMonthlyData(monthlyResponse);
-      setPredictions(predictionsResponse);
-      setSpendingAnalysis(analysisResponse);
+      setMonthlyData(dashboard.summary);
+      setPredictions(dashboard.predictions);
+      setSpendingAnalysis(dashboard.analysis);
     } catch (error) {
       console.error('Failed to load dashboard data:', error);
     } finally {
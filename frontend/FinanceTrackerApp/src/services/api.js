@@ -104,9 +104,19 @@ export const updateSavingsGoal = async (goalId, goalData) => {
   }
 };
 
+// Totals per period for trend charts, e.g. { period: 'month', compare: 'yoy' }
+export const getTimeseries = async (params) => {
+  try {
+    const response = await api.get('/transactions/timeseries/', { params });
+    return response.data;
+  } catch (error) {
+    throw error.response?.data || error.message;
+  }
+};
+
 export const getExpensePredictions = async () => {
   try {
-    const response = await api.get('/financial-metrics/predictions/');
+    const response = await api.get('/transactions/predictions/');
     return response.data;
   } catch (error) {
     throw error.response?.data || error.message;
@@ -115,7 +125,30 @@ export const getExpensePredictions = async () => {
 
 export const getSpendingAnalysis = async () => {
   try {
-    const response = await api.get('/financial-metrics/spending-analysis/');
+    const response = await api.get('/transactions/analysis/');
+    return response.data;
+  } catch (error) {
+    throw error.response?.data || error.message;
+  }
+};
+
+// Fetches the month's summary, recent transactions, budgets, savings goals,
+// predictions and spending analysis in one request
+export const getDashboard = async () => {
+  try {
+    const response = await api.get('/dashboard/');
+    return response.data;
+  } catch (error) {
+    throw error.response?.data || error.message;
+  }
+};
+
+// Fetches rows changed or deleted since the given per-entity cursors
+// ({ transactions, categories, budgets }); store the returned cursors and
+// call again while any entity reports has_more.
+export const syncChanges = async (cursors = {}) => {
+  try {
+    const response = await api.get('/sync/', { params: cursors });
     return response.data;
   } catch (error) {
     throw error.response?.data || error.message;
@@ -0,0 +1,97 @@
+"""Compare the forecasting engines on synthetic daily expense histories.
+
+Reports fit time, predict time, peak memory and the mean absolute error of
+the forecast against the held-out final days. Needs no database::
+
+    python ml_models/benchmarks/forecasting.py --days 90 365 1095 --histories 20
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from ml_models.utils.forecasting import ENGINES, get_engine  # noqa: E402
+
+# Spending multiplier per calendar month, as in init_sample_data
+SEASONALITY = {1: 0.8, 2: 0.9, 7: 1.15, 8: 1.2, 11: 1.2, 12: 1.5}
+# (day of month, typical amount) of monthly bills
+BILLS = [(1, 1200), (5, 150), (12, 15), (28, 300)]
+
+
+def synthetic_history(days, rng, end=None):
+    """Return a dense daily expense series with bills, weekends and seasons."""
+    end = pd.Timestamp(end or '2026-01-01')
+    index = pd.date_range(end=end, periods=days, freq='D')
+    scale = index.month.map(lambda month: SEASONALITY.get(month, 1.0)).to_numpy()
+    scale = scale * np.where(index.dayofweek >= 5, 1.4, 1.0)
+    scale = scale * np.linspace(1.0, 1.0 + 0.1 * days / 365, days)  # slow growth
+
+    purchases = rng.poisson(2.0, days)
+    values = np.array([
+        rng.lognormal(np.log(40), 0.6, count).sum() for count in purchases
+    ]) * scale
+    for day, amount in BILLS:
+        values[index.day == day] += amount * rng.uniform(0.95, 1.05, (index.day == day).sum())
+    return pd.Series(values, index=index)
+
+
+def run(engine_name, series, horizon):
+    train, test = series.iloc[:-horizon], series.iloc[-horizon:]
+    dates = test.index.to_numpy(dtype='datetime64[D]')
+
+    start = time.perf_counter()
+    engine = get_engine(engine_name).fit(train)
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predicted = engine.predict(dates)
+    predict_time = time.perf_counter() - start
+    return fit_time, predict_time, float(np.mean(np.abs(predicted - test.to_numpy())))
+
+
+def peak_memory(engine_name, series, horizon):
+    # Measured in a separate run because tracemalloc slows the fit down
+    gc.collect()
+    tracemalloc.start()
+    get_engine(engine_name).fit(series.iloc[:-horizon]).predict(
+        series.index[-horizon:].to_numpy(dtype='datetime64[D]')
+    )
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, nargs='+', default=[90, 365, 1095],
+                        help='History lengths to test')
+    parser.add_argument('--histories', type=int, default=20,
+                        help='Synthetic histories per length')
+    parser.add_argument('--horizon', type=int, default=30,
+                        help='Held-out days to forecast')
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=list(ENGINES))
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f'{"engine":<15} {"days":>5} {"fit ms":>9} {"predict ms":>11} '
+          f'{"peak KiB":>9} {"MAE":>8}')
+    for days in args.days:
+        rng = np.random.default_rng(args.seed)
+        histories = [synthetic_history(days + args.horizon, rng) for _ in range(args.histories)]
+        for engine_name in args.engines:
+            results = np.array([run(engine_name, series, args.horizon) for series in histories])
+            fit_time, predict_time, mae = results.mean(axis=0)
+            peak = peak_memory(engine_name, histories[0], args.horizon)
+            print(f'{engine_name:<15} {days:>5} {fit_time * 1000:>9.2f} '
+                  f'{predict_time * 1000:>11.2f} {peak / 1024:>9.1f} {mae:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
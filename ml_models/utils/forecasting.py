@@ -0,0 +1,248 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+SEASON = 7  # spending follows a weekly cycle
+
+
+def daily_history(dates, category_ids, amounts, start=None, end=None):
+    """Sum expense amounts into dense daily series with NumPy.
+
+    ``dates``, ``category_ids`` (None for uncategorised) and ``amounts`` are
+    parallel sequences, typically already aggregated per day and category.
+    Returns a dict with the overall ``total`` series and a ``categories``
+    frame holding one column per category id; both span ``start`` to ``end``
+    (default: the first and last date given) with zeros on days without
+    expenses. Returns None when there is nothing to span.
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    amounts = np.asarray(amounts, dtype=np.float64)
+    if start is None or end is None:
+        if not len(dates):
+            return None
+        start = dates.min() if start is None else start
+        end = dates.max() if end is None else end
+    start, end = np.datetime64(start, 'D'), np.datetime64(end, 'D')
+    if end < start:
+        return None
+
+    days = int((end - start).astype(np.int64)) + 1
+    positions = (dates - start).astype(np.int64)
+    inside = (positions >= 0) & (positions < days)
+    index = pd.date_range(pd.Timestamp(start), periods=days, freq='D')
+    total = pd.Series(np.bincount(
+        positions[inside], weights=amounts[inside], minlength=days
+    ).astype(np.float64), index=index)
+
+    categories = np.array([-1 if c is None else c for c in category_ids], dtype=np.int64)
+    categorised = inside & (categories >= 0)
+    labels, codes = np.unique(categories[categorised], return_inverse=True)
+    matrix = np.bincount(
+        codes * days + positions[categorised],
+        weights=amounts[categorised],
+        minlength=len(labels) * days
+    ).astype(np.float64).reshape(len(labels), days)
+    return {
+        'total': total,
+        'categories': pd.DataFrame(matrix.T, index=index, columns=labels.tolist()),
+    }
+
+
+def calendar_features(dates):
+    """Return the month, day-of-week and day-of-month arrays of ``dates``."""
+    index = pd.DatetimeIndex(dates)
+    return {
+        'month': index.month.to_numpy(),
+        'day_of_week': index.dayofweek.to_numpy(),
+        'day_of_month': index.day.to_numpy(),
+    }
+
+
+class ForecastEngine:
+    """Forecast daily expense totals from a dense daily series.
+
+    Subclasses implement ``_fit(values)`` over the series values and
+    ``_predict(offsets, dates, calendar)``, where offsets count days after
+    the last fitted day (1 is the next day) and calendar is the
+    calendar_features of dates, or None if the caller has not built them.
+    Forecasts are floored at zero.
+    """
+    name = None
+
+    def fit(self, series):
+        self.start = series.index[0].to_datetime64().astype('datetime64[D]')
+        self.end = series.index[-1].to_datetime64().astype('datetime64[D]')
+        self._fit(series.to_numpy(dtype=np.float64))
+        return self
+
+    def predict(self, dates, calendar=None):
+        """Forecast ``dates``; pass their ``calendar`` features to share them
+        between the models predicting the same days."""
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        offsets = (dates - self.end).astype(np.int64)
+        return np.maximum(self._predict(offsets, dates, calendar), 0.0)
+
+    def _fit(self, values):
+        raise NotImplementedError
+
+    def _predict(self, offsets, dates, calendar):
+        raise NotImplementedError
+
+
+class SeasonalNaiveEngine(ForecastEngine):
+    """Repeat the average of each weekday over the last ``seasons`` weeks."""
+    name = 'seasonal_naive'
+
+    def __init__(self, seasons=4):
+        self.seasons = seasons
+
+    def _fit(self, values):
+        tail = values[-SEASON * self.seasons:]
+        # Slot SEASON - 1 is the last fitted day
+        slots = (np.arange(len(tail)) - len(tail)) % SEASON
+        counts = np.bincount(slots, minlength=SEASON)
+        sums = np.bincount(slots, weights=tail, minlength=SEASON)
+        self.profile = np.where(counts > 0, sums / np.maximum(counts, 1), tail.mean())
+
+    def _predict(self, offsets, dates, calendar):
+        return self.profile[(offsets - 1) % SEASON]
+
+
+class ExponentialSmoothingEngine(ForecastEngine):
+    """Additive exponential smoothing with weekly and day-of-month seasonality.
+
+    The day-of-month component picks up monthly bills such as rent, which
+    a weekly cycle alone smears across the month.
+    """
+    name = 'exp_smoothing'
+
+    def __init__(self, alpha=0.05, gamma=0.1, delta=0.3):
+        self.alpha = alpha
+        self.gamma = gamma
+        self.delta = delta
+
+    def _fit(self, values):
+        days = (self.start + np.arange(len(values))).astype(object)
+        level = values[:SEASON].mean()
+        weekly = np.zeros(SEASON)
+        monthly = np.zeros(31)
+        for t, (value, day) in enumerate(zip(values.tolist(), days)):
+            slot, day_of_month = t % SEASON, day.day - 1
+            week, month = weekly[slot], monthly[day_of_month]
+            level = self.alpha * (value - week - month) + (1 - self.alpha) * level
+            weekly[slot] = self.gamma * (value - level - month) + (1 - self.gamma) * week
+            monthly[day_of_month] = (
+                self.delta * (value - level - weekly[slot]) + (1 - self.delta) * month
+            )
+        self.level = level
+        self.weekly = weekly
+        self.monthly = monthly
+        self.length = len(values)
+
+    def _predict(self, offsets, dates, calendar):
+        if calendar is None:
+            calendar = calendar_features(dates)
+        day_of_month = calendar['day_of_month'] - 1
+        return (
+            self.level + self.weekly[(self.length - 1 + offsets) % SEASON]
+            + self.monthly[day_of_month]
+        )
+
+
+class LinearRegressionEngine(ForecastEngine):
+    """Least squares on a trend plus weekday, day-of-month and month indicators.
+
+    Month indicators are only used with a year of history, as they would
+    otherwise just duplicate the trend.
+    """
+    name = 'linear'
+
+    def _design(self, dates, calendar=None):
+        if calendar is None:
+            calendar = calendar_features(dates)
+        columns = [
+            (dates - self.start).astype(np.float64) / 365.0,
+            np.eye(SEASON)[calendar['day_of_week']],
+            np.eye(31)[calendar['day_of_month'] - 1],
+        ]
+        if self.seasonal:
+            columns.append(np.eye(12)[calendar['month'] - 1])
+        return np.column_stack(columns)
+
+    def _fit(self, values):
+        self.seasonal = len(values) >= 365
+        dates = self.start + np.arange(len(values))
+        self.model = LinearRegression().fit(self._design(dates), values)
+
+    def _predict(self, offsets, dates, calendar):
+        return self.model.predict(self._design(dates, calendar))
+
+
+class RandomForestEngine(ForecastEngine):
+    """Random forest on the calendar features of each day."""
+    name = 'random_forest'
+
+    def __init__(self, n_estimators=100):
+        self.n_estimators = n_estimators
+
+    def _design(self, dates, calendar=None):
+        if calendar is None:
+            calendar = calendar_features(dates)
+        return np.column_stack([
+            calendar['month'], calendar['day_of_week'], calendar['day_of_month']
+        ])
+
+    def _fit(self, values):
+        dates = self.start + np.arange(len(values))
+        self.model = RandomForestRegressor(n_estimators=self.n_estimators, random_state=42)
+        self.model.fit(self._design(dates), values)
+
+    def _predict(self, offsets, dates, calendar):
+        return self.model.predict(self._design(dates, calendar))
+
+
+ENGINES = {
+    engine.name: engine
+    for engine in (
+        SeasonalNaiveEngine, ExponentialSmoothingEngine,
+        LinearRegressionEngine, RandomForestEngine,
+    )
+}
+# Chosen with ml_models/benchmarks/forecasting.py
+DEFAULT_ENGINE = 'exp_smoothing'
+
+
+def get_engine(name=None):
+    """Return a new, unfitted engine; raises ValueError for unknown names."""
+    try:
+        return ENGINES[name or DEFAULT_ENGINE]()
+    except KeyError:
+        raise ValueError(f'Unknown forecasting engine "{name}"')
+
+
+def train_forecaster(series, engine=None, holdout_days=28):
+    """Fit ``engine`` on a daily series and return a registry bundle.
+
+    The engine is first fitted without the last ``holdout_days`` (at most a
+    fifth of the history) and scored on them, then refitted on everything.
+    """
+    name = engine or DEFAULT_ENGINE
+    accuracy = mae = None
+    holdout = min(holdout_days, len(series) // 5)
+    if holdout:
+        predicted = get_engine(name).fit(series.iloc[:-holdout]).predict(
+            series.index[-holdout:].to_numpy(dtype='datetime64[D]')
+        )
+        actual = series.to_numpy()[-holdout:]
+        mae = round(float(np.mean(np.abs(predicted - actual))), 2)
+        total = float(np.sum((actual - actual.mean()) ** 2))
+        if total > 0:
+            accuracy = round((1 - float(np.sum((actual - predicted) ** 2)) / total) * 100, 2)
+
+    return {
+        'engine': name,
+        'model': get_engine(name).fit(series),
+        'accuracy': accuracy,
+        'mae': mae,
+    }
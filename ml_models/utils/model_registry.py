@@ -0,0 +1,122 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import joblib
+
+DEFAULT_MODEL_DIR = Path(__file__).resolve().parent.parent / 'saved_models'
+
+
+def transaction_fingerprint(transactions):
+    """Fingerprint a transaction queryset by its row count and latest update.
+
+    Any insert, edit or delete changes one of the two, so a model stored
+    under the fingerprint is only reused while the data it saw is unchanged.
+    """
+    from django.db.models import Count, Max
+
+    stats = transactions.order_by().aggregate(count=Count('id'), latest=Max('updated_at'))
+    latest = stats['latest'].strftime('%Y%m%d%H%M%S%f') if stats['latest'] else '0'
+    return f"{stats['count']}-{latest}"
+
+
+class ModelRegistry:
+    """Persist fitted models per owner and keep recently used ones in memory.
+
+    Models are stored with joblib as ``<owner>-<fingerprint>.joblib`` under
+    ``storage_dir``; saving a new fingerprint for an owner removes the older
+    files. At most ``max_in_memory`` models stay loaded, evicting the least
+    recently used one first.
+    """
+
+    def __init__(self, storage_dir=None, max_in_memory=32):
+        self.storage_dir = Path(storage_dir or os.getenv('ML_MODEL_DIR', DEFAULT_MODEL_DIR))
+        self.max_in_memory = max_in_memory
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, owner, fingerprint):
+        safe_fingerprint = re.sub(r'[^A-Za-z0-9_.-]', '_', str(fingerprint))
+        return self.storage_dir / f'{owner}-{safe_fingerprint}.joblib'
+
+    def _remember(self, key, model):
+        with self._lock:
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_in_memory:
+                self._models.popitem(last=False)
+
+    def get(self, owner, fingerprint):
+        """Return the model stored for ``owner`` at ``fingerprint`` or None."""
+        key = (str(owner), str(fingerprint))
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+
+        path = self._path(owner, fingerprint)
+        try:
+            model = joblib.load(path)
+        except (OSError, EOFError, ValueError):
+            return None
+        self._remember(key, model)
+        return model
+
+    def latest(self, owner):
+        """Return ``(fingerprint, model)`` for the newest stored model of ``owner``.
+
+        Used to keep serving the last good model while a fresh one trains.
+        Returns ``(None, None)`` when nothing has been stored yet.
+        """
+        def modified(path):
+            try:
+                return path.stat().st_mtime
+            except FileNotFoundError:
+                return 0
+
+        paths = sorted(self.storage_dir.glob(f'{owner}-*.joblib'), key=modified, reverse=True)
+        for path in paths:
+            fingerprint = path.name[len(f'{owner}-'):-len('.joblib')]
+            model = self.get(owner, fingerprint)
+            if model is not None:
+                return fingerprint, model
+        return None, None
+
+    def put(self, owner, fingerprint, model):
+        """Store ``model`` for ``owner`` and drop models for older fingerprints."""
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(owner, fingerprint)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+
+        self.invalidate(owner, keep=fingerprint)
+        self._remember((str(owner), str(fingerprint)), model)
+        return model
+
+    def get_or_train(self, owner, fingerprint, train):
+        """Return the stored model or build one with ``train()`` and store it."""
+        model = self.get(owner, fingerprint)
+        if model is None:
+            model = self.put(owner, fingerprint, train())
+        return model
+
+    def invalidate(self, owner, keep=None):
+        """Forget every model for ``owner`` except the ``keep`` fingerprint."""
+        owner = str(owner)
+        keep_path = self._path(owner, keep) if keep is not None else None
+        with self._lock:
+            for key in [key for key in self._models if key[0] == owner]:
+                if keep is None or key[1] != str(keep):
+                    del self._models[key]
+        for path in self.storage_dir.glob(f'{owner}-*.joblib'):
+            if path != keep_path:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+
+default_registry = ModelRegistry()
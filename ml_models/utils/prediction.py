@@ -1,87 +1,225 @@
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from datetime import datetime, timedelta
-
-def prepare_transaction_data(transactions):
-    """Convert transaction queryset to DataFrame and prepare features."""
-    df = pd.DataFrame(list(transactions.values()))
-    if df.empty:
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+
+from .forecasting import DEFAULT_ENGINE, calendar_features, daily_history, train_forecaster
+from .model_registry import default_registry, transaction_fingerprint
+
+# Only these columns are read from the database; description and the
+# timestamps are never needed by the models.
+TRANSACTION_COLUMNS = ('date', 'amount', 'transaction_type', 'category_id')
+TRANSACTION_TYPES = ['INCOME', 'EXPENSE']
+MIN_DATA_POINTS = 30  # Need enough data for meaningful predictions
+
+def _frame_from_rows(rows):
+    """Build a typed DataFrame from (date, amount, type, category_id) tuples."""
+    dates, amounts, types, categories = zip(*rows)
+    return pd.DataFrame({
+        'date': np.array(dates, dtype='datetime64[ns]'),
+        'amount': np.array(amounts, dtype=np.float64),
+        'transaction_type': pd.Categorical(types, categories=TRANSACTION_TYPES),
+        'category_id': pd.array(categories, dtype='Int64'),
+    })
+
+def iter_transaction_frames(transactions, chunk_size=50000):
+    """Yield typed DataFrames of at most ``chunk_size`` transactions each.
+
+    Only the columns in TRANSACTION_COLUMNS are fetched and amounts are cast
+    to floats in the database, so no Decimal objects or model instances are
+    created.
+    """
+    from django.db.models import FloatField
+    from django.db.models.functions import Cast
+
+    rows = transactions.order_by().annotate(
+        amount_float=Cast('amount', FloatField())
+    ).values_list('date', 'amount_float', 'transaction_type', 'category_id')
+
+    chunk = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield _frame_from_rows(chunk)
+            chunk = []
+    if chunk:
+        yield _frame_from_rows(chunk)
+
+def prepare_transaction_data(transactions, chunk_size=50000):
+    """Convert transaction queryset to DataFrame and prepare features.
+
+    The queryset is read ``chunk_size`` rows at a time, so only one chunk of
+    Python tuples is alive while the typed columns are assembled.
+    """
+    frames = list(iter_transaction_frames(transactions, chunk_size))
+    if not frames:
         return None
-    
-    # Convert date to datetime
-    df['date'] = pd.to_datetime(df['date'])
-    
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    df['category_id'] = df['category_id'].astype('category')
+
     # Create time-based features
-    df['month'] = df['date'].dt.month
-    df['day_of_week'] = df['date'].dt.dayofweek
-    df['day_of_month'] = df['date'].dt.day
-    
-    # Create category dummies
-    category_dummies = pd.get_dummies(df['category_id'], prefix='category')
-    df = pd.concat([df, category_dummies], axis=1)
-    
+    df['month'] = df['date'].dt.month.astype(np.int8)
+    df['day_of_week'] = df['date'].dt.dayofweek.astype(np.int8)
+    df['day_of_month'] = df['date'].dt.day.astype(np.int8)
+
     return df
 
-def predict_future_expenses(transactions, days_ahead=30):
-    """Predict future expenses based on historical data."""
-    df = prepare_transaction_data(transactions)
-    if df is None or len(df) < 30:  # Need enough data for meaningful predictions
-        return {
-            'error': 'Not enough historical data for predictions',
-            'required_data_points': 30,
-            'current_data_points': len(df) if df is not None else 0
-        }
-    
-    # Filter for expenses only
-    expense_df = df[df['transaction_type'] == 'EXPENSE']
-    
-    # Prepare features and target
-    features = ['month', 'day_of_week', 'day_of_month'] + \
-              [col for col in expense_df.columns if col.startswith('category_')]
-    X = expense_df[features]
-    y = expense_df['amount']
-    
-    # Split data and train model
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
-    model.fit(X_train, y_train)
-    
-    # Generate future dates and their features
-    future_dates = [datetime.now().date() + timedelta(days=i) for i in range(1, days_ahead + 1)]
-    future_features = []
-    
-    for date in future_dates:
-        features_dict = {
-            'month': date.month,
-            'day_of_week': date.weekday(),
-            'day_of_month': date.day
-        }
-        # Add category columns with zeros
-        for col in X.columns:
-            if col.startswith('category_'):
-                features_dict[col] = 0
-        future_features.append(features_dict)
-    
-    future_df = pd.DataFrame(future_features)
-    predictions = model.predict(future_df)
-    
-    # Prepare response
-    response = {
-        'predictions': [
-            {
-                'date': date.strftime('%Y-%m-%d'),
-                'predicted_amount': round(float(amount), 2)
-            }
-            for date, amount in zip(future_dates, predictions)
-        ],
-        'model_accuracy': round(model.score(X_test, y_test) * 100, 2)
+def prepare_daily_history(transactions):
+    """Aggregate a transaction queryset into dense daily expense series.
+
+    The database sums expenses per day and category, so only one row per
+    day and category is transferred; daily_history fills in the gaps. The
+    series span the first to the last transaction of any type.
+    """
+    from django.db.models import FloatField, Max, Min, Sum
+    from django.db.models.functions import Cast
+
+    span = transactions.order_by().aggregate(start=Min('date'), end=Max('date'))
+    if span['start'] is None:
+        return None
+    rows = transactions.filter(transaction_type='EXPENSE').order_by().values(
+        'date', 'category_id'
+    ).annotate(total=Sum(Cast('amount', FloatField()))).values_list(
+        'date', 'category_id', 'total'
+    )
+    dates, category_ids, totals = zip(*rows) if rows else ((), (), ())
+    return daily_history(dates, category_ids, totals, span['start'], span['end'])
+
+def model_key(owner, engine=None):
+    """Registry owner key; each engine keeps its own fitted model per owner."""
+    return f'{owner}.{engine or DEFAULT_ENGINE}'
+
+def train_expense_model(history, engine=None):
+    """Fit a forecasting engine on a daily history from prepare_daily_history.
+
+    One model is fitted to the overall daily totals and one per category, so
+    the cost depends on days of history and categories, not on the number
+    of transactions. Returns the bundle the model registry persists.
+    """
+    bundle = train_forecaster(history['total'], engine)
+    bundle['categories'] = {
+        category_id: train_forecaster(series, engine)
+        for category_id, series in history['categories'].items()
+    }
+    return bundle
+
+def predict_future_expenses(transactions, days_ahead=30, owner=None, registry=None,
+                            engine=None):
+    """Predict future expenses based on historical data.
+
+    When ``owner`` (e.g. the user id) is given, the fitted model is cached in
+    ``registry`` (the default model registry if omitted) under a fingerprint
+    of ``transactions``, so repeated calls on unchanged data skip training.
+    """
+    if owner is not None:
+        registry = registry or default_registry
+        fingerprint = transaction_fingerprint(transactions)
+        bundle = registry.get(model_key(owner, engine), fingerprint)
+        if bundle is None:
+            data_points = transactions.count()
+            if data_points < MIN_DATA_POINTS:
+                return not_enough_data_response(data_points)
+            bundle = registry.put(
+                model_key(owner, engine), fingerprint,
+                train_expense_model(prepare_daily_history(transactions), engine)
+            )
+    else:
+        data_points = transactions.count()
+        if data_points < MIN_DATA_POINTS:
+            return not_enough_data_response(data_points)
+        bundle = train_expense_model(prepare_daily_history(transactions), engine)
+
+    return forecast_with_model(bundle, days_ahead)
+
+def future_calendar(days_ahead=30, start=None):
+    """Return the next ``days_ahead`` dates and their calendar feature arrays."""
+    start = np.datetime64(start or datetime.now().date(), 'D')
+    dates = start + np.arange(1, days_ahead + 1)
+    return dates, calendar_features(dates)
+
+def forecast_with_model(bundle, days_ahead=30, calendar=None):
+    """Predict daily expense totals for the next ``days_ahead`` days with a trained bundle.
+
+    Besides the overall totals, each category gets its own daily forecast,
+    largest first. Category forecasts come from separate models and leave
+    out uncategorised spending, so they need not add up to the total.
+    The dates and their calendar features are built once and shared by the
+    total and category models; pass ``calendar`` (from future_calendar) to
+    share them across many bundles too.
+    """
+    dates, features = calendar or future_calendar(days_ahead)
+    labels = np.datetime_as_string(dates, unit='D')
+
+    def daily(model):
+        return [
+            {'date': date, 'predicted_amount': round(float(amount), 2)}
+            for date, amount in zip(labels, model.predict(dates, features))
+        ]
+
+    by_category = []
+    for category_id, category_bundle in bundle.get('categories', {}).items():
+        predictions = daily(category_bundle['model'])
+        by_category.append({
+            'category_id': category_id,
+            'total_amount': round(sum(p['predicted_amount'] for p in predictions), 2),
+            'predictions': predictions,
+        })
+    by_category.sort(key=lambda forecast: (-forecast['total_amount'], forecast['category_id']))
+
+    return {
+        'predictions': daily(bundle['model']),
+        'category_predictions': by_category,
+        'model_accuracy': bundle['accuracy'],
+        'engine': bundle['engine']
+    }
+
+def _train_if_enough_data(history, engine=None):
+    if history is None:
+        return None
+    return train_expense_model(history, engine)
+
+def fit_many(histories, workers=None, engine=None):
+    """Fit one expense model per owner, in parallel across a process pool.
+
+    ``histories`` maps owners to daily histories from prepare_daily_history.
+    Returns a mapping of owner to trained bundle, or None when the owner has
+    too little history. ``workers=1`` fits in the calling process.
+    """
+    owners = list(histories)
+    train = partial(_train_if_enough_data, engine=engine)
+    if workers == 1 or len(owners) <= 1:
+        bundles = [train(histories[owner]) for owner in owners]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            bundles = list(pool.map(train, [histories[o] for o in owners]))
+    return dict(zip(owners, bundles))
+
+def forecast_many(histories, days_ahead=30, workers=None, bundles=None, engine=None):
+    """Forecast ``days_ahead`` days for many owners in one pass.
+
+    Models are fitted with fit_many unless already-trained ``bundles`` are
+    given for some owners. The future calendar is built once and shared.
+    """
+    bundles = dict(bundles or {})
+    missing = {owner: df for owner, df in histories.items() if owner not in bundles}
+    bundles.update(fit_many(missing, workers=workers, engine=engine))
+
+    calendar = future_calendar(days_ahead)
+    forecasts = {}
+    for owner, bundle in bundles.items():
+        if bundle is None:
+            forecasts[owner] = not_enough_data_response(0)
+            continue
+        forecasts[owner] = forecast_with_model(bundle, days_ahead, calendar=calendar)
+    return forecasts
+
+def not_enough_data_response(data_points):
+    return {
+        'error': 'Not enough historical data for predictions',
+        'required_data_points': MIN_DATA_POINTS,
+        'current_data_points': data_points
     }
-    
-    return response
 
 def analyze_spending_patterns(transactions):
     """Analyze spending patterns and provide insights."""
@@ -91,6 +229,8 @@ def analyze_spending_patterns(transactions):
     
     # Filter for expenses
     expense_df = df[df['transaction_type'] == 'EXPENSE']
+    if expense_df.empty:
+        return {'error': 'No expense data available'}
     
     # Monthly spending analysis
     monthly_spending = expense_df.groupby(['month'])['amount'].agg(['sum', 'mean', 'count'])
@@ -138,7 +278,9 @@ def analyze_spending_patterns(transactions):
                 {
                     'date': row['date'].strftime('%Y-%m-%d'),
                     'amount': round(float(row['amount']), 2),
-                    'category_id': int(row['category_id'])
+                    'category_id': (
+                        None if pd.isna(row['category_id']) else int(row['category_id'])
+                    )
                 }
                 for _, row in unusual_expenses.head(5).iterrows()
             ]